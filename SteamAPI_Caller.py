@@ -27,14 +27,24 @@ def create_blank_steam_spreadsheet(spreadsheet_path=None):
         print(f"Blank spreadsheet created at {spreadsheet_path}")
     except Exception as e:
         print(f"Error creating blank spreadsheet: {e}")
-import requests
-import pandas as pd
-import openpyxl
+import json
 import os
 from dotenv import load_dotenv
+import memory_budget
+import metrics
+from profiling import profiled
+from app_catalog import get_catalog
+from owned_games import OwnedGamesSnapshot, save_snapshot, save_game, get_snapshot, SNAPSHOT_TTL_SECONDS
+
+_dotenv_loaded = False
 
 def get_api_key():
     """Get the Steam API key using the same method as the game lookup function."""
+    global _dotenv_loaded
+    # Read .env once per process; variables that are already set (GitHub Actions secrets) win
+    if not _dotenv_loaded:
+        load_dotenv()
+        _dotenv_loaded = True
     # For GitHub Actions, STEAM_API_KEY should be set as an environment variable (Repository Secret)
     return os.getenv('STEAM_API_KEY')
 
@@ -42,10 +52,58 @@ def get_api_key():
 # Steam API Information - will be loaded when needed
 STEAM_ID = '76561198074846013'  # Default fallback
 
-def fetch_steam_games(steam_id=None):
-    """Fetch games data from Steam API."""
+OWNED_GAMES_URL = "https://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/"
+# Store API app types under the names the spreadsheet's Type column uses
+STORE_TYPES = {'game': 'Game', 'dlc': 'DLC'}
+
+def request_owned_games(api_key, steam_id, appids=None):
+    """
+    Call GetOwnedGames and return the list of games.
+
+    Args:
+        api_key (str): Steam Web API key
+        steam_id (str): Steam ID of the user
+        appids (list): Only return these App IDs (uses the appids_filter parameter)
+
+    Raises:
+        RuntimeError: If the API does not answer with status 200
+    """
+    params = {'key': api_key}
+    if appids:
+        # appids_filter is only accepted through input_json
+        params['input_json'] = json.dumps({
+            'steamid': str(steam_id),
+            'include_appinfo': True,
+            'include_played_free_games': True,
+            'appids_filter': [int(app_id) for app_id in appids],
+        })
+    else:
+        params.update(steamid=steam_id, include_appinfo='true', include_played_free_games='true')
+
+    import requests
+    endpoint = 'owned_games_filtered' if appids else 'owned_games'
+    try:
+        with metrics.timer('steam_request_seconds', endpoint=endpoint):
+            response = requests.get(OWNED_GAMES_URL, params=params)
+    except requests.RequestException:
+        metrics.inc('steam_requests_total', endpoint=endpoint, status='error')
+        raise
+    metrics.inc('steam_requests_total', endpoint=endpoint, status=response.status_code)
+    if response.status_code != 200:
+        raise RuntimeError(f"Failed to fetch data from Steam API. Status code: {response.status_code}")
+    return response.json().get('response', {}).get('games', [])
+
+def fetch_steam_games(steam_id=None, raise_errors=False):
+    """
+    Fetch games data from Steam API.
+
+    Returns an empty list if the API key is missing or the request fails, or raises
+    RuntimeError instead when raise_errors is set.
+    """
     API_KEY = get_api_key()
     if not API_KEY:
+        if raise_errors:
+            raise RuntimeError("Steam API key not found. Please check your .env file.")
         print("Steam API key not found. Please check your .env file.")
         return []
     
@@ -53,63 +111,113 @@ def fetch_steam_games(steam_id=None):
     if steam_id is None:
         steam_id = STEAM_ID
     
-    # URL for the Steam API GetOwnedGames method
-    url = f"https://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/?key={API_KEY}&steamid={steam_id}&include_appinfo=true&include_played_free_games=true"
-
     # Fetching owned games from Steam API
-    response = requests.get(url)
-    if response.status_code == 200:
-        games_data = response.json().get('response', {}).get('games', [])
-        print(f"Games data retrieved: {len(games_data)} games found.")
-        return games_data
-    else:
+    try:
+        games_data = request_owned_games(API_KEY, steam_id)
+    except RuntimeError:
+        if raise_errors:
+            raise
         print("Failed to fetch data from Steam API.")
         return []
+    print(f"Games data retrieved: {len(games_data)} games found.")
+    return games_data
 
+def lookup_owned_game(steam_id, app_id, max_age=SNAPSHOT_TTL_SECONDS):
+    """
+    Look up one owned game, preferring the user's owned-games snapshot.
+
+    A fresh snapshot answers from its App ID index without any request. Otherwise
+    only this App ID is requested (appids_filter) and the answer is stored in the
+    snapshot, so repeated lookups stay local until the TTL runs out.
+
+    Returns:
+        dict: The GetOwnedGames entry for the game, or None if the user does not own it
+    """
+    app_id = str(app_id)
+    snapshot = get_snapshot(steam_id)
+    if snapshot is not None and snapshot.is_game_fresh(app_id, max_age):
+        metrics.inc('cache_requests_total', cache='owned_games_snapshot', result='hit')
+        return snapshot.get(app_id)
+    metrics.inc('cache_requests_total', cache='owned_games_snapshot', result='miss')
+
+    API_KEY = get_api_key()
+    if not API_KEY:
+        raise RuntimeError("Steam API key not found. Please check your .env file.")
+
+    games = request_owned_games(API_KEY, steam_id, appids=[app_id])
+    game = next((g for g in games if str(g.get('appid', '')) == app_id), None)
+    if snapshot is None:
+        # No full snapshot yet (never synced); start one that only holds looked-up games
+        snapshot = OwnedGamesSnapshot(steam_id)
+    save_game(snapshot, app_id, game)
+    return game
+
+@profiled()
 def update_spreadsheet(steam_id=None, spreadsheet_path=None):
-    """Update the spreadsheet with latest Steam game data."""
-    games_data = fetch_steam_games(steam_id)
+    """
+    Update the spreadsheet with latest Steam game data.
+
+    Raises:
+        RuntimeError: If the fetch fails, Steam returns no games (nothing is written then)
+            or the spreadsheet can't be saved
+    """
+    with memory_budget.stage('fetch'):
+        games_data = fetch_steam_games(steam_id, raise_errors=True)
+    metrics.set_gauge('sync_games', len(games_data))
+    if not games_data:
+        # A private game list also comes back empty; don't replace the spreadsheet with nothing
+        raise RuntimeError("Steam returned no games (is the profile's game details setting public?)")
     
     # Use default path if none provided
     if spreadsheet_path is None:
         spreadsheet_path = 'ExcelFiles/steam_games_playtime.xlsx'
     
-    # Process games data
-    games_list = []
+    # Names are shared by every user, so keep them in the app catalog once per app
+    catalog = get_catalog()
+    catalog.merge_owned_games(games_data)
+    catalog.save()
+
+    # Keep the raw API data per user (last played times etc.)
+    if games_data:
+        save_snapshot(steam_id or STEAM_ID, games_data)
     
-    for game in games_data:
-        app_id = game.get('appid', 'Unknown')
-        game_name = game.get('name', 'Unknown')
+    # Building the rows and the DataFrame holds the whole library in memory twice
+    with memory_budget.stage('dataframe'):
+        # Process games data
+        games_list = []
+    
+        for game in games_data:
+            app_id = game.get('appid', 'Unknown')
+            game_name = catalog.get_name(app_id, game.get('name', 'Unknown'))
         
-        game_info = {
-            "Game Name": game_name,
-            "App ID": app_id,
-            "Hours Played": round(game.get('playtime_forever', 0) / 60, 2),
-            "Purchase Cost": "",  # Will be filled by CSV import or manual entry
-            "Purchase Date": "",  # Will be filled by CSV import or manual entry
-            "Purchase Method": ""  # Will be filled by CSV import or manual entry
-        }
+            game_info = {
+                "Game Name": game_name,
+                "App ID": app_id,
+                "Hours Played": round(game.get('playtime_forever', 0) / 60, 2),
+                "Purchase Cost": "",  # Will be filled by CSV import or manual entry
+                "Purchase Date": "",  # Will be filled by CSV import or manual entry
+                "Purchase Method": ""  # Will be filled by CSV import or manual entry
+            }
         
-        games_list.append(game_info)
+            games_list.append(game_info)
     
-    # Sort games alphabetically by name
-    games_list.sort(key=lambda x: x["Game Name"].lower())
+        # Sort games alphabetically by name
+        games_list.sort(key=lambda x: x["Game Name"].lower())
 
-    # Convert the list to a DataFrame
-    df = pd.DataFrame(games_list)
+        # Convert the list to a DataFrame (pandas is only imported when a sync actually runs)
+        import pandas as pd
+        df = pd.DataFrame(games_list)
 
     # Write the DataFrame to the spreadsheet
-    if not df.empty:
-        try:
+    try:
+        with metrics.timer('workbook_save_seconds', kind='sync'), memory_budget.stage('workbook_save'):
             with pd.ExcelWriter(spreadsheet_path, engine='openpyxl') as writer:
                 df.to_excel(writer, sheet_name='Steam Games Playtime', index=False)
-            print(f"Spreadsheet updated at {spreadsheet_path}")
-            print(f"Total games processed: {len(games_list)}")
-            
-        except Exception as e:
-            print(f"Error saving spreadsheet: {e}")
-    else:
-        print("No games to save.")
+    except Exception as e:
+        print(f"Error saving spreadsheet: {e}")
+        raise RuntimeError(f"Error saving spreadsheet: {e}") from e
+    print(f"Spreadsheet updated at {spreadsheet_path}")
+    print(f"Total games processed: {len(games_list)}")
 
 def get_total_games_and_hours(sheet):
     """Calculate total games and hours from an Excel sheet."""
@@ -129,39 +237,46 @@ def get_total_games_and_hours(sheet):
 def get_steam_price(app_id, country_code='US'):
     """Get the current price of a game from Steam Store API."""
     try:
-        # Steam Store API endpoint for price details
-        url = f"https://store.steampowered.com/api/appdetails?appids={app_id}&filters=price_overview&cc={country_code}"
+        # Steam Store API endpoint for price details (basic carries the app type for the catalog)
+        url = f"https://store.steampowered.com/api/appdetails?appids={app_id}&filters=basic,price_overview&cc={country_code}"
         
-        response = requests.get(url)
+        import requests
+        try:
+            with metrics.timer('steam_request_seconds', endpoint='appdetails'):
+                response = requests.get(url)
+        except requests.RequestException:
+            metrics.inc('steam_requests_total', endpoint='appdetails', status='error')
+            raise
+        metrics.inc('steam_requests_total', endpoint='appdetails', status=response.status_code)
         if response.status_code == 200:
             data = response.json()
             
             if str(app_id) in data and data[str(app_id)]['success']:
                 game_data = data[str(app_id)]['data']
                 
-                # Check if data is a list (empty) or dict with price info
-                if isinstance(game_data, dict) and 'price_overview' in game_data:
-                    price_overview = game_data['price_overview']
-                    
-                    if price_overview:
-                        # Price is in cents, convert to dollars
-                        final_price = price_overview.get('final', 0) / 100.0
-                        initial_price = price_overview.get('initial', 0) / 100.0
-                        
-                        return {
-                            'current_price': final_price,
-                            'original_price': initial_price,
-                            'currency': price_overview.get('currency', 'USD'),
-                            'discount_percent': price_overview.get('discount_percent', 0)
-                        }
-                
                 # If no price data available, return free game defaults
-                return {
+                price_info = {
                     'current_price': 0.0,
                     'original_price': 0.0,
                     'currency': 'USD',
                     'discount_percent': 0
                 }
+
+                # Check if data is a list (empty) or dict with price info
+                if isinstance(game_data, dict) and game_data.get('price_overview'):
+                    price_overview = game_data['price_overview']
+                    # Price is in cents, convert to dollars
+                    price_info = {
+                        'current_price': price_overview.get('final', 0) / 100.0,
+                        'original_price': price_overview.get('initial', 0) / 100.0,
+                        'currency': price_overview.get('currency', 'USD'),
+                        'discount_percent': price_overview.get('discount_percent', 0)
+                    }
+
+                # 'game', 'dlc', 'demo', ... -> the spreadsheet's Type values
+                if isinstance(game_data, dict) and game_data.get('type'):
+                    price_info['type'] = STORE_TYPES.get(game_data['type'], game_data['type'].capitalize())
+                return price_info
             else:
                 print(f"Failed to get price data for app ID {app_id}")
                 return None
@@ -180,8 +295,11 @@ def get_bundle_prices(app_ids):
     
     print(f"Fetching Steam original prices for {len(app_ids)} games...")
     
+    # Prices come from the shared catalog, so each app is only fetched once a day across all users
+    catalog_prices = get_catalog().refresh_prices(app_ids, get_steam_price)
+    
     for app_id in app_ids:
-        price_info = get_steam_price(app_id)
+        price_info = catalog_prices.get(str(app_id))
         if price_info:
             # Use original price (before any discounts)
             price = price_info['original_price']
@@ -197,8 +315,20 @@ def get_bundle_prices(app_ids):
     return prices, total_steam_value
 
 
+def refresh_catalog_prices(max_age_days=1):
+    """Refresh prices for every app in the shared catalog, once per app regardless of how many users own it."""
+    catalog = get_catalog()
+    app_ids = list(catalog.apps.keys())
+    print(f"Refreshing catalog prices for {len(app_ids)} apps...")
+    prices = catalog.refresh_prices(app_ids, get_steam_price, max_age_days=max_age_days)
+    refreshed = sum(1 for price in prices.values() if price)
+    print(f"Catalog prices available for {refreshed} of {len(app_ids)} apps")
+    return prices
+
+
 # Main execution (when run directly)
 if __name__ == "__main__":
+    import pandas as pd
     games_data = fetch_steam_games()
     
     # Process games data
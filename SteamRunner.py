@@ -1,20 +1,89 @@
-import random
-from PyQt6.QtWidgets import QLineEdit
-import csv
-import re
+import time
+_startup_began = time.perf_counter()
+
 import json
 import os
 from datetime import datetime
-from PyQt6.QtWidgets import QApplication, QMainWindow, QLabel, QHBoxLayout, QVBoxLayout, QWidget, QSpacerItem, QSizePolicy, QPushButton, QGridLayout, QMessageBox, QInputDialog, QCheckBox, QDialog, QFileDialog, QTextEdit
+from PyQt6.QtWidgets import QApplication, QMainWindow, QLabel, QHBoxLayout, QVBoxLayout, QWidget, QSpacerItem, QSizePolicy, QPushButton, QGridLayout, QMessageBox, QInputDialog, QCheckBox, QDialog, QFileDialog, QTextEdit, QComboBox, QSpinBox
 from custom_textbox import CustomTextBox
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt, QTimer
 import sys
-import openpyxl
-from SteamAPI_Caller import update_spreadsheet
-from SteamData import get_data_from_spreadsheet
-from steam_csv_importer import SteamCSVImporter
-from game_search import calculate_similarity_score
+from steam_library import load_library, reload_if_changed
+from library_watcher import SpreadsheetWatcher
+from library_cache import LibraryCache
+import ui_watchdog
+import memory_budget
+import metrics
+import profiling
+import startup_timer
+from background_tasks import TaskRunner
+
+# Heavy modules (openpyxl, pandas/requests via SteamAPI_Caller, the CSV importer and
+# game_search) are imported inside the handlers that need them to keep startup fast.
+startup_timer.start(_startup_began)
+startup_timer.mark("Module imports")
+
+
+# Button handlers whose durations the UI watchdog records (and which are profiled with STEAMHOURS_PROFILE=1)
+TIMED_HANDLERS = [
+    'update_steam_data', 'select_random_game', 'lookup_game_hours', 'import_costs_from_csv',
+    'search_game_stats', 'show_library_table', 'show_library_insights', 'show_library_query', 'change_user',
+]
+
+
+# Worker functions below run on the background task pool; they must not touch any widgets.
+
+def sync_steam_data(steam_id, spreadsheet_path, task):
+    """Fetch the latest Steam data into the spreadsheet and return the reloaded library."""
+    from SteamAPI_Caller import update_spreadsheet
+    task.report("Fetching")
+    update_spreadsheet(steam_id=steam_id, spreadsheet_path=spreadsheet_path)
+    task.check_cancelled()
+    task.report("Reading totals")
+    return load_dashboard_library(spreadsheet_path)
+
+
+def load_dashboard_library(spreadsheet_path):
+    """Load the library and warm its analytics so the dashboard panels update instantly."""
+    from library_analytics import get_analytics
+    library = load_library(spreadsheet_path)
+    get_analytics(library).dashboard()
+    return library
+
+
+def reload_changed_library(spreadsheet_path, library):
+    """Reload the library if the spreadsheet's content changed; returns (fingerprint, new library or None)."""
+    from library_analytics import get_analytics
+    fingerprint, new_library = reload_if_changed(library, spreadsheet_path)
+    if new_library is not None:
+        get_analytics(new_library).dashboard()
+    return fingerprint, new_library
+
+
+def load_playtime_rows(spreadsheet_path):
+    """Load all data rows of the Steam Games Playtime sheet."""
+    import openpyxl
+    workbook = openpyxl.load_workbook(spreadsheet_path, read_only=True)
+    try:
+        if 'Steam Games Playtime' not in workbook.sheetnames:
+            raise ValueError("Steam Games Playtime sheet not found in spreadsheet.")
+        return list(workbook['Steam Games Playtime'].iter_rows(min_row=2, values_only=True))
+    finally:
+        workbook.close()
+
+
+def find_game_by_app_id(spreadsheet_path, app_id):
+    """Find (game_name, hours_played) for an App ID in the spreadsheet, or None."""
+    for row in load_playtime_rows(spreadsheet_path):
+        if len(row) >= 3:
+            game_name = row[0] if row[0] else "Unknown Game"  # Game Name is column A
+            sheet_app_id = str(row[1]) if row[1] else ""     # App ID is column B
+            hours_played = row[2] if row[2] else 0           # Hours is column C
+            if sheet_app_id == app_id:
+                return game_name, hours_played
+    return None
+
 
 class GameLookupDialog(QDialog):
     def __init__(self, parent=None):
@@ -99,10 +168,187 @@ class GameLookupDialog(QDialog):
         return self.input_field.text(), self.api_checkbox.isChecked()
 
 
+class RandomGameDialog(QDialog):
+    """Random game picker with filters, weighting and a re-roll button."""
+
+    def __init__(self, picker, filters=None, parent=None):
+        super().__init__(parent)
+        from random_picker import WEIGHTINGS
+        self.picker = picker
+        filters = filters or {}
+        self.setWindowTitle('Random Game')
+        self.setMinimumWidth(500)
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #2b2b2b;
+                color: white;
+            }
+            QLabel {
+                color: white;
+            }
+            QCheckBox {
+                color: white;
+                margin: 5px 0;
+            }
+            QCheckBox::indicator {
+                width: 18px;
+                height: 18px;
+            }
+            QCheckBox::indicator:unchecked {
+                background-color: white;
+                border: 1px solid #ccc;
+            }
+            QCheckBox::indicator:checked {
+                background-color: #4CAF50;
+                border: 1px solid #4CAF50;
+            }
+            QComboBox, QSpinBox {
+                background-color: #404040;
+                color: white;
+                border: 1px solid #666;
+                padding: 5px;
+            }
+            QComboBox QAbstractItemView {
+                background-color: #404040;
+                color: white;
+            }
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                margin: 5px 2px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background-color: #45a049;
+            }
+        """)
+
+        layout = QVBoxLayout()
+
+        # Filters
+        self.unplayed_checkbox = QCheckBox('Unplayed only')
+        self.unplayed_checkbox.setChecked(filters.get('unplayed_only', False))
+        layout.addWidget(self.unplayed_checkbox)
+
+        self.exclude_dlc_checkbox = QCheckBox('Exclude DLC')
+        self.exclude_dlc_checkbox.setChecked(filters.get('exclude_dlc', False))
+        layout.addWidget(self.exclude_dlc_checkbox)
+
+        form_layout = QGridLayout()
+        form_layout.addWidget(QLabel('Under hours:'), 0, 0)
+        self.max_hours_spin = QSpinBox()
+        self.max_hours_spin.setRange(0, 100000)
+        self.max_hours_spin.setSpecialValueText('No limit')
+        self.max_hours_spin.setValue(int(filters.get('max_hours') or 0))
+        form_layout.addWidget(self.max_hours_spin, 0, 1)
+
+        form_layout.addWidget(QLabel('Bought in:'), 1, 0)
+        self.year_combo = QComboBox()
+        self.year_combo.addItem('Any year', None)
+        for year in picker.purchase_years():
+            self.year_combo.addItem(str(year), year)
+        year_index = self.year_combo.findData(filters.get('year'))
+        self.year_combo.setCurrentIndex(max(year_index, 0))
+        form_layout.addWidget(self.year_combo, 1, 1)
+
+        form_layout.addWidget(QLabel('Weighting:'), 2, 0)
+        self.weighting_combo = QComboBox()
+        for weighting, title in WEIGHTINGS.items():
+            self.weighting_combo.addItem(title, weighting)
+        self.weighting_combo.setCurrentIndex(max(self.weighting_combo.findData(filters.get('weighting', 'uniform')), 0))
+        form_layout.addWidget(self.weighting_combo, 2, 1)
+        layout.addLayout(form_layout)
+
+        # Result
+        self.result_label = QLabel('Press Pick to choose a game')
+        self.result_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        self.result_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.result_label.setWordWrap(True)
+        layout.addWidget(self.result_label)
+
+        self.details_label = QLabel('')
+        self.details_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.details_label)
+
+        button_layout = QHBoxLayout()
+        self.pick_button = QPushButton('Pick')
+        self.pick_button.clicked.connect(self.pick)
+        close_button = QPushButton('Close')
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(self.pick_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def get_filters(self):
+        """Get the current filters and weighting as keyword arguments for RandomGamePicker.pick."""
+        return {
+            'unplayed_only': self.unplayed_checkbox.isChecked(),
+            'max_hours': self.max_hours_spin.value() or None,
+            'exclude_dlc': self.exclude_dlc_checkbox.isChecked(),
+            'year': self.year_combo.currentData(),
+            'weighting': self.weighting_combo.currentData(),
+        }
+
+    def pick(self):
+        """Draw a game with the current settings and show it."""
+        filters = self.get_filters()
+        game = self.picker.pick(**filters)
+        if game is None:
+            self.result_label.setText('No games match these filters')
+            self.details_label.setText('')
+            return
+
+        self.result_label.setText(f"You got: {game['name']}")
+        hours = game['hours'] if game['hours'] not in (None, '') else 0
+        details = f"App ID: {game['app_id']}  |  Hours: {hours}"
+        if game['cost'] not in (None, ''):
+            details += f"  |  Cost: ${float(game['cost']):.2f}"
+        details += f"\nPicked from {self.picker.match_count(**filters)} games"
+        self.details_label.setText(details)
+        self.pick_button.setText('Re-roll')
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         
+        # Long operations run here so the event loop never blocks
+        self.tasks = TaskRunner(self)
+
+        # One cProfile dump per handler call in profiles/ when profiling is on
+        if profiling.is_enabled():
+            for name in TIMED_HANDLERS:
+                setattr(self, name, profiling.wrap(name, getattr(self, name)))
+
+        # Stall detection and handler timings (logs/ui_latency.jsonl); handlers must be
+        # wrapped before the buttons are connected
+        self.watchdog = None
+        if ui_watchdog.is_enabled():
+            self.watchdog = ui_watchdog.UiWatchdog(self)
+            self.watchdog.instrument(self, TIMED_HANDLERS)
+            QTimer.singleShot(0, self.watchdog.start)  # Start once the event loop runs
+
+        # In-memory copy of the current user's spreadsheet, loaded in the background
+        self.library = None
+        self.library_window = None
+        self.query_window = None
+        self.search_window = None
+
+        # Recently used users' libraries, so switching back does not reload from disk
+        self.library_cache = LibraryCache()
+
+        # Refresh the dashboard when something else rewrites the spreadsheet
+        self.watcher = SpreadsheetWatcher(self)
+        self.watcher.changed.connect(self.on_spreadsheet_changed)
+        self.watch_reload_pending = False
+
+        # Last filters used in the random game dialog
+        self.random_game_filters = {}
+
         # Add user attribute for Steam ID (load early)
         self.current_steam_id = self.load_user_preferences()  # Load from config file
         
@@ -139,6 +385,11 @@ class MainWindow(QMainWindow):
         # Create the third box (number and caption)
         self.average_playtime_label = self.add_number_box(boxes_layout, "0.00", "Average Playtime", "#90EE90")  # Light green
 
+        # Analytics boxes, filled in once the library has loaded
+        self.cost_per_hour_label = self.add_number_box(boxes_layout, "$0.00", "Cost per Hour", "#FFE4B5")  # Moccasin
+
+        self.backlog_share_label = self.add_number_box(boxes_layout, "0.0%", "Backlog Share", "#D8BFD8")  # Thistle
+
         # Add the boxes layout to the main layout
         main_layout.addLayout(boxes_layout)
 
@@ -149,9 +400,9 @@ class MainWindow(QMainWindow):
             3: "Game Hours Lookup",
             4: "Import Costs from CSV",
             5: "Search Game Stats",
-            6: "Button 6",
-            7: "Button 7",
-            8: "Button 8",
+            6: "Library Table",
+            7: "Library Insights",
+            8: "Query Library",
             9: "Button 9",
             10: "Button 10",
             11: "Button 11",
@@ -162,9 +413,11 @@ class MainWindow(QMainWindow):
         button_grid = QGridLayout()
 
         # Add buttons to the grid layout using the names from the dictionary
+        self.buttons = {}
 
         for i in range(1, 13):  # 12 buttons
             button = QPushButton(self.button_names[i])
+            self.buttons[i] = button
             button.setMinimumWidth(400)
             button.setMaximumWidth(400)
             button.setMinimumHeight(100)
@@ -182,6 +435,12 @@ class MainWindow(QMainWindow):
                 button.clicked.connect(self.import_costs_from_csv)
             elif i == 5:
                 button.clicked.connect(self.search_game_stats)
+            elif i == 6:
+                button.clicked.connect(self.show_library_table)
+            elif i == 7:
+                button.clicked.connect(self.show_library_insights)
+            elif i == 8:
+                button.clicked.connect(self.show_library_query)
             elif i == 12:
                 button.clicked.connect(self.change_user)
 
@@ -240,8 +499,11 @@ class MainWindow(QMainWindow):
             else:
                 sys.exit()
 
-        # Load initial data from spreadsheet on startup
-        self.load_initial_data()
+        startup_timer.mark("Window constructed")
+
+        # Load the numbers once the window is up instead of blocking before it appears
+        self.stats_reload_pending = False
+        QTimer.singleShot(0, self.load_initial_data)
 
     def change_user(self):
         """Prompt for a new Steam ID and update the user."""
@@ -289,14 +551,23 @@ class MainWindow(QMainWindow):
                     # Ensure user directory exists
                     self.ensure_user_directory()
                     
-                    # Reload data for new user
-                    self.load_initial_data()
+                    # Switch to the cached library if this user was loaded recently, otherwise reload
+                    cached_library = self.library_cache.get(steam_id, self.get_user_spreadsheet_path())
+                    if cached_library is not None:
+                        self.stats_reload_pending = False  # A load still running is for the previous user
+                        self.set_library(cached_library)
+                        data_message = "Data restored from memory."
+                    else:
+                        self.library = None
+                        self.load_initial_data()
+                        data_message = "Data loaded for new user."
+                    print('\n'.join(self.library_cache.report()))
                     
                     # Update window title to show current user
                     self.setWindowTitle(f"Steam Data Tracker - User: {self.current_steam_id}")
                     
                     self.show_success_notification("User Changed", 
-                        f"Steam ID changed from:\n{old_id}\nto:\n{self.current_steam_id}\n\nData loaded for new user.")
+                        f"Steam ID changed from:\n{old_id}\nto:\n{self.current_steam_id}\n\n{data_message}")
                 else:
                     self.show_styled_message_box("Invalid Steam ID", 
                         "Steam ID must be a 17-digit number.\n\nExample: 76561198074846013", 
@@ -364,21 +635,114 @@ class MainWindow(QMainWindow):
             return None
 
     def load_initial_data(self):
-        """Load initial data from the spreadsheet on startup."""
+        """Load the dashboard numbers from the spreadsheet in the background."""
         try:
             # Ensure user directory exists before trying to access spreadsheet
             self.ensure_user_directory()
             spreadsheet_path = self.get_user_spreadsheet_path()
-            total_games, total_hours, average_playtime = get_data_from_spreadsheet(spreadsheet_path)
-            
-            # Update the labels with the loaded data
-            self.total_games_label.setText(str(total_games))
-            self.total_hours_label.setText(f"{total_hours:.2f}")
-            self.average_playtime_label.setText(f"{average_playtime:.2f}")
+
+            if self.tasks.is_running('load_stats'):
+                # A load is already in flight (e.g. quick user switch); reload once it has finished
+                self.stats_reload_pending = True
+                return
+
+            self.tasks.run('load_stats', load_dashboard_library, spreadsheet_path,
+                           on_result=self.on_initial_data_loaded,
+                           on_error=lambda e: print(f"Error loading initial data: {e}"),
+                           on_finished=self.on_initial_data_finished)
         except Exception as e:
             print(f"Error loading initial data: {e}")
             # Keep default values (0, 0.00, 0.00) if there's an error
 
+    def on_initial_data_loaded(self, library):
+        """Keep the library loaded in the background and update the labels from it."""
+        if self.stats_reload_pending:
+            # The user changed while loading; this library is for the previous spreadsheet
+            return
+        if os.path.abspath(library.source_path) != os.path.abspath(self.get_user_spreadsheet_path()):
+            return
+
+        self.set_library(library)
+
+        if not startup_timer.is_reported():
+            startup_timer.mark("Stats loaded")
+            startup_timer.report()
+
+    def on_initial_data_finished(self):
+        """Start the reload requested while the previous load was running."""
+        if self.stats_reload_pending:
+            self.stats_reload_pending = False
+            self.load_initial_data()
+
+    def set_library(self, library):
+        """Make a freshly loaded library current and refresh everything shown from it."""
+        self.library = library
+        self.library_cache.put(self.current_steam_id, library)
+        self.apply_stats(*library.summary())
+        self.apply_analytics(library)
+        if self.library_window is not None:
+            self.library_window.set_library(library)
+        if self.query_window is not None:
+            # Build the new query index off the UI thread, then re-run the open query
+            from library_query import get_query_index
+            self.tasks.run(f'query_index_{library.version}', get_query_index, library,
+                           on_result=lambda _: self.query_window.set_library(library) if self.library is library else None)
+        if self.search_window is not None:
+            from name_prefix_index import get_prefix_index
+            self.tasks.run(f'prefix_index_{library.version}', get_prefix_index, library,
+                           on_result=lambda _: self.search_window.set_library(library) if self.library is library else None)
+        if library.source_path:
+            self.watcher.watch(library.source_path, library.fingerprint)
+
+    def on_spreadsheet_changed(self, path):
+        """Reload the library after another process has rewritten the spreadsheet."""
+        spreadsheet_path = self.get_user_spreadsheet_path()
+        if os.path.abspath(spreadsheet_path) != path:
+            return
+        if any(self.tasks.is_running(action) for action in ('sync', 'import', 'load_stats', 'load_library')):
+            # These flows finish by loading a fresh library themselves
+            return
+        if self.tasks.is_running('reload'):
+            self.watch_reload_pending = True
+            return
+
+        checked = self.library
+        self.tasks.run('reload', reload_changed_library, spreadsheet_path, checked,
+                       on_result=lambda result: self.on_library_reloaded(checked, *result),
+                       on_error=lambda e: print(f"Error reloading changed spreadsheet: {e}"),
+                       on_finished=self.on_library_reload_finished)
+
+    def on_library_reloaded(self, checked, fingerprint, library):
+        """Push a library reloaded after an external change to the labels and open views."""
+        if library is None:
+            # Rewritten with the same content; remember the new timestamp so the next check stays cheap
+            if checked is not None and fingerprint is not None:
+                checked.fingerprint = fingerprint
+            return
+        if os.path.abspath(library.source_path) != os.path.abspath(self.get_user_spreadsheet_path()):
+            return  # The user changed while reloading
+        print("Spreadsheet changed on disk; refreshing dashboard")
+        self.set_library(library)
+
+    def on_library_reload_finished(self):
+        """Check again if more writes arrived while the last reload was running."""
+        if self.watch_reload_pending:
+            self.watch_reload_pending = False
+            self.on_spreadsheet_changed(os.path.abspath(self.get_user_spreadsheet_path()))
+
+    def apply_stats(self, total_games, total_hours, average_playtime):
+        """Show new totals in the number boxes."""
+        self.total_games_label.setText(str(total_games))
+        self.total_hours_label.setText(f"{total_hours:.2f}")
+        self.average_playtime_label.setText(f"{average_playtime:.2f}")
+
+    def apply_analytics(self, library):
+        """Show the analytics panels for a library (computed once per library version)."""
+        from library_analytics import get_analytics
+        analytics = get_analytics(library)
+        self.cost_per_hour_label.setText(f"${analytics.cost_per_hour():.2f}")
+        self.backlog_share_label.setText(f"{analytics.backlog_share() * 100:.1f}%")
+
     def add_number_box(self, layout, number, caption, color):
         """Helper function to add a number box to the layout."""
         # Create a vertical layout for each box
@@ -414,61 +778,60 @@ class MainWindow(QMainWindow):
         return number_label
 
     def update_steam_data(self):
-        """Update Steam data and show loading animation."""
-        # Create a local update button
-        self.update_button = QPushButton("Update")  # Assign to self
+        """Update Steam data in the background and show a loading animation."""
+        # The import keeps its own copy of the workbook open and would save over the synced rows
+        if self.tasks.is_running('import'):
+            self.show_styled_message_box("Import Running", "Wait for the CSV import to finish before updating Steam data.", QMessageBox.Icon.Information)
+            return
+        from SteamAPI_Caller import get_api_key
+        if not get_api_key():
+            self.show_styled_message_box("Steam API Key Error", "Steam API key not found. Please check your .env file.", QMessageBox.Icon.Critical)
+            return
+
+        # Ensure user directory exists before accessing spreadsheet
+        self.ensure_user_directory()
+        spreadsheet_path = self.get_user_spreadsheet_path()
+
+        # Pass user-specific Steam ID and spreadsheet path
+        started = self.tasks.run(
+            'sync', sync_steam_data, self.current_steam_id, spreadsheet_path, context=True,
+            on_result=self.on_update_finished,
+            on_error=lambda e: self.show_styled_message_box("Update Failed", f"Failed to update Steam data: {str(e)}", QMessageBox.Icon.Critical),
+            on_progress=self.on_update_progress,
+            on_finished=self.on_update_done,
+        )
+        if not started:
+            return
 
         # Disable the update button and show a throbber
-        self.update_button.setText("Updating...")
+        self.update_button = self.buttons[1]
         self.update_button.setEnabled(False)
-
-        # Start the throbber
         self.start_throbber()
 
-        # Update the spreadsheet in a separate thread
-        QTimer.singleShot(100, self.perform_update)  # Simulate an async operation
+    def on_update_progress(self, stage):
+        """Show the current sync stage in the throbber."""
+        self.throbber_text = stage
 
-    def perform_update(self):
-        """Perform the update of Steam data."""
-        try:
-            # Update the spreadsheet
-            from SteamAPI_Caller import get_api_key
-            api_key = get_api_key()
-            if not api_key:
-                self.show_styled_message_box("Steam API Key Error", "Steam API key not found. Please check your .env file.", QMessageBox.Icon.Critical)
-                return
+    def on_update_finished(self, library):
+        """Show the new totals after a successful sync."""
+        self.set_library(library)
+        total_games, total_hours, average_playtime = library.summary()
 
-            # Ensure user directory exists before accessing spreadsheet
-            self.ensure_user_directory()
-            spreadsheet_path = self.get_user_spreadsheet_path()
-            
-            # Pass user-specific Steam ID and spreadsheet path
-            update_spreadsheet(steam_id=self.current_steam_id, spreadsheet_path=spreadsheet_path)
-            
-            # Get the updated values using SteamData
-            total_games, total_hours, average_playtime = get_data_from_spreadsheet(spreadsheet_path)
-
-            # Update the labels with the new data
-            self.total_games_label.setText(str(total_games))
-            self.total_hours_label.setText(f"{total_hours:.2f}")
-            self.average_playtime_label.setText(f"{average_playtime:.2f}")
-
-            # Show success notification
-            message = f"Steam data updated successfully!\n\n"
-            message += f"Total games: {total_games}\n"
-            message += f"Total hours: {total_hours:.2f}"
-            
-            self.show_success_notification("Steam Data Updated!", message)
-            
-        except Exception as e:
-            # Show error notification if update fails
-            self.show_styled_message_box("Update Failed", f"Failed to update Steam data: {str(e)}", QMessageBox.Icon.Critical)
-        finally:
-            # Restore button state
-            self.update_button.setText("Update Steam Info")
+        # Show success notification
+        message = f"Steam data updated successfully!\n\n"
+        message += f"Total games: {total_games}\n"
+        message += f"Total hours: {total_hours:.2f}"
+
+        self.show_success_notification("Steam Data Updated!", message)
+
+    def on_update_done(self):
+        """Restore the update button once the sync has finished or failed."""
+        # Stop the throbber
+        self.stop_throbber()
 
-            # Stop the throbber
-            self.stop_throbber()
+        # Restore button state
+        self.update_button.setText(self.button_names[1])
+        self.update_button.setEnabled(True)
 
     def start_throbber(self):
         """Start a simple throbber animation."""
@@ -476,6 +839,7 @@ class MainWindow(QMainWindow):
         self.throbber_timer.timeout.connect(self.update_throbber)
         self.throbber_counter = 0
         self.throbber_text = "Updating"  # Base text for the throbber
+        self.update_button.setText(self.throbber_text)
         self.throbber_timer.start(500)  # Update every 500ms
 
     def update_throbber(self):
@@ -489,59 +853,31 @@ class MainWindow(QMainWindow):
         """Stop the throbber timer."""
         self.throbber_timer.stop()
 
+    def show_task_error(self, error):
+        """Show an error raised by a background task."""
+        if isinstance(error, FileNotFoundError):
+            self.show_styled_message_box("File Error", "Spreadsheet file not found.", QMessageBox.Icon.Warning)
+        else:
+            self.show_styled_message_box("Error", f"An error occurred: {str(error)}", QMessageBox.Icon.Critical)
+
     def select_random_game(self):
-        """Select a random game from the spreadsheet and display its name."""
-        try:
+        """Pick a random game from the loaded library, with optional filters and weighting."""
+        if self.library is None:
             # Ensure user directory exists before accessing spreadsheet
             self.ensure_user_directory()
-            spreadsheet_path = self.get_user_spreadsheet_path()
-            workbook = openpyxl.load_workbook(spreadsheet_path)
-
-            if 'Steam Games Playtime' in workbook.sheetnames:
-                sheet = workbook['Steam Games Playtime']
-                games = []
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    app_id, game_name = row[1], row[0]  # Note: swapped order - Game Name is column A, App ID is column B
-                    if game_name:
-                        games.append(game_name)
-
-                if games:
-                    random_game = random.choice(games)
-                    # Display the selected game name in a pop-up
-                    self.show_random_game_popup(random_game)
-        except FileNotFoundError:
-            self.show_styled_message_box("File Error", "Spreadsheet file not found.", QMessageBox.Icon.Warning)
-        except Exception as e:
-            self.show_styled_message_box("Error", f"An error occurred: {str(e)}", QMessageBox.Icon.Critical)
+            self.tasks.run('load_library', load_dashboard_library, self.get_user_spreadsheet_path(),
+                           on_result=lambda library: (self.set_library(library), self.select_random_game()),
+                           on_error=self.show_task_error)
+            return
 
-    def show_random_game_popup(self, game_name):
-        """Show a pop-up window with the selected random game."""
-        msg_box = QMessageBox(self)
-        msg_box.setWindowTitle("Random Game Selected")
-        msg_box.setText(f"You got: {game_name}")
-        msg_box.setIcon(QMessageBox.Icon.Information)
-        msg_box.setStandardButtons(QMessageBox.StandardButton.Ok)
-        msg_box.setStyleSheet("""
-            QMessageBox {
-                background-color: #2b2b2b;
-                color: white;
-            }
-            QMessageBox QLabel {
-                color: white;
-            }
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                margin: 2px;
-                min-width: 80px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
-        msg_box.exec()
+        from random_picker import get_picker
+        from owned_games import get_last_played
+        steam_id = self.current_steam_id
+        picker = get_picker(self.library, lambda: get_last_played(steam_id))
+
+        dialog = RandomGameDialog(picker, self.random_game_filters, self)
+        dialog.exec()
+        self.random_game_filters = dialog.get_filters()
 
     def lookup_game_hours(self):
         """Prompt user for a Steam App ID and show the hours played for that game."""
@@ -565,81 +901,54 @@ class MainWindow(QMainWindow):
                     self.show_styled_message_box("Invalid Input", "Please enter a valid numeric App ID.", QMessageBox.Icon.Warning)
 
     def lookup_game_from_api(self, app_id):
-        """Look up game hours from Steam API."""
-        try:
-            import requests
-            import os
-            from dotenv import load_dotenv
-            
-            load_dotenv()
-            API_KEY = os.getenv('STEAM_API_KEY')
-            STEAM_ID = self.current_steam_id  # Use the current user's Steam ID
-            
-            if not API_KEY:
-                self.show_styled_message_box("API Error", "Steam API key not found. Please check your .env file.", QMessageBox.Icon.Warning)
-                return
-            
-            # Get owned games from Steam API
-            url = f"https://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/?key={API_KEY}&steamid={STEAM_ID}&include_appinfo=true&include_played_free_games=true"
-            
-            response = requests.get(url)
-            if response.status_code == 200:
-                games_data = response.json().get('response', {}).get('games', [])
-                
-                # Search for the specific games
-                for game in games_data:
-                    if str(game.get('appid', '')) == app_id:
-                        game_name = game.get('name', 'Unknown Game')
-                        hours_played = round(game.get('playtime_forever', 0) / 60, 2)
-                        self.show_game_hours_popup(game_name, app_id, f"{hours_played} (from API)")
-                        return
-                
+        """Look up game hours from the owned-games snapshot, or the Steam API when it is stale."""
+        from SteamAPI_Caller import get_api_key, lookup_owned_game
+        from owned_games import get_snapshot
+        STEAM_ID = self.current_steam_id  # Use the current user's Steam ID
+
+        # A fresh snapshot answers without the API, so the key is only needed for a request
+        snapshot = get_snapshot(STEAM_ID)
+        if (snapshot is None or not snapshot.is_game_fresh(app_id)) and not get_api_key():
+            self.show_styled_message_box("API Error", "Steam API key not found. Please check your .env file.", QMessageBox.Icon.Warning)
+            return
+
+        def show_result(game):
+            if game:
+                hours_played = round(game.get('playtime_forever', 0) / 60, 2)
+                self.show_game_hours_popup(game.get('name', 'Unknown Game'), app_id, f"{hours_played} (from API)")
+            else:
                 # Game not found
                 self.show_game_not_found_popup(app_id)
-            else:
-                self.show_styled_message_box("API Error", f"Failed to fetch data from Steam API. Status code: {response.status_code}", QMessageBox.Icon.Warning)
-                
-        except ImportError:
-            self.show_styled_message_box("Missing Dependency", "The 'requests' library is required for API calls.", QMessageBox.Icon.Warning)
-        except Exception as e:
-            self.show_styled_message_box("Error", f"An error occurred while fetching from API: {str(e)}", QMessageBox.Icon.Critical)
+
+        self.tasks.run('api_lookup', lookup_owned_game, STEAM_ID, app_id,
+                       on_result=show_result,
+                       on_error=lambda e: self.show_styled_message_box("API Error", f"An error occurred while fetching from API: {str(e)}", QMessageBox.Icon.Warning))
 
     def lookup_game_from_spreadsheet(self, app_id):
         """Look up game hours from spreadsheet."""
-        try:
-            # Ensure user directory exists before accessing spreadsheet
-            self.ensure_user_directory()
-            # Search for the game in the spreadsheet
-            spreadsheet_path = self.get_user_spreadsheet_path()
-            workbook = openpyxl.load_workbook(spreadsheet_path)
-            
-            if 'Steam Games Playtime' in workbook.sheetnames:
-                sheet = workbook['Steam Games Playtime']
-                game_found = False
-                
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    if len(row) >= 3:
-                        game_name = row[0] if row[0] else "Unknown Game"  # Game Name is column A
-                        sheet_app_id = str(row[1]) if row[1] else ""     # App ID is column B
-                        hours_played = row[2] if row[2] else 0           # Hours is column C
-                        
-                        if sheet_app_id == app_id:
-                            game_found = True
-                            self.show_game_hours_popup(game_name, app_id, f"{hours_played} (from spreadsheet)")
-                            break
-                
-                if not game_found:
-                    self.show_game_not_found_popup(app_id)
+        # Ensure user directory exists before accessing spreadsheet
+        self.ensure_user_directory()
+        spreadsheet_path = self.get_user_spreadsheet_path()
+
+        def show_result(found):
+            if found:
+                game_name, hours_played = found
+                self.show_game_hours_popup(game_name, app_id, f"{hours_played} (from spreadsheet)")
             else:
-                self.show_styled_message_box("Error", "Steam Games Playtime sheet not found in spreadsheet.", QMessageBox.Icon.Warning)
-                
-        except FileNotFoundError:
-            self.show_styled_message_box("File Error", "Spreadsheet file not found.", QMessageBox.Icon.Warning)
-        except Exception as e:
-            self.show_styled_message_box("Error", f"An error occurred: {str(e)}", QMessageBox.Icon.Critical)
+                self.show_game_not_found_popup(app_id)
+
+        self.tasks.run('spreadsheet_lookup', find_game_by_app_id, spreadsheet_path, app_id,
+                       on_result=show_result, on_error=self.show_task_error)
 
     def import_costs_from_csv(self):
         """Import game costs from a CSV file."""
+        if self.tasks.is_running('import'):
+            self.show_styled_message_box("Import Running", "A CSV import is already in progress.", QMessageBox.Icon.Information)
+            return
+        if self.tasks.is_running('sync'):
+            self.show_styled_message_box("Update Running", "Wait for the Steam data update to finish before importing.", QMessageBox.Icon.Information)
+            return
+
         # Open file dialog to select CSV file
         file_dialog = QFileDialog()
         csv_file, _ = file_dialog.getOpenFileName(
@@ -660,6 +969,7 @@ class MainWindow(QMainWindow):
             return
 
         # Create CSV importer and run import
+        from steam_csv_importer import SteamCSVImporter
         importer = SteamCSVImporter(parent_window=self)
         
         # Ensure user directory exists before setting spreadsheet path
@@ -667,176 +977,92 @@ class MainWindow(QMainWindow):
         # Set the user-specific spreadsheet path
         importer.spreadsheet_path = self.get_user_spreadsheet_path()
         
-        try:
-            # Patch: Style QInputDialog drop-down text to white
-            from PyQt6.QtWidgets import QInputDialog
-            QInputDialog.setStyleSheet(QInputDialog(), """
-                QInputDialog {
-                    background-color: #2b2b2b;
-                    color: white;
-                }
-                QLabel {
-                    color: white;
-                }
-                QComboBox {
-                    background-color: #404040;
-                    color: white;
-                    border: 1px solid #666;
-                }
-                QComboBox QAbstractItemView {
-                    background-color: #404040;
-                    color: white;
-                }
-                QPushButton {
-                    background-color: #4CAF50;
-                    color: white;
-                    border: none;
-                    padding: 8px 16px;
-                    margin: 2px;
-                    min-width: 80px;
-                }
-                QPushButton:hover {
-                    background-color: #45a049;
-                }
-            """)
-            success, result = importer.import_from_file(csv_file)
-        except Exception as e:
-            self.show_styled_message_box("Import Error", f"Exception during import: {str(e)}", QMessageBox.Icon.Critical)
-            return
+        # The import shows dialogs so it stays on the UI thread; its workbook loads,
+        # price fetches and save run on the task pool (see SteamCSVImporter._run_blocking)
+        with self.tasks.guard('import') as acquired:
+            if not acquired:
+                self.show_styled_message_box("Import Running", "A CSV import is already in progress.", QMessageBox.Icon.Information)
+                return
+            try:
+                # Patch: Style QInputDialog drop-down text to white
+                from PyQt6.QtWidgets import QInputDialog
+                QInputDialog.setStyleSheet(QInputDialog(), """
+                    QInputDialog {
+                        background-color: #2b2b2b;
+                        color: white;
+                    }
+                    QLabel {
+                        color: white;
+                    }
+                    QComboBox {
+                        background-color: #404040;
+                        color: white;
+                        border: 1px solid #666;
+                    }
+                    QComboBox QAbstractItemView {
+                        background-color: #404040;
+                        color: white;
+                    }
+                    QPushButton {
+                        background-color: #4CAF50;
+                        color: white;
+                        border: none;
+                        padding: 8px 16px;
+                        margin: 2px;
+                        min-width: 80px;
+                    }
+                    QPushButton:hover {
+                        background-color: #45a049;
+                    }
+                """)
+                success, result = importer.import_from_file(csv_file)
+            except Exception as e:
+                self.show_styled_message_box("Import Error", f"Exception during import: {str(e)}", QMessageBox.Icon.Critical)
+                return
 
         if success:
             # Show success message
             stats = result
             message = f"CSV import completed!\n\nGames processed: {stats['games_processed']}\nNew games added: {stats['games_added']}\nGames skipped: {stats['games_skipped']}"
+            # The import rewrote the spreadsheet, so reload the in-memory library
+            self.load_initial_data()
             self.show_success_notification("CSV Import Complete", message)
         else:
             # Show error message
             self.show_styled_message_box("Import Error", result, QMessageBox.Icon.Critical)
 
-    def search_game_stats(self):
-        """Search for game stats by typing the game name."""
-        dialog = QDialog(self)
-        dialog.setWindowTitle('Search Game Stats')
-        dialog.setStyleSheet("""
-            QDialog {
-                background-color: #2b2b2b;
-                color: white;
-            }
-            QLabel {
-                color: white;
-            }
-            QLineEdit {
-                background-color: white;
-                color: black;
-                border: 1px solid #ccc;
-                padding: 5px;
-                margin: 5px 0;
-            }
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                margin: 5px 2px;
-            self.show_styled_message_box("Update Failed", f"Failed to update Steam data: {str(e)}", QMessageBox.Icon.Critical)
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
-        
-        layout = QVBoxLayout()
-        instruction_label = QLabel('Enter game name to search:')
-        layout.addWidget(instruction_label)
-        
-        game_input = CustomTextBox()
-        layout.addWidget(game_input)
-        
-        button_layout = QHBoxLayout()
-        ok_button = QPushButton('Search')
-        cancel_button = QPushButton('Cancel')
-        
-        ok_button.clicked.connect(dialog.accept)
-        cancel_button.clicked.connect(dialog.reject)
-        
-        button_layout.addWidget(ok_button)
-        button_layout.addWidget(cancel_button)
-        layout.addLayout(button_layout)
-        
-        dialog.setLayout(layout)
-        
-        if dialog.exec() != QDialog.DialogCode.Accepted:
-            return
-            
-        game_name = game_input.text().strip()
-        if not game_name:
+    def show_library_table(self):
+        """Open the full-library table (loading the library first if needed)."""
+        if self.library is None:
+            self.ensure_user_directory()
+            self.tasks.run('load_library', load_dashboard_library, self.get_user_spreadsheet_path(),
+                           on_result=lambda library: (self.set_library(library), self.show_library_table()),
+                           on_error=self.show_task_error)
             return
-        
-        try:
-            # Ensure user directory exists before accessing spreadsheet
+
+        if self.library_window is None:
+            from library_table import LibraryTableWindow
+            self.library_window = LibraryTableWindow(self.library, self)
+        self.library_window.setWindowTitle(f"Steam Library - User: {self.current_steam_id}")
+        self.library_window.show()
+        self.library_window.raise_()
+        self.library_window.activateWindow()
+
+    def show_library_insights(self):
+        """Show spend, playtime and value analytics for the whole library."""
+        if self.library is None:
             self.ensure_user_directory()
-            spreadsheet_path = self.get_user_spreadsheet_path()
-            workbook = openpyxl.load_workbook(spreadsheet_path)
-            
-            if 'Steam Games Playtime' in workbook.sheetnames:
-                sheet = workbook['Steam Games Playtime']
-                found_games = []
-                search_lower = game_name.lower()
-                
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    if len(row) >= 6 and row[0]:
-                        game_row_name = str(row[0]).strip()
-                        
-                        if (search_lower == game_row_name.lower() or 
-                            search_lower in game_row_name.lower() or 
-                            game_row_name.lower() in search_lower):
-                            
-                            # Calculate similarity score for sorting
-                            similarity_score = calculate_similarity_score(search_lower, game_row_name.lower())
-                            
-                            found_games.append({
-                                'name': game_row_name,
-                                'app_id': row[1] if row[1] else 'N/A',
-                                'hours': row[2] if row[2] else 0,
-                                'cost': row[3] if row[3] else 0,
-                                'date': row[4] if row[4] else 'N/A',
-                                'method': row[5] if row[5] else 'N/A',
-                                'similarity': similarity_score
-                            })
-                
-                # Sort by similarity score (highest first - best matches first)
-                found_games.sort(key=lambda x: x['similarity'], reverse=True)
-                
-                if found_games:
-                    if len(found_games) == 1:
-                        game = found_games[0]
-                        message = f"Game: {game['name']}\n"
-                        message += f"App ID: {game['app_id']}\n"
-                        message += f"Hours Played: {game['hours']}\n"
-                        message += f"Purchase Cost: ${game['cost']:.2f}\n"
-                        message += f"Purchase Date: {game['date']}\n"
-                        message += f"Purchase Method: {game['method']}"
-                        
-                        self.show_styled_message_box("Game Stats", message, QMessageBox.Icon.Information)
-                    else:
-                        self.show_multiple_game_results(found_games, game_name)
-                else:
-                    self.show_styled_message_box("No Results", f"No games found matching '{game_name}'.", QMessageBox.Icon.Information)
-                    
-            else:
-                self.show_styled_message_box("Error", "Steam Games Playtime sheet not found in spreadsheet.", QMessageBox.Icon.Warning)
-                
-        except FileNotFoundError:
-            self.show_styled_message_box("File Error", "Spreadsheet file not found.", QMessageBox.Icon.Warning)
-        except Exception as e:
-            self.show_styled_message_box("Error", f"An error occurred while searching: {str(e)}", QMessageBox.Icon.Critical)
+            self.tasks.run('load_library', load_dashboard_library, self.get_user_spreadsheet_path(),
+                           on_result=lambda library: (self.set_library(library), self.show_library_insights()),
+                           on_error=self.show_task_error)
+            return
+
+        from library_analytics import get_analytics, format_insights_report
+        report = format_insights_report(get_analytics(self.library))
 
-    def show_multiple_game_results(self, found_games, search_term):
-        """Show multiple game results in a selection dialog."""
-        # Create custom dialog for multiple results
         dialog = QDialog(self)
-        dialog.setWindowTitle(f"Multiple Results for '{search_term}'")
-        dialog.setMinimumSize(600, 400)
+        dialog.setWindowTitle(f"Library Insights - User: {self.current_steam_id}")
+        dialog.setMinimumSize(600, 500)
         dialog.setStyleSheet("""
             QDialog {
                 background-color: #2b2b2b;
@@ -864,43 +1090,99 @@ class MainWindow(QMainWindow):
                 background-color: #45a049;
             }
         """)
-        
+
         layout = QVBoxLayout()
-        
-        # Title
-        title_label = QLabel(f"Found {len(found_games)} games matching '{search_term}':")
-        title_label.setFont(QFont("Arial", 12, QFont.Bold))
+
+        title_label = QLabel(f"Insights for {len(self.library)} library entries:")
+        title_label.setFont(QFont("Arial", 12, QFont.Weight.Bold))
         layout.addWidget(title_label)
-        
-        # Results text area
-        results_text = QTextEdit()
-        results_text.setReadOnly(True)
-        
-        # Format results
-        text_content = ""
-        for i, game in enumerate(found_games, 1):
-            text_content += f"{i}. {game['name']}"
-            # Show similarity score for debugging/transparency
-            if 'similarity' in game:
-                text_content += f" (Match: {game['similarity']:.1f})"
-            text_content += "\n"
-            text_content += f"   App ID: {game['app_id']}\n"
-            text_content += f"   Hours: {game['hours']}\n"
-            text_content += f"   Cost: ${game['cost']:.2f}\n"
-            text_content += f"   Date: {game['date']}\n"
-            text_content += f"   Method: {game['method']}\n\n"
-        
-        results_text.setPlainText(text_content)
-        layout.addWidget(results_text)
-        
-        # Close button
+
+        report_text = QTextEdit()
+        report_text.setReadOnly(True)
+        report_text.setPlainText('\n'.join(report))
+        layout.addWidget(report_text)
+
         close_button = QPushButton('Close')
         close_button.clicked.connect(dialog.accept)
         layout.addWidget(close_button)
-        
+
         dialog.setLayout(layout)
         dialog.exec()
 
+    def show_library_query(self):
+        """Open the query window (building the library's query index in the background first)."""
+        if self.library is None:
+            self.ensure_user_directory()
+            self.tasks.run('load_library', load_dashboard_library, self.get_user_spreadsheet_path(),
+                           on_result=lambda library: (self.set_library(library), self.show_library_query()),
+                           on_error=self.show_task_error)
+            return
+
+        from library_query import get_query_index
+        library = self.library
+        if 'query_index' not in library.derived:
+            self.tasks.run('query_index', get_query_index, library,
+                           on_result=lambda _: self.show_library_query(),
+                           on_error=self.show_task_error)
+            return
+
+        if self.query_window is None:
+            from library_table import LibraryQueryWindow
+            self.query_window = LibraryQueryWindow(library, self)
+        elif self.query_window.library is not library:
+            self.query_window.set_library(library)
+        self.query_window.setWindowTitle(f"Query Library - User: {self.current_steam_id}")
+        self.query_window.show()
+        self.query_window.raise_()
+        self.query_window.activateWindow()
+
+    def search_game_stats(self):
+        """Open the search-as-you-type window (building the library's prefix index in the background first)."""
+        if self.library is None:
+            self.ensure_user_directory()
+            self.tasks.run('load_library', load_dashboard_library, self.get_user_spreadsheet_path(),
+                           on_result=lambda library: (self.set_library(library), self.search_game_stats()),
+                           on_error=self.show_task_error)
+            return
+
+        from name_prefix_index import get_prefix_index
+        library = self.library
+        # Same task key as set_library's rebuild, so a build already running is never started twice
+        action = f'prefix_index_{library.version}'
+        built = 'prefix_index' in library.derived
+        if not built and (self.search_window is None or not self.tasks.is_running(action)):
+            self.tasks.run(action, get_prefix_index, library,
+                           on_result=lambda _: self.search_game_stats(),
+                           on_error=self.show_task_error)
+            return
+
+        if self.search_window is None:
+            from library_table import GameSearchWindow
+            self.search_window = GameSearchWindow(library, self.tasks, self)
+        elif built and self.search_window.library is not library:
+            self.search_window.set_library(library)
+        # Otherwise the open window keeps the previous library until set_library's rebuild switches it
+        self.search_window.setWindowTitle(f"Search Game Stats - User: {self.current_steam_id}")
+        self.search_window.show()
+        self.search_window.raise_()
+        self.search_window.activateWindow()
+        self.search_window.search_input.setFocus()
+
+    def closeEvent(self, event):
+        """Cancel background tasks before the window closes."""
+        self.tasks.shutdown()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+            print(f"UI latency summary written to {self.watchdog.write_summary()}")
+        if memory_budget.is_enabled():
+            print(f"Memory report written to {memory_budget.get_tracker().write_report('gui')}")
+        try:
+            json_path, _ = metrics.export_metrics(run='gui', started=_startup_began)
+            print(f"Metrics written to {json_path}")
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+        super().closeEvent(event)
+
     def show_success_notification(self, title, details):
         """Show a success notification popup."""
         msg_box = QMessageBox(self)
@@ -1025,4 +1307,5 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    startup_timer.mark("Window shown")
     sys.exit(app.exec())
@@ -0,0 +1,181 @@
+"""
+Shared App Catalog
+
+One app table (App ID -> name, type, price history) shared by every tracked
+Steam user. Per-user spreadsheets only need the App ID to find the shared
+data, so names, types and prices are fetched and stored once per app
+instead of once per user.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+import metrics
+from user_paths import get_app_catalog_path
+
+
+class AppCatalog:
+    """App ID keyed table of shared game data, persisted as JSON."""
+
+    def __init__(self, catalog_path=None):
+        self.catalog_path = catalog_path or get_app_catalog_path()
+        self.apps = {}
+        self._name_index = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """Load the catalog from disk (missing or broken files give an empty catalog)."""
+        with self._lock:
+            self.apps = {}
+            try:
+                if os.path.exists(self.catalog_path):
+                    with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                        self.apps = json.load(f).get('apps', {})
+            except Exception as e:
+                print(f"Error loading app catalog: {e}")
+            self._name_index = {
+                entry['name'].lower().strip(): app_id
+                for app_id, entry in self.apps.items() if entry.get('name')
+            }
+            self._dirty = False
+
+    def save(self):
+        """Write the catalog to disk if anything changed since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.catalog_path) or '.', exist_ok=True)
+                temp_path = f"{self.catalog_path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'apps': self.apps}, f, indent=1)
+                os.replace(temp_path, self.catalog_path)
+                self._dirty = False
+            except Exception as e:
+                print(f"Error saving app catalog: {e}")
+
+    def upsert_app(self, app_id, name=None, app_type=None):
+        """Add or update an app entry. Returns True if anything changed."""
+        app_id = str(app_id)
+        with self._lock:
+            entry = self.apps.setdefault(app_id, {'name': '', 'type': '', 'price_history': []})
+            changed = False
+            if name and entry.get('name') != name:
+                if entry.get('name'):
+                    self._name_index.pop(entry['name'].lower().strip(), None)
+                entry['name'] = name
+                self._name_index[name.lower().strip()] = app_id
+                changed = True
+            if app_type and entry.get('type') != app_type:
+                entry['type'] = app_type
+                changed = True
+            if changed:
+                self._dirty = True
+            return changed
+
+    def merge_owned_games(self, games_data):
+        """Merge a GetOwnedGames response into the catalog. Returns the number of changed apps."""
+        changed = 0
+        for game in games_data:
+            app_id = game.get('appid')
+            if app_id is not None and self.upsert_app(app_id, name=game.get('name')):
+                changed += 1
+        return changed
+
+    def get_name(self, app_id, default=None):
+        """Get the shared name for an App ID."""
+        entry = self.apps.get(str(app_id))
+        return entry.get('name') or default if entry else default
+
+    def get_type(self, app_id, default=None):
+        """Get the shared entry type (Game/DLC) for an App ID."""
+        entry = self.apps.get(str(app_id))
+        return entry.get('type') or default if entry else default
+
+    def find_app_id(self, game_name):
+        """Find an App ID by exact (case-insensitive) name."""
+        return self._name_index.get(game_name.lower().strip())
+
+    def latest_price(self, app_id):
+        """Get the most recent price record for an App ID, or None."""
+        entry = self.apps.get(str(app_id))
+        if not entry or not entry.get('price_history'):
+            return None
+        return entry['price_history'][-1]
+
+    def needs_price_refresh(self, app_id, max_age_days=1):
+        """Check whether the cached price for an App ID is missing or too old."""
+        latest = self.latest_price(app_id)
+        if not latest:
+            return True
+        try:
+            fetched = datetime.fromisoformat(latest['date'])
+        except (KeyError, ValueError):
+            return True
+        return datetime.now() - fetched >= timedelta(days=max_age_days)
+
+    def record_price(self, app_id, price_info):
+        """Append a price record, replacing the entry from the same day."""
+        app_id = str(app_id)
+        record = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'original_price': price_info.get('original_price', 0.0),
+            'current_price': price_info.get('current_price', 0.0),
+            'currency': price_info.get('currency', 'USD'),
+            'discount_percent': price_info.get('discount_percent', 0),
+        }
+        with self._lock:
+            entry = self.apps.setdefault(app_id, {'name': '', 'type': '', 'price_history': []})
+            history = entry.setdefault('price_history', [])
+            if history and history[-1].get('date', '')[:10] == record['date'][:10]:
+                history[-1] = record
+            else:
+                history.append(record)
+            self._dirty = True
+
+    def refresh_prices(self, app_ids, fetch_price, max_age_days=1):
+        """
+        Make sure every App ID has a fresh price, fetching each app at most once.
+
+        Args:
+            app_ids (iterable): App IDs to refresh (duplicates are ignored)
+            fetch_price (callable): Function returning price info for an App ID, or None;
+                a 'type' key in it (Game/DLC) is stored as the app's type
+            max_age_days (float): Cached prices younger than this are reused
+
+        Returns:
+            dict: {app_id: latest price record or None}
+        """
+        prices = {}
+        for app_id in app_ids:
+            key = str(app_id)
+            if key in prices:
+                continue
+            if self.needs_price_refresh(key, max_age_days):
+                metrics.inc('cache_requests_total', cache='catalog_price', result='miss')
+                price_info = fetch_price(key)
+                if price_info:
+                    self.record_price(key, price_info)
+                    # The store lookup also says whether the app is a game or DLC
+                    self.upsert_app(key, app_type=price_info.get('type'))
+            else:
+                metrics.inc('cache_requests_total', cache='catalog_price', result='hit')
+            prices[key] = self.latest_price(key)
+        self.save()
+        return prices
+
+
+_shared_catalog = None
+_shared_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Get the process-wide shared app catalog."""
+    global _shared_catalog
+    with _shared_catalog_lock:
+        if _shared_catalog is None:
+            _shared_catalog = AppCatalog()
+        return _shared_catalog
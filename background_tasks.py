@@ -0,0 +1,187 @@
+"""
+Background Task Runner
+
+Runs long MainWindow operations (Steam sync, price fetching, workbook loads,
+fuzzy searches) on a Qt thread pool so the event loop never freezes.
+
+Each task is registered under an action name. Only one task per action can
+run at a time (single-flight), tasks can be cancelled cooperatively, and
+progress/result/error are delivered back on the UI thread through signals.
+"""
+from contextlib import contextmanager
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QEventLoop, pyqtSignal
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task when it notices it has been cancelled."""
+
+
+class TaskContext:
+    """Passed to tasks started with context=True for progress reports and cancellation checks."""
+
+    def __init__(self, signals):
+        self._signals = signals
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def check_cancelled(self):
+        """Raise TaskCancelled if the task has been cancelled."""
+        if self._cancelled:
+            raise TaskCancelled()
+
+    def report(self, progress):
+        """Send a progress value (number, text or any object) to the UI thread."""
+        self._signals.progress.emit(progress)
+
+
+class TaskSignals(QObject):
+    progress = pyqtSignal(object)
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+
+class TaskWorker(QRunnable):
+    """QRunnable that calls a function and reports the outcome through TaskSignals."""
+
+    def __init__(self, fn, args, kwargs, pass_context):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        self.context = TaskContext(self.signals)
+        self.pass_context = pass_context
+        self.setAutoDelete(False)  # The runner keeps the worker alive until finished is handled
+
+    def run(self):
+        try:
+            if self.pass_context:
+                result = self.fn(*self.args, task=self.context, **self.kwargs)
+            else:
+                result = self.fn(*self.args, **self.kwargs)
+            if self.context.is_cancelled():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.result.emit(result)
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            print(f"Background task {getattr(self.fn, '__name__', self.fn)} failed: {type(e).__name__}")
+            self.signals.error.emit(e)
+        finally:
+            self.signals.finished.emit()
+
+
+class TaskRunner(QObject):
+    """Thread pool wrapper with a single-flight guard per action name."""
+
+    def __init__(self, parent=None, max_threads=4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._active = {}  # action name -> TaskWorker, or None for UI-side guards
+
+    def is_running(self, action):
+        """Check whether a task (or guarded UI flow) is running for an action."""
+        return action in self._active
+
+    def run(self, action, fn, *args, on_result=None, on_error=None, on_progress=None,
+            on_cancelled=None, on_finished=None, context=False, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the thread pool.
+
+        Args:
+            action (str): Single-flight key; a second run for a busy action is refused
+            fn (callable): Function to run off the UI thread
+            on_result, on_error, on_progress, on_cancelled, on_finished: UI-thread callbacks
+            context (bool): Pass a TaskContext to fn as the 'task' keyword argument
+
+        Returns:
+            bool: True if the task was started, False if the action was already running
+        """
+        if action in self._active:
+            print(f"Task '{action}' is already running; ignoring new request")
+            return False
+
+        worker = TaskWorker(fn, args, kwargs, context)
+        if on_result:
+            worker.signals.result.connect(on_result)
+        if on_error:
+            worker.signals.error.connect(on_error)
+        if on_progress:
+            worker.signals.progress.connect(on_progress)
+        if on_cancelled:
+            worker.signals.cancelled.connect(on_cancelled)
+        worker.signals.finished.connect(lambda: self._task_finished(action, worker, on_finished))
+
+        self._active[action] = worker
+        self.pool.start(worker)
+        return True
+
+    def _task_finished(self, action, worker, on_finished):
+        if self._active.get(action) is worker:
+            del self._active[action]
+        if on_finished:
+            on_finished()
+
+    def cancel(self, action):
+        """Ask a running task to stop. Returns True if there was a task to cancel."""
+        worker = self._active.get(action)
+        if worker is None:
+            return False
+        worker.context.cancel()
+        return True
+
+    def cancel_all(self):
+        for worker in list(self._active.values()):
+            if worker is not None:
+                worker.context.cancel()
+
+    @contextmanager
+    def guard(self, action):
+        """
+        Single-flight guard for flows that must stay on the UI thread (e.g. ones showing dialogs).
+
+        Yields True if the action was acquired, False if it is already running.
+        """
+        if action in self._active:
+            yield False
+            return
+        self._active[action] = None
+        try:
+            yield True
+        finally:
+            if self._active.get(action) is None:
+                self._active.pop(action, None)
+
+    def wait_for(self, fn, *args, **kwargs):
+        """
+        Run fn off the UI thread and wait for it while keeping the event loop responsive.
+
+        Used inside UI-thread flows (such as the CSV import dialogs) for blocking work
+        like workbook loads, saves and price fetches. Returns fn's result or re-raises its error.
+        """
+        outcome = {}
+        loop = QEventLoop()
+        worker = TaskWorker(fn, args, kwargs, False)
+        worker.signals.result.connect(lambda value: outcome.setdefault('result', value))
+        worker.signals.error.connect(lambda error: outcome.setdefault('error', error))
+        worker.signals.finished.connect(loop.quit)
+        self.pool.start(worker)
+        loop.exec()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome.get('result')
+
+    def shutdown(self, timeout_ms=5000):
+        """Cancel everything and wait for running tasks to finish."""
+        self.cancel_all()
+        self.pool.waitForDone(timeout_ms)
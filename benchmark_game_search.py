@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the name matching in game_search: bounded vs full Levenshtein
+distance, the vectorized BatchScorer pass over a whole catalog, and
+find_best_matches as a full scan of the game list vs the GameNameIndex,
+with the share of names that still needed a Levenshtein distance, and the
+search-as-you-type NamePrefixIndex per keystroke.
+
+Library names are the games of the committed purchase history
+(ExcelFiles/<id>/Book1_cleaned.csv) padded with generated Steam-like titles
+up to each catalog size. Searches are those purchase names as bought, with
+an edition suffix, with a typo or cut to two words, plus a few sequel and
+abbreviation searches, run the way the importer runs them (threshold 50,
+5 results; threshold 200, 3 results).
+
+Indexed results are compared with the full scan (every search up to 1000
+names, a sample above); any difference is printed and makes the script exit
+with code 1.
+
+    python benchmark_game_search.py
+    python benchmark_game_search.py --sizes 1000 100000 --scan-queries 5
+
+The as-you-type part types each search one character at a time and times
+the prefix lookup (what the search dialog runs for every keystroke) and the
+fuzzy fallback (run off the UI thread); a sample of the prefix match counts is
+checked against a scan of every name.
+
+The Levenshtein part pairs purchase names with library names (real Steam
+title lengths) and times the distance with no bound, with the bounds
+calculate_similarity_score derives from a minimum score, and the score
+itself with and without that minimum.
+"""
+import argparse
+import glob
+import random
+import sys
+import time
+from contextlib import contextmanager
+
+import game_search
+from game_search import (GameNameIndex, _scan_best_matches, calculate_similarity_score, find_best_matches,
+                         levenshtein_distance)
+from name_normalization import normalize_numbers_in_title, search_key
+from name_prefix_index import FUZZY_LIMIT, FUZZY_MIN_LENGTH, NamePrefixIndex
+from purchase_import import parse_purchase_csv
+from steam_library import SteamLibrary
+
+FALLBACK_NAMES = [
+    "Call of Duty", "Call of Duty 2", "Call of Duty 3", "Grand Theft Auto V", "GTA V",
+    "Assassin's Creed", "Assassin's Creed II", "Assassin's Creed Valhalla", "The Witcher 3: Wild Hunt",
+    "Dark Souls III", "Final Fantasy VII Remake", "Half-Life 2", "Portal 2", "Stardew Valley",
+]
+EXTRA_SEARCHES = ["call of duty 2", "gta 5", "assassins creed", "witcher 3", "dark souls 3", "half life 2"]
+SUFFIXES = ["", "", "", " - Deluxe Edition", " - Game of the Year Edition", " Remastered", " Soundtrack",
+            " - Season Pass", " Demo", ": Definitive Edition"]
+NUMERALS = ["", "", "", " 2", " 3", " II", " III", " IV", " 2077", " 1998"]
+
+
+def load_names():
+    names = []
+    for path in sorted(glob.glob('ExcelFiles/*/Book1_cleaned.csv')):
+        for purchase in parse_purchase_csv(path):
+            names.extend(purchase['bundle_games'])
+    names = list(dict.fromkeys(name for name in names if name))
+    return names or list(FALLBACK_NAMES)
+
+
+def build_catalog(names, size, rng):
+    """The real names plus generated titles made from their words, in random order."""
+    words = sorted({word for name in names for word in name.replace(':', ' ').split() if len(word) > 1})
+    catalog = list(names)
+    while len(catalog) < size:
+        title = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        catalog.append(title + rng.choice(NUMERALS) + rng.choice(SUFFIXES))
+    catalog = catalog[:size]
+    rng.shuffle(catalog)
+    return [{'name': name, 'app_id': str(10 + i)} for i, name in enumerate(catalog)]
+
+
+def make_typo(name, rng):
+    if len(name) < 6:
+        return name
+    i = rng.randrange(1, len(name) - 2)
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def build_searches(names, count, rng):
+    searches = list(EXTRA_SEARCHES)
+    for name in rng.sample(names, min(count, len(names))):
+        choice = rng.random()
+        if choice < 0.4:
+            searches.append(name)
+        elif choice < 0.6:
+            searches.append(name + " - Deluxe Edition")
+        elif choice < 0.8:
+            searches.append(make_typo(name, rng))
+        else:
+            searches.append(' '.join(name.split()[:2]))
+    return [search.lower().strip() for search in searches]
+
+
+@contextmanager
+def count_levenshtein_calls(counter):
+    """Count levenshtein_distance calls made by the scoring while the block runs."""
+    original = game_search.levenshtein_distance
+
+    def counting(s1, s2, max_distance=None):
+        counter[0] += 1
+        if len(s1) < len(s2):
+            s1, s2 = s2, s1
+        return original(s1, s2, max_distance)
+    game_search.levenshtein_distance = counting
+    try:
+        yield
+    finally:
+        game_search.levenshtein_distance = original
+
+
+def _time(fn, pairs, *args):
+    start = time.perf_counter()
+    results = [fn(a, b, *args) for a, b in pairs]
+    return (time.perf_counter() - start) / len(pairs), results
+
+
+def run_levenshtein(catalog, searches, count, rng):
+    """Time bounded against full Levenshtein on search/name pairs; returns the number of wrong results."""
+    pairs = [(rng.choice(searches), rng.choice(catalog)['name'].lower()) for _ in range(count)]
+    lengths = sorted(len(name) for _, name in pairs)
+    print(f"Levenshtein on {count} pairs, library name length median {lengths[len(lengths) // 2]}, "
+          f"90th percentile {lengths[len(lengths) * 9 // 10]}, max {lengths[-1]}")
+
+    full_seconds, full = _time(levenshtein_distance, pairs)
+    print(f"  {'full':<28}{full_seconds * 1e6:>9.1f} us/pair")
+    wrong = 0
+    for fraction in (0.5, 0.25, 0.1):
+        bounds = [int(max(len(a), len(b)) * fraction) for a, b in pairs]
+        start = time.perf_counter()
+        bounded = [levenshtein_distance(a, b, bound) for (a, b), bound in zip(pairs, bounds)]
+        seconds = (time.perf_counter() - start) / count
+        wrong += sum(1 for distance, capped, bound in zip(full, bounded, bounds) if capped != min(distance, bound + 1))
+        print(f"  {f'max distance {fraction:.0%} of length':<28}{seconds * 1e6:>9.1f} us/pair  "
+              f"speedup {full_seconds / seconds:>5.1f}x")
+
+    score_seconds, scores = _time(calculate_similarity_score, pairs)
+    print(f"  {'score':<28}{score_seconds * 1e6:>9.1f} us/pair")
+    for min_score in (50, 200):
+        seconds, bounded_scores = _time(calculate_similarity_score, pairs, min_score)
+        wrong += sum(1 for score, bounded in zip(scores, bounded_scores)
+                     if (score >= min_score and bounded != score) or (score < min_score and bounded >= min_score))
+        print(f"  {f'score, min_score={min_score}':<28}{seconds * 1e6:>9.1f} us/pair  "
+              f"speedup {score_seconds / seconds:>5.1f}x")
+    if wrong:
+        print(f"  {wrong} bounded results differ from the full calculation")
+    return wrong
+
+
+def run(catalog, searches, scan_queries, rng):
+    index = GameNameIndex(catalog)
+    start = time.perf_counter()
+    index.find_best_matches('warm up')  # Builds the index
+    build_seconds = time.perf_counter() - start
+
+    mismatches = 0
+    index_seconds = 0.0
+    index_calls = [0]
+    with count_levenshtein_calls(index_calls):
+        for search in searches:
+            for threshold, max_results in ((50, 5), (200, 3)):
+                start = time.perf_counter()
+                find_best_matches(search, index, threshold=threshold, max_results=max_results)
+                index_seconds += time.perf_counter() - start
+
+    start = time.perf_counter()
+    for search in searches:
+        index.upper_bounds(search)
+    batch_seconds = (time.perf_counter() - start) / len(searches)
+
+    scan_seconds = 0.0
+    scan_calls = [0]
+    checked = searches if scan_queries is None else rng.sample(searches, min(scan_queries, len(searches)))
+    for search in checked:
+        for threshold, max_results in ((50, 5), (200, 3)):
+            start = time.perf_counter()
+            with count_levenshtein_calls(scan_calls):
+                expected = _scan_best_matches(search, catalog, threshold, max_results)
+            scan_seconds += time.perf_counter() - start
+            actual = index.find_best_matches(search, threshold, max_results)
+            if expected != actual:
+                mismatches += 1
+                print(f"  MISMATCH for '{search}' (threshold {threshold}):")
+                print(f"    scan:  {[(m['name'], round(m['score'], 3)) for m in expected]}")
+                print(f"    index: {[(m['name'], round(m['score'], 3)) for m in actual]}")
+
+    searches_run = len(searches) * 2
+    scans_run = len(checked) * 2
+    print(f"{len(catalog):>8} names  build {build_seconds * 1000:>8.1f} ms  "
+          f"batch pass {batch_seconds * 1000:>7.2f} ms  "
+          f"index {index_seconds / searches_run * 1000:>8.2f} ms/search  "
+          f"scan {scan_seconds / scans_run * 1000:>9.2f} ms/search  "
+          f"speedup {scan_seconds / scans_run / (index_seconds / searches_run):>7.1f}x  "
+          f"checked {scans_run}, mismatches {mismatches}")
+    print(f"{'':>8}        Levenshtein run for {index_calls[0] / searches_run / len(catalog):.2%} of names (index), "
+          f"{scan_calls[0] / scans_run / len(catalog):.2%} (scan)")
+    return mismatches
+
+
+def _percentiles(seconds):
+    seconds = sorted(seconds)
+    return (f"mean {sum(seconds) / len(seconds) * 1000:>6.2f}  p95 {seconds[len(seconds) * 95 // 100] * 1000:>6.2f}  "
+            f"max {seconds[-1] * 1000:>6.2f} ms")
+
+
+def _prefix_count(index, text):
+    """Games with a name, or a word in it, starting with the text, counted the slow way."""
+    key = ' ' + search_key(text)
+    count = 0
+    for game in index.games:
+        keys = {search_key(variation) for variation in normalize_numbers_in_title(game['name'])}
+        if any((' ' + name_key).find(key) != -1 for name_key in keys):
+            count += 1
+    return count
+
+
+def run_as_you_type(catalog, searches, checks, rng, limit=25):
+    """Time the prefix lookup and fuzzy fallback per keystroke; returns the number of wrong match counts."""
+    start = time.perf_counter()
+    index = NamePrefixIndex(SteamLibrary(catalog))
+    build_seconds = time.perf_counter() - start
+
+    keystrokes = [search[:end] for search in searches for end in range(1, len(search) + 1)]
+    prefix_seconds = []
+    fuzzy_seconds = []
+    for text in keystrokes:
+        start = time.perf_counter()
+        results, _ = index.prefix_matches(text, limit)
+        prefix_seconds.append(time.perf_counter() - start)
+        if len(results) < limit and len(text) >= FUZZY_MIN_LENGTH:
+            start = time.perf_counter()
+            index.fuzzy_matches(text, min(limit - len(results), FUZZY_LIMIT), {result['index'] for result in results})
+            fuzzy_seconds.append(time.perf_counter() - start)
+
+    wrong = 0
+    for text in rng.sample(keystrokes, min(checks, len(keystrokes))):
+        _, total = index.prefix_matches(text, limit)
+        expected = _prefix_count(index, text)
+        if total != expected:
+            wrong += 1
+            print(f"  WRONG prefix count for '{text}': {total}, expected {expected}")
+
+    print(f"{len(catalog):>8} names  as-you-type index build {build_seconds * 1000:>8.1f} ms, "
+          f"{len(index.keys)} keys, {len(keystrokes)} keystrokes")
+    print(f"{'':>8}        prefix lookup  {_percentiles(prefix_seconds)}")
+    if fuzzy_seconds:
+        print(f"{'':>8}        fuzzy fallback {_percentiles(fuzzy_seconds)}  ({len(fuzzy_seconds)} keystrokes)")
+    return wrong
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark find_best_matches with and without the name index.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="Catalog sizes")
+    parser.add_argument('--searches', type=int, default=100, help="Purchase names searched per size")
+    parser.add_argument('--scan-queries', type=int, default=10,
+                        help="Searches also run as a full scan on catalogs over 1000 names (all on smaller ones)")
+    parser.add_argument('--prefix-checks', type=int, default=20,
+                        help="As-you-type keystrokes whose prefix match count is checked against a scan")
+    parser.add_argument('--pairs', type=int, default=20000, help="Name pairs for the Levenshtein benchmark")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    names = load_names()
+    print(f"{len(names)} purchased game names, {args.searches} searches per size")
+    mismatches = run_levenshtein(build_catalog(names, 5000, rng), build_searches(names, args.searches, rng),
+                                 args.pairs, rng)
+    for size in args.sizes:
+        catalog = build_catalog(names, size, rng)
+        searches = build_searches(names, args.searches, rng)
+        mismatches += run(catalog, searches, None if size <= 1000 else args.scan_queries, rng)
+        mismatches += run_as_you_type(catalog, searches, args.prefix_checks, rng)
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
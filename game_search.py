@@ -3,176 +3,37 @@
 Game Similarity Scoring Utilities
 
 This module provides enhanced similarity scoring algorithms for matching game names.
-Used by both the main application search and CSV import functionality.
+Used by both the main application search and CSV import functionality. Name
+normalization (edition suffixes, numerals) is in name_normalization.
 """
-import re
-
-
-# Common game edition suffixes for normalization
-EDITION_SUFFIXES = [
-    ' (pre-purchase)',
-    ' - standard edition',
-    ' - deluxe edition',
-    ' - ultimate edition',
-    ' - game of the year edition',
-    ' - goty edition',
-    ' - collector\'s edition',
-    ' - special edition',
-    ' - limited edition',
-    ' - enhanced edition',
-    ' - definitive edition',
-    ' - complete edition',
-    ' - gold edition',
-    ' - platinum edition',
-    ' - premium edition',
-    ' - remastered edition',
-    ' remastered edition',
-    ' - remastered',
-    ' remastered',
-    'standard edition (pre-purchase)',
-    # Variations without dashes
-    ' standard edition',
-    ' deluxe edition',
-    ' ultimate edition',
-    ' game of the year edition',
-    ' goty edition',
-    ' collector\'s edition',
-    ' special edition',
-    ' limited edition',
-    ' enhanced edition',
-    ' definitive edition',
-    ' complete edition',
-    ' gold edition',
-    ' platinum edition',
-    ' premium edition',
-]
-
-
-def extract_numbers(text):
-    """Extract all numbers from text as a set."""
-    numbers = re.findall(r'\d+', text)
-    return set(numbers)
-
-
-def roman_to_int(roman):
-    """Convert Roman numeral to integer."""
-    if not roman:
-        return None
-    
-    roman = roman.upper()
-    roman_numerals = {
-        'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100, 'D': 500, 'M': 1000
-    }
-    
-    total = 0
-    prev_value = 0
-    
-    for char in reversed(roman):
-        if char not in roman_numerals:
-            return None
-        value = roman_numerals[char]
-        if value < prev_value:
-            total -= value
-        else:
-            total += value
-        prev_value = value
-    
-    return total
+import heapq
+import math
+import sys
+from collections import defaultdict
 
+import numpy as np
 
-def int_to_roman(num):
-    """Convert integer to Roman numeral."""
-    if not isinstance(num, int) or num <= 0 or num > 3999:
-        return None
-    
-    values = [1000, 900, 500, 400, 100, 90, 50, 40, 10, 9, 5, 4, 1]
-    numerals = ['M', 'CM', 'D', 'CD', 'C', 'XC', 'L', 'XL', 'X', 'IX', 'V', 'IV', 'I']
-    
-    result = ''
-    for i, value in enumerate(values):
-        count = num // value
-        result += numerals[i] * count
-        num -= value * count
-    
-    return result
+# Normalization lives in name_normalization; the names are kept here for existing imports
+from name_normalization import (EDITION_SUFFIXES, extract_numbers, int_to_roman, normalize_game_name,
+                                normalize_numbers_in_title, parse_amount, roman_to_int)
+from profiling import profiled
 
 
-def normalize_numbers_in_title(title):
-    """Convert numbers to both Roman and Arabic numerals for comparison."""
-    # Pattern to find Roman numerals (I, II, III, IV, V, etc.)
-    roman_pattern = r'\b([IVX]+)\b'
-    # Pattern to find Arabic numbers
-    arabic_pattern = r'\b(\d+)\b'
-    
-    # Normalize punctuation for better matching
-    normalized_title = re.sub(r'[:\-\–\—]', ' ', title)  # Replace colons, hyphens, dashes with spaces
-    normalized_title = re.sub(r'\s+', ' ', normalized_title).strip()  # Collapse multiple spaces
-    
-    variations = [normalized_title.lower()]
-    
-    # Convert Roman numerals to Arabic
-    for match in re.finditer(roman_pattern, normalized_title, re.IGNORECASE):
-        roman = match.group(1)
-        arabic = roman_to_int(roman)
-        if arabic:
-            # Create variation with Arabic numeral
-            variation = normalized_title[:match.start()] + str(arabic) + normalized_title[match.end():]
-            variation = re.sub(r'\s+', ' ', variation).strip()  # Clean up spaces
-            variations.append(variation.lower())
-    
-    # Convert Arabic numbers to Roman
-    for match in re.finditer(arabic_pattern, normalized_title):
-        num = int(match.group(1))
-        roman = int_to_roman(num)
-        if roman:
-            # Create variation with Roman numeral
-            variation = normalized_title[:match.start()] + roman + normalized_title[match.end():]
-            variation = re.sub(r'\s+', ' ', variation).strip()  # Clean up spaces
-            variations.append(variation.lower())
-    
-    return variations
+# Common abbreviations that get a bonus when the full name is in the game name
+ABBREVIATIONS = {
+    'gta': 'grand theft auto',
+    'cod': 'call of duty',
+    'ac': 'assassins creed',
+    'bf': 'battlefield',
+    'csgo': 'counter strike global offensive',
+    'dota': 'defense of the ancients',
+    'lol': 'league of legends',
+    'wow': 'world of warcraft'
+}
 
 
-def extract_cost_from_string(cost_str):
-    """Extract numeric cost from a string like '$39.94' or '($1.11)'."""
-    if not cost_str:
-        return 0
-    
-    # Remove currency symbols and spaces
-    clean_str = re.sub(r'[^\d\.\-\(\)]', '', cost_str)
-    
-    # Handle parentheses (negative values)
-    if '(' in clean_str and ')' in clean_str:
-        clean_str = clean_str.replace('(', '').replace(')', '')
-        negative = True
-    else:
-        negative = False
-    
-    try:
-        value = float(clean_str)
-        return -value if negative else value
-    except ValueError:
-        return 0
-
-
-def normalize_game_name(game_name):
-    """
-    Normalize a game name by removing common edition suffixes.
-    
-    Args:
-        game_name (str): The game name to normalize
-        
-    Returns:
-        tuple: (base_name, removed_suffix) where removed_suffix is None if no suffix was found
-    """
-    clean_name = game_name.lower().strip()
-    
-    for suffix in EDITION_SUFFIXES:
-        if clean_name.endswith(suffix):
-            base_name = clean_name[:-len(suffix)].strip()
-            return base_name, suffix
-    
-    return clean_name, None
+# The purchase CSV amount parser, under its old name
+extract_cost_from_string = parse_amount
 
 
 def is_edition_variant(game_name1, game_name2):
@@ -236,10 +97,19 @@ def calculate_missing_text_penalty(search_term, game_name):
     return penalty
 
 
-def levenshtein_distance(s1, s2):
-    """Calculate Levenshtein distance between two strings."""
+def levenshtein_distance(s1, s2, max_distance=None):
+    """
+    Calculate Levenshtein distance between two strings.
+    
+    With max_distance, only the diagonal band of that width is computed and the
+    calculation stops as soon as every cell in a row is over it; any distance
+    over max_distance is then returned as max_distance + 1.
+    """
     if len(s1) < len(s2):
-        return levenshtein_distance(s2, s1)
+        return levenshtein_distance(s2, s1, max_distance)
+    
+    if max_distance is not None:
+        return _bounded_levenshtein_distance(s1, s2, max_distance)
     
     if len(s2) == 0:
         return len(s1)
@@ -257,7 +127,47 @@ def levenshtein_distance(s1, s2):
     return previous_row[-1]
 
 
-def calculate_similarity_score(search_term, game_name):
+def _bounded_levenshtein_distance(s1, s2, max_distance):
+    """Levenshtein distance capped at max_distance + 1 (s1 is the longer string)."""
+    too_far = max_distance + 1
+    n = len(s2)
+    # The length difference alone is a lower bound of the distance
+    if len(s1) - n > max_distance:
+        return too_far
+    if n == 0:
+        return len(s1)
+    
+    # Two rows reused for the whole calculation; cells outside the band hold too_far
+    previous_row = [j if j <= max_distance else too_far for j in range(n + 1)]
+    current_row = [too_far] * (n + 1)
+    for i in range(1, len(s1) + 1):
+        c1 = s1[i - 1]
+        low = i - max_distance if i > max_distance else 1
+        high = i + max_distance if i + max_distance < n else n
+        current_row[low - 1] = i if low == 1 and i < too_far else too_far
+        row_min = current_row[low - 1]
+        left = row_min
+        for j in range(low, high + 1):
+            value = previous_row[j - 1] + (c1 != s2[j - 1])
+            if previous_row[j] + 1 < value:
+                value = previous_row[j] + 1
+            if left + 1 < value:
+                value = left + 1
+            if value > too_far:
+                value = too_far
+            current_row[j] = left = value
+            if value < row_min:
+                row_min = value
+        if high < n:
+            current_row[high + 1] = too_far
+        if row_min > max_distance:
+            return too_far
+        previous_row, current_row = current_row, previous_row
+    
+    return previous_row[n]
+
+
+def calculate_similarity_score(search_term, game_name, min_score=None):
     """
     Calculate similarity score between search term and game name (higher = better match).
     
@@ -272,6 +182,8 @@ def calculate_similarity_score(search_term, game_name):
     Args:
         search_term (str): The search query
         game_name (str): The game name to compare against
+        min_score (float): Only scores from here up are needed exactly; the Levenshtein
+            distance is then bounded, and a lower score comes back as some value below min_score
         
     Returns:
         float: Similarity score (higher = better match)
@@ -305,22 +217,10 @@ def calculate_similarity_score(search_term, game_name):
     # Missing text penalty - penalize based on how much text is missing
     missing_text_penalty = calculate_missing_text_penalty(search_term, game_name)
     
-    # Special bonus for common abbreviations
-    abbreviation_mappings = {
-        'gta': 'grand theft auto',
-        'cod': 'call of duty',
-        'ac': 'assassins creed',
-        'bf': 'battlefield',
-        'csgo': 'counter strike global offensive',
-        'dota': 'defense of the ancients',
-        'lol': 'league of legends',
-        'wow': 'world of warcraft'
-    }
-    
     # Check if search is an abbreviation
     search_lower = search_term.lower()
     abbreviation_matched = False
-    for abbr, full_name in abbreviation_mappings.items():
+    for abbr, full_name in ABBREVIATIONS.items():
         if search_lower.startswith(abbr) and full_name in game_name.lower():
             score += 300  # Stronger bonus for recognized abbreviations
             # Also reduce missing text penalty for abbreviations
@@ -362,62 +262,414 @@ def calculate_similarity_score(search_term, game_name):
     if total_chars > 0:
         score += (char_overlap / total_chars) * 30
     
+    # Bonuses added after the Levenshtein bonus
+    contains_search = search_term in game_name
+    contained_in_search = len(game_name) <= len(search_term) and game_name in search_term
+    
     # Levenshtein distance (similarity) bonus
-    distance = levenshtein_distance(search_term, game_name)
     max_len = max(len(search_term), len(game_name))
+    max_distance = None
+    if min_score is not None and max_len > 0:
+        # Largest distance that still lets the score reach min_score
+        needed = min_score - score - (50 if contains_search else 0) - (30 if contained_in_search else 0)
+        max_distance = math.floor(max_len - needed * max_len / 40 + 1e-9)
+        if max_distance < abs(len(search_term) - len(game_name)):
+            # Out of reach even at the smallest distance the lengths allow; anything below min_score will do
+            return score
+        if max_distance >= max_len:
+            max_distance = None
+    distance = levenshtein_distance(search_term, game_name, max_distance)
     if max_len > 0:
         similarity = (max_len - distance) / max_len
         score += similarity * 40
     
     # Bonus for game name containing search term as substring
-    if search_term in game_name:
+    if contains_search:
         score += 50
     
     # Bonus for search term containing game name (if game name is short)
-    if len(game_name) <= len(search_term) and game_name in search_term:
+    if contained_in_search:
         score += 30
     
     return score
 
 
+def _match_info(game, game_name, score):
+    match_info = {
+        'name': game_name,
+        'score': score
+    }
+    
+    # If original was a dict, preserve other data
+    if isinstance(game, dict):
+        match_info.update({k: v for k, v in game.items() if k != 'name'})
+    return match_info
+
+
+def _scan_best_matches(search_term, game_list, threshold, max_results):
+    """Score the games of a list one by one, keeping the best max_results in a bounded heap."""
+    if max_results is not None and max_results <= 0:
+        return []
+    search = search_term.lower()
+    
+    # Best (score, -position) kept so far; the smallest is the one to beat
+    best = []
+    for position, game in enumerate(game_list):
+        # Handle both string lists and dict lists
+        game_name = game if isinstance(game, str) else game.get('name', '')
+        if not game_name:
+            continue
+        
+        # Once max_results are kept, only a score that reaches the k-th best can change them
+        cutoff = threshold
+        if max_results is not None and len(best) >= max_results and best[0][0] > cutoff:
+            cutoff = best[0][0]
+        score = calculate_similarity_score(search, game_name.lower(), min_score=cutoff)
+        if score < cutoff:
+            continue
+        
+        entry = (score, -position)
+        if max_results is None or len(best) < max_results:
+            heapq.heappush(best, entry)
+        elif entry > best[0]:
+            heapq.heapreplace(best, entry)
+    
+    # Sort by score (highest first), list order among equal scores
+    matches = []
+    for score, negative_position in sorted(best, reverse=True):
+        game = game_list[-negative_position]
+        game_name = game if isinstance(game, str) else game.get('name', '')
+        matches.append(_match_info(game, game_name, score))
+    return matches
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _popcount(values):
+    """Set bits per element of a uint64 array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    bytes_view = values.view(np.uint8).reshape(values.shape + (8,))
+    return _BYTE_POPCOUNT[bytes_view].sum(axis=-1)
+
+
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class BatchScorer:
+    """
+    Vectorized calculate_similarity_score of one search against every name of a game list.
+
+    Per-name features are computed once: lengths, character-set bitmasks, number
+    counts, plus word, number and character-trigram postings. A search then scores
+    the whole list in a few NumPy operations, everything except the Levenshtein
+    bonus; upper_bounds() adds the best Levenshtein bonus the two lengths allow,
+    scores() the real one for the names that can still reach min_score.
+
+    Scores agree with calculate_similarity_score to rounding (SCORE_TOLERANCE).
+    The game list is kept by reference; games appended to it are picked up on the
+    next search.
+    """
+
+    # Largest difference to calculate_similarity_score (float sums in another order)
+    SCORE_TOLERANCE = 1e-6
+
+    def __init__(self, game_list=None):
+        self.games = game_list if game_list is not None else []
+        self.indexed = 0
+        self.names = []                     # lowercase name per position (None if no name)
+        self.exact_names = defaultdict(list)
+        self.words = defaultdict(list)      # word -> positions
+        self.number_index = defaultdict(list)
+        self.trigrams = defaultdict(list)   # character trigram -> positions
+        self.char_bits = {}                 # character -> bit in the masks
+        capacity = 1024
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.lengths = np.zeros(capacity, dtype=np.int32)
+        self.stripped_lengths = np.zeros(capacity, dtype=np.int32)
+        self.number_counts = np.zeros(capacity, dtype=np.int32)
+        self.char_counts = np.zeros(capacity, dtype=np.int32)
+        self.char_masks = np.zeros((capacity, 1), dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.games)
+
+    def memory_bytes(self):
+        arrays = [self.valid, self.lengths, self.stripped_lengths, self.number_counts, self.char_counts,
+                  self.char_masks]
+        total = sum(array.nbytes for array in arrays) + sys.getsizeof(self.names)
+        for index in (self.exact_names, self.words, self.number_index, self.trigrams):
+            total += sys.getsizeof(index) + sum(sys.getsizeof(positions) for positions in index.values())
+        return total + sum(sys.getsizeof(name) for name in self.names if name)
+
+    def _grow(self, size):
+        capacity = len(self.valid)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for attribute in ('valid', 'lengths', 'stripped_lengths', 'number_counts', 'char_counts', 'char_masks'):
+            old = getattr(self, attribute)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attribute, new)
+
+    def _query_mask(self, chars):
+        mask = np.zeros(self.char_masks.shape[1], dtype=np.uint64)
+        for char in chars:
+            bit = self.char_bits.get(char)
+            if bit is not None:
+                mask[bit // 64] |= np.uint64(1 << (bit % 64))
+        return mask
+
+    def _sync(self):
+        """Index games appended to the list since the last search."""
+        start = self.indexed
+        if start == len(self.games):
+            return
+        self._grow(len(self.games))
+        rows = []  # (position, name, numbers, character mask) of the new named games
+        for position in range(start, len(self.games)):
+            game = self.games[position]
+            game_name = game if isinstance(game, str) else game.get('name', '')
+            if not game_name:
+                self.names.append(None)
+                continue
+            name = game_name.lower()
+            self.names.append(name)
+            self.exact_names[name].append(position)
+            numbers = extract_numbers(name)
+            for word in set(name.split()):
+                self.words[word].append(position)
+            for number in numbers:
+                self.number_index[number].append(position)
+            for trigram in _trigrams(name):
+                self.trigrams[trigram].append(position)
+            mask = 0
+            for char in set(name):
+                bit = self.char_bits.get(char)
+                if bit is None:
+                    bit = self.char_bits[char] = len(self.char_bits)
+                mask |= 1 << bit
+            rows.append((position, name, len(numbers), mask))
+        self.indexed = len(self.games)
+        if not rows:
+            return
+
+        mask_words = (len(self.char_bits) + 63) // 64
+        if mask_words > self.char_masks.shape[1]:
+            extra = np.zeros((len(self.char_masks), mask_words - self.char_masks.shape[1]), dtype=np.uint64)
+            self.char_masks = np.hstack([self.char_masks, extra])
+        positions = np.array([row[0] for row in rows], dtype=np.int64)
+        self.valid[positions] = True
+        self.lengths[positions] = [len(row[1]) for row in rows]
+        self.stripped_lengths[positions] = [len(row[1].strip()) for row in rows]
+        self.number_counts[positions] = [row[2] for row in rows]
+        self.char_counts[positions] = [bin(row[3]).count('1') for row in rows]
+        for word in range(mask_words):
+            self.char_masks[positions, word] = [(row[3] >> (64 * word)) & 0xFFFFFFFFFFFFFFFF for row in rows]
+
+    def _containing(self, text):
+        """Positions whose name contains text."""
+        if len(text) < 3:
+            return [position for position, name in enumerate(self.names) if name is not None and text in name]
+        postings = sorted((self.trigrams.get(trigram, ()) for trigram in _trigrams(text)), key=len)
+        if not postings[0]:
+            return []
+        # The two rarest trigrams narrow it down enough; the substring test does the rest
+        candidates = set(postings[0])
+        if len(postings) > 1:
+            candidates.intersection_update(postings[1])
+        return [position for position in candidates if text in self.names[position]]
+
+    def _counts(self, index, keys, size):
+        counts = np.zeros(size, dtype=np.int32)
+        for key in keys:
+            positions = index.get(key)
+            if positions:
+                counts[np.array(positions, dtype=np.int64)] += 1
+        return counts
+
+    def _features(self, search):
+        """Score without the Levenshtein bonus for every position, plus what the bonus needs."""
+        self._sync()
+        size = self.indexed
+        valid = self.valid[:size]
+        lengths = self.lengths[:size].astype(np.float64)
+        score = np.zeros(size)
+
+        # Number matching
+        search_numbers = extract_numbers(search)
+        name_numbers = self.number_counts[:size]
+        if search_numbers:
+            common_numbers = self._counts(self.number_index, search_numbers, size)
+            mismatched = len(search_numbers) + name_numbers - 2 * common_numbers
+            score += np.where(name_numbers > 0, common_numbers * 150.0 - mismatched * 30.0,
+                              -len(search_numbers) * 80.0)
+        else:
+            score -= name_numbers * 20.0
+
+        # Missing text penalty
+        search_clean = search.strip()
+        search_words = set(search_clean.split())
+        common_words = self._counts(self.words, search_words, size)
+        penalty = np.zeros(size)
+        if search_words:
+            penalty += (len(search_words) - common_words) / len(search_words) * 120
+        search_chars = set(search_clean.replace(' ', ''))
+        if search_chars:
+            found = _popcount(self.char_masks[:size] & self._query_mask(search_chars)).sum(axis=1)
+            penalty += (len(search_chars) - found) / len(search_chars) * 80
+        length_diff = self.stripped_lengths[:size] - len(search_clean)
+        penalty += np.minimum(np.maximum(length_diff, 0) * 2, 60)
+        if len(search_clean) <= 3:
+            penalty += np.where(self.stripped_lengths[:size] > 10, 40, 0)
+
+        # Abbreviations (only the first matching one counts)
+        abbreviated = np.zeros(size, dtype=bool)
+        for abbr, full_name in ABBREVIATIONS.items():
+            if search.startswith(abbr):
+                positions = [position for position in self._containing(full_name) if not abbreviated[position]]
+                abbreviated[positions] = True
+        score += np.where(abbreviated, 300.0, 0.0)
+        score -= np.where(abbreviated, penalty * 0.3, penalty)
+
+        score += common_words * 100.0
+
+        # Position bonuses and the substring bonus, for the names that contain the search
+        tail = np.zeros(size)
+        for position in self._containing(search):
+            name = self.names[position]
+            if name.startswith(search):
+                score[position] += 80
+            if any(word.startswith(search) for word in set(name.split())):
+                score[position] += 60
+            tail[position] += 50
+
+        if len(search) <= 5:
+            score += np.maximum(0, 50 - lengths)
+
+        # Character overlap
+        query_chars = set(search)
+        overlap = _popcount(self.char_masks[:size] & self._query_mask(query_chars)).sum(axis=1)
+        total_chars = self.char_counts[:size] + len(query_chars) - overlap
+        score += np.where(total_chars > 0, overlap / np.maximum(total_chars, 1) * 30, 0)
+
+        # Names the search contains
+        substrings = {search[start:end] for start in range(len(search)) for end in range(start + 1, len(search) + 1)}
+        for substring in substrings:
+            for position in self.exact_names.get(substring, ()):
+                tail[position] += 30
+
+        exact = self.exact_names.get(search, ())
+        max_lengths = np.maximum(lengths, len(search))
+        min_lengths = np.minimum(lengths, len(search))
+        return score, tail, exact, valid, max_lengths, min_lengths
+
+    def base_scores(self, search_term):
+        """Scores of every game without the Levenshtein bonus (-inf where a game has no name)."""
+        score, tail, exact, valid, _, _ = self._features(search_term.lower())
+        score = score + tail
+        score[list(exact)] = 1000
+        return np.where(valid, score, -np.inf)
+
+    def upper_bounds(self, search_term):
+        """Highest score each game can have: the Levenshtein bonus at the best its lengths allow."""
+        score, tail, exact, valid, max_lengths, min_lengths = self._features(search_term.lower())
+        score = score + min_lengths / np.maximum(max_lengths, 1) * 40 + tail + self.SCORE_TOLERANCE
+        score[list(exact)] = 1000
+        return np.where(valid, score, -np.inf)
+
+    def scores(self, search_term, min_score=None):
+        """
+        Scores of every game, as calculate_similarity_score would give them.
+
+        Args:
+            search_term (str): The search query
+            min_score (float): Only scores from here up are needed; Levenshtein runs only
+                for games whose upper bound reaches it, the others get their bound (below min_score)
+
+        Returns:
+            numpy.ndarray: One score per game in list order (-inf where a game has no name)
+        """
+        search = search_term.lower()
+        score, tail, exact, valid, max_lengths, min_lengths = self._features(search)
+        bounds = score + min_lengths / np.maximum(max_lengths, 1) * 40 + tail + self.SCORE_TOLERANCE
+        result = bounds.copy()
+        needed = valid if min_score is None else valid & (bounds >= min_score)
+        for position in np.flatnonzero(needed):
+            name = self.names[position]
+            max_len = max(len(search), len(name))
+            distance = levenshtein_distance(search, name)
+            result[position] = score[position] + (max_len - distance) / max_len * 40 + tail[position]
+        result[list(exact)] = 1000
+        return np.where(valid, result, -np.inf)
+
+
+class GameNameIndex(BatchScorer):
+    """
+    find_best_matches over a BatchScorer: the upper bounds of all names come from one
+    vectorized pass, and only names whose bound can still make the results get the
+    full (bounded-Levenshtein) score, best bound first. The results are the same as
+    scoring every name, ties included.
+    """
+
+    def find_best_matches(self, search_term, threshold=50, max_results=10):
+        """Same results as find_best_matches over the list, without fully scoring every name."""
+        if max_results is not None and max_results <= 0:
+            return _scan_best_matches(search_term, self.games, threshold, max_results)
+        search = search_term.lower()
+        bounds = self.upper_bounds(search)
+        candidates = np.flatnonzero(bounds >= threshold)
+        # Best bound first, list order among equal bounds
+        candidates = candidates[np.lexsort((candidates, -bounds[candidates]))]
+
+        # Best (score, -position) kept so far; the smallest is the one to beat
+        best = []
+        for position in candidates.tolist():
+            bound = bounds[position]
+            if max_results is not None and len(best) >= max_results and bound < best[0][0]:
+                break
+            # Only a score that reaches the threshold and the current k-th best matters
+            cutoff = threshold
+            if max_results is not None and len(best) >= max_results and best[0][0] > cutoff:
+                cutoff = best[0][0]
+            score = calculate_similarity_score(search, self.names[position], min_score=cutoff)
+            if score < cutoff:
+                continue
+            entry = (score, -position)
+            if max_results is None or len(best) < max_results:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+        matches = []
+        for score, negative_position in sorted(best, reverse=True):
+            game = self.games[-negative_position]
+            game_name = game if isinstance(game, str) else game.get('name', '')
+            matches.append(_match_info(game, game_name, score))
+        return matches
+
+
+@profiled(aggregate=True)
 def find_best_matches(search_term, game_list, threshold=50, max_results=10):
     """
     Find the best matching games from a list based on similarity scoring.
     
     Args:
         search_term (str): The search query
-        game_list (list): List of game names or dict objects with 'name' key
+        game_list (list): List of game names or dict objects with 'name' key, or a GameNameIndex over one
         threshold (float): Minimum score to consider a match
         max_results (int): Maximum number of results to return
         
     Returns:
         list: List of matches sorted by score (highest first)
     """
-    matches = []
-    
-    for game in game_list:
-        # Handle both string lists and dict lists
-        game_name = game if isinstance(game, str) else game.get('name', '')
-        if not game_name:
-            continue
-            
-        score = calculate_similarity_score(search_term.lower(), game_name.lower())
-        
-        if score >= threshold:
-            match_info = {
-                'name': game_name,
-                'score': score
-            }
-            
-            # If original was a dict, preserve other data
-            if isinstance(game, dict):
-                match_info.update({k: v for k, v in game.items() if k != 'name'})
-            
-            matches.append(match_info)
-    
-    # Sort by score (highest first) and limit results
-    matches.sort(key=lambda x: x['score'], reverse=True)
-    return matches[:max_results]
+    if isinstance(game_list, GameNameIndex):
+        return game_list.find_best_matches(search_term, threshold, max_results)
+    return _scan_best_matches(search_term, game_list, threshold, max_results)
 
 
 if __name__ == "__main__":
@@ -1,16 +1,151 @@
-from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QScrollArea, QWidget, QMessageBox
-from PyQt6.QtGui import QFont
-from PyQt6.QtCore import Qt
+import math
+
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QMessageBox, QTableView,
+                             QHeaderView, QAbstractItemView, QAbstractItemDelegate, QApplication)
+from PyQt6.QtGui import QFont, QKeySequence, QShortcut
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+
+from app_catalog import get_catalog
+
+
+def parse_price(text):
+    """Parse a typed or pasted price ('12.5', '$1,299.99', '') into cents; None if blank, ValueError if invalid."""
+    text = str(text).strip().replace('$', '').replace(',', '')
+    if not text:
+        return None
+    value = float(text)
+    if not math.isfinite(value):
+        raise ValueError(f"not a price: {text}")
+    cents = round(value * 100)
+    if cents < 0:
+        raise ValueError(f"negative price: {text}")
+    return cents
+
+
+class BundlePriceModel(QAbstractTableModel):
+    """
+    Editable per-game prices for a bundle.
+
+    Prices are kept in cents and the running total is updated by the difference
+    of each edit, so editing never re-sums the whole bundle.
+    """
+
+    COLUMNS = ['#', 'Game', 'Price ($)', 'Steam Price']
+    PRICE_COLUMN = 2
+
+    # Emitted with the new total in cents whenever any price changes
+    totalChanged = pyqtSignal(int)
+
+    def __init__(self, bundle_games, steam_prices=None, parent=None):
+        super().__init__(parent)
+        self.games = list(bundle_games)
+        self.prices = [None] * len(self.games)  # cents, None = not entered
+        self.steam_prices = steam_prices or [None] * len(self.games)  # cents, None = unknown
+        self.total_cents = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.games)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() == self.PRICE_COLUMN:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if column == 0:
+                return str(row + 1)
+            if column == 1:
+                return self.games[row]
+            if column == self.PRICE_COLUMN:
+                cents = self.prices[row]
+                if cents is None:
+                    return "" if role == Qt.ItemDataRole.EditRole else "0.00"
+                return f"{cents / 100:.2f}"
+            if column == 3:
+                cents = self.steam_prices[row]
+                return f"${cents / 100:.2f}" if cents is not None else "-"
+        if role == Qt.ItemDataRole.ForegroundRole and column == self.PRICE_COLUMN and self.prices[row] is None:
+            return Qt.GlobalColor.gray
+        if role == Qt.ItemDataRole.TextAlignmentRole and column in (self.PRICE_COLUMN, 3):
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != self.PRICE_COLUMN:
+            return False
+        try:
+            cents = parse_price(value)
+        except ValueError:
+            return False  # Keep the old value; invalid text is simply not accepted
+        return self.set_prices({index.row(): cents}) > 0
+
+    def set_prices(self, prices):
+        """
+        Set several prices at once ({row: cents or None}) with one update of the view and total.
+
+        Returns:
+            int: Number of rows whose price changed
+        """
+        changed_rows = []
+        for row, cents in prices.items():
+            old = self.prices[row]
+            if old == cents:
+                continue
+            self.total_cents += (cents or 0) - (old or 0)
+            self.prices[row] = cents
+            changed_rows.append(row)
+        if changed_rows:
+            self.dataChanged.emit(self.index(min(changed_rows), self.PRICE_COLUMN),
+                                  self.index(max(changed_rows), self.PRICE_COLUMN))
+            self.totalChanged.emit(self.total_cents)
+        return len(changed_rows)
+
+    def blank_rows(self):
+        return [row for row, cents in enumerate(self.prices) if cents is None]
+
+    def get_prices(self):
+        """Get {game name: price in dollars}; blank prices count as 0."""
+        return {game: (cents or 0) / 100 for game, cents in zip(self.games, self.prices)}
+
+
+def load_cached_steam_prices(bundle_games, app_ids=None):
+    """Look up each game's last known Steam price (original price, in cents) in the app catalog, without any requests."""
+    catalog = get_catalog()
+    app_ids = app_ids or {}
+    prices = []
+    for game_name in bundle_games:
+        app_id = app_ids.get(game_name) or catalog.find_app_id(game_name)
+        record = catalog.latest_price(app_id) if app_id else None
+        if record:
+            price = record.get('original_price') or record.get('current_price') or 0.0
+            prices.append(round(price * 100))
+        else:
+            prices.append(None)
+    return prices
+
 
 class IndividualPriceDialog(QDialog):
-    def __init__(self, bundle_games, total_cost, parent=None):
+    def __init__(self, bundle_games, total_cost, parent=None, app_ids=None):
         super().__init__(parent)
         self.bundle_games = bundle_games
         self.total_cost = total_cost
-        self.price_inputs = {}
-        
+        self.total_cost_cents = round(total_cost * 100)
+
         self.setWindowTitle('Enter Individual Game Prices')
-        self.setMinimumSize(500, 400)
+        self.setMinimumSize(700, 500)
         self.setStyleSheet("""
             QDialog {
                 background-color: #2b2b2b;
@@ -19,12 +154,22 @@ class IndividualPriceDialog(QDialog):
             QLabel {
                 color: white;
             }
-            QLineEdit {
+            QTableView {
                 background-color: #404040;
+                alternate-background-color: #363636;
                 color: white;
+                gridline-color: #555;
                 border: 1px solid #666;
-                padding: 5px;
-                margin: 2px;
+            }
+            QTableView QLineEdit {
+                background-color: white;
+                color: black;
+            }
+            QHeaderView::section {
+                background-color: #2b2b2b;
+                color: white;
+                border: 1px solid #555;
+                padding: 4px;
             }
             QPushButton {
                 background-color: #4CAF50;
@@ -37,13 +182,6 @@ class IndividualPriceDialog(QDialog):
             QPushButton:hover {
                 background-color: #45a049;
             }
-            QScrollArea {
-                border: 1px solid #555;
-                background-color: #2b2b2b;
-            }
-            QWidget {
-                background-color: #2b2b2b;
-            }
             QMessageBox {
                 background-color: #2b2b2b;
                 color: white;
@@ -63,173 +201,171 @@ class IndividualPriceDialog(QDialog):
                 background-color: #45a049;
             }
         """)
-        
+
         # Create main layout
         layout = QVBoxLayout()
-        
+
         # Add title
         title_label = QLabel('Multi Purchase - Enter Individual Prices')
         title_label.setFont(QFont("Arial", 14, QFont.Weight.Bold))
         layout.addWidget(title_label)
-        
+
         # Add explanation
         explanation = QLabel(
             f"You chose 'Multi Purchase' for {len(bundle_games)} games.\n"
             f"Total bundle cost: ${total_cost:.2f}\n\n"
-            "Please enter the individual price you paid for each game:"
+            "Enter the individual price you paid for each game (type over a price, or paste a column with Ctrl+V):"
         )
         explanation.setStyleSheet("margin: 10px; font-size: 12px;")
         layout.addWidget(explanation)
-        
-        # Create scrollable area for game inputs
-        scroll_area = QScrollArea()
-        scroll_widget = QWidget()
-        scroll_layout = QVBoxLayout(scroll_widget)
-        
-        # Add input fields for each game
-        for i, game_name in enumerate(bundle_games):
-            game_layout = QHBoxLayout()
-            
-            # Game name label
-            game_label = QLabel(f"{i+1}. {game_name}:")
-            game_label.setMinimumWidth(300)
-            game_layout.addWidget(game_label)
-            
-            # Price input
-            price_input = QLineEdit()
-            price_input.setPlaceholderText("0.00")
-            price_input.setMaximumWidth(100)
-            self.price_inputs[game_name] = price_input
-            game_layout.addWidget(price_input)
-            
-            # Dollar sign
-            dollar_label = QLabel("$")
-            game_layout.addWidget(dollar_label)
-            
-            game_layout.addStretch()
-            scroll_layout.addLayout(game_layout)
-        
-        scroll_widget.setLayout(scroll_layout)
-        scroll_area.setWidget(scroll_widget)
-        scroll_area.setWidgetResizable(True)
-        layout.addWidget(scroll_area)
-        
+
+        # Price table
+        self.model = BundlePriceModel(bundle_games, load_cached_steam_prices(bundle_games, app_ids), self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setAlternatingRowColors(True)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.AnyKeyPressed |
+                                   QAbstractItemView.EditTrigger.DoubleClicked |
+                                   QAbstractItemView.EditTrigger.SelectedClicked)
+        self.table.verticalHeader().hide()
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+
+        QShortcut(QKeySequence.StandardKey.Paste, self.table, activated=self.paste_column)
+
+        # Bulk actions
+        bulk_layout = QHBoxLayout()
+        fill_button = QPushButton('Fill from Steam Prices')
+        fill_button.setToolTip('Fill blank prices with the last known Steam price of each game')
+        fill_button.clicked.connect(self.fill_from_steam_prices)
+        distribute_button = QPushButton('Distribute Remainder')
+        distribute_button.setToolTip('Split what is left of the bundle cost evenly over the blank prices')
+        distribute_button.clicked.connect(self.distribute_remainder)
+        paste_button = QPushButton('Paste Column')
+        paste_button.setToolTip('Paste one price per line from the clipboard, starting at the selected row')
+        paste_button.clicked.connect(self.paste_column)
+        clear_button = QPushButton('Clear')
+        clear_button.clicked.connect(lambda: self.model.set_prices({row: None for row in range(len(self.model.games))}))
+        for button in (fill_button, distribute_button, paste_button, clear_button):
+            button.setAutoDefault(False)
+            bulk_layout.addWidget(button)
+        layout.addLayout(bulk_layout)
+
         # Add total calculation label
         self.total_label = QLabel("Current total: $0.00")
         self.total_label.setStyleSheet("font-weight: bold; margin: 10px;")
         layout.addWidget(self.total_label)
-        
-        # Connect input changes to update total
-        for price_input in self.price_inputs.values():
-            price_input.textChanged.connect(self.update_total)
-        
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # The model keeps the running total; the label only reacts to changes
+        self.model.totalChanged.connect(self.update_total)
+
         # Add buttons
         button_layout = QHBoxLayout()
         self.ok_button = QPushButton('OK')
         self.cancel_button = QPushButton('Cancel')
-        
+        self.ok_button.setAutoDefault(False)
+        self.cancel_button.setAutoDefault(False)
+
         self.ok_button.clicked.connect(self.validate_and_accept)
         self.cancel_button.clicked.connect(self.reject)
-        
+
         button_layout.addWidget(self.ok_button)
         button_layout.addWidget(self.cancel_button)
-        
+
         layout.addLayout(button_layout)
         self.setLayout(layout)
-        
-        # Set focus on first input
-        if self.price_inputs:
-            first_input = list(self.price_inputs.values())[0]
-            first_input.setFocus()
-    
-    def update_total(self):
-        """Update the total as user types."""
-        total = 0.0
-        for price_input in self.price_inputs.values():
-            try:
-                value = float(price_input.text() or "0")
-                total += value
-            except ValueError:
-                pass
-        
-        self.total_label.setText(f"Current total: ${total:.2f}")
-        
+
+        self.update_total(0)
+
+        # Start on the first price
+        if bundle_games:
+            self.table.setCurrentIndex(self.model.index(0, BundlePriceModel.PRICE_COLUMN))
+            self.table.setFocus()
+
+    def update_total(self, total_cents):
+        """Show the running total kept by the model."""
+        self.total_label.setText(f"Current total: ${total_cents / 100:.2f}   "
+                                 f"(remaining: ${(self.total_cost_cents - total_cents) / 100:.2f})")
+
         # Color code the total
-        if abs(total - self.total_cost) < 0.01:  # Within 1 cent
+        if abs(total_cents - self.total_cost_cents) <= 1:  # Within 1 cent
             self.total_label.setStyleSheet("font-weight: bold; margin: 10px; color: #4CAF50;")
-        elif total > self.total_cost:
+        elif total_cents > self.total_cost_cents:
             self.total_label.setStyleSheet("font-weight: bold; margin: 10px; color: #f44336;")
         else:
             self.total_label.setStyleSheet("font-weight: bold; margin: 10px; color: #ff9800;")
-    
-    def validate_and_accept(self):
-        """Validate prices before accepting."""
-        individual_prices = {}
-        total_entered = 0.0
-        
-        # Collect and validate all prices
-        for game_name, price_input in self.price_inputs.items():
+
+    def fill_from_steam_prices(self):
+        """Fill blank prices from the cached Steam prices."""
+        prices = {row: self.model.steam_prices[row] for row in self.model.blank_rows()
+                  if self.model.steam_prices[row] is not None}
+        filled = self.model.set_prices(prices)
+        missing = sum(1 for row in self.model.blank_rows())
+        self.status_label.setText(f"Filled {filled} prices from Steam" +
+                                  (f"; {missing} games have no cached Steam price" if missing else ""))
+
+    def distribute_remainder(self):
+        """Split the rest of the bundle cost evenly (to the cent) over the blank prices."""
+        blank_rows = self.model.blank_rows()
+        remainder = self.total_cost_cents - self.model.total_cents
+        if not blank_rows:
+            self.status_label.setText("No blank prices to distribute the remainder to")
+            return
+        if remainder < 0:
+            self.status_label.setText(f"Entered prices already exceed the bundle cost by ${-remainder / 100:.2f}")
+            return
+        share, extra = divmod(remainder, len(blank_rows))
+        # The first 'extra' games get one more cent so the total matches exactly
+        self.model.set_prices({row: share + (1 if i < extra else 0) for i, row in enumerate(blank_rows)})
+        self.status_label.setText(f"Distributed ${remainder / 100:.2f} over {len(blank_rows)} games")
+
+    def paste_column(self):
+        """Paste one price per line from the clipboard, starting at the selected row."""
+        lines = [line.split('\t')[0] for line in QApplication.clipboard().text().splitlines()]
+        while lines and not lines[-1].strip():
+            lines.pop()
+        if not lines:
+            self.status_label.setText("Clipboard is empty")
+            return
+
+        start_row = max(self.table.currentIndex().row(), 0)
+        prices = {}
+        invalid = 0
+        for offset, line in enumerate(lines):
+            row = start_row + offset
+            if row >= len(self.model.games):
+                break
             try:
-                price = float(price_input.text() or "0")
-                if price < 0:
-                    msg_box = QMessageBox(self)
-                    msg_box.setWindowTitle("Invalid Price")
-                    msg_box.setText(f"Price for '{game_name}' cannot be negative.")
-                    msg_box.setIcon(QMessageBox.Icon.Warning)
-                    msg_box.setStyleSheet("""
-                        QMessageBox {
-                            background-color: #2b2b2b;
-                            color: white;
-                        }
-                        QMessageBox QLabel {
-                            color: white;
-                        }
-                        QPushButton {
-                            background-color: #4CAF50;
-                            color: white;
-                            border: none;
-                            padding: 8px 16px;
-                            margin: 5px 2px;
-                            min-width: 80px;
-                        }
-                        QPushButton:hover {
-                            background-color: #45a049;
-                        }
-                    """)
-                    msg_box.exec()
-                    return
-                individual_prices[game_name] = price
-                total_entered += price
+                prices[row] = parse_price(line)
             except ValueError:
-                msg_box = QMessageBox(self)
-                msg_box.setWindowTitle("Invalid Price")
-                msg_box.setText(f"Invalid price entered for '{game_name}'. Please enter a valid number.")
-                msg_box.setIcon(QMessageBox.Icon.Warning)
-                msg_box.setStyleSheet("""
-                    QMessageBox {
-                        background-color: #2b2b2b;
-                        color: white;
-                    }
-                    QMessageBox QLabel {
-                        color: white;
-                    }
-                    QPushButton {
-                        background-color: #4CAF50;
-                        color: white;
-                        border: none;
-                        padding: 8px 16px;
-                        margin: 5px 2px;
-                        min-width: 80px;
-                    }
-                    QPushButton:hover {
-                        background-color: #45a049;
-                    }
-                """)
-                msg_box.exec()
-                return
-        
+                invalid += 1
+        self.model.set_prices(prices)
+        message = f"Pasted {len(prices)} prices starting at row {start_row + 1}"
+        if invalid:
+            message += f" ({invalid} lines were not valid prices and were skipped)"
+        if start_row + len(lines) > len(self.model.games):
+            message += f" ({start_row + len(lines) - len(self.model.games)} extra lines ignored)"
+        self.status_label.setText(message)
+
+    def validate_and_accept(self):
+        """Check the total before accepting (the table only accepts valid, non-negative prices)."""
+        # Commit a price that is still being edited (e.g. accepted with Enter on the default button)
+        editor = QApplication.focusWidget()
+        if self.table.state() == QAbstractItemView.State.EditingState and editor is not None:
+            self.table.commitData(editor)
+            self.table.closeEditor(editor, QAbstractItemDelegate.EndEditHint.NoHint)
+
+        individual_prices = self.model.get_prices()
+        total_entered = self.model.total_cents / 100
+
         # Check if total matches (within reasonable tolerance)
-        if abs(total_entered - self.total_cost) > 0.01:
+        if abs(self.model.total_cents - self.total_cost_cents) > 1:
             msg_box = QMessageBox(self)
             msg_box.setWindowTitle("Total Mismatch")
             msg_box.setIcon(QMessageBox.Icon.Question)
@@ -260,14 +396,14 @@ class IndividualPriceDialog(QDialog):
                     background-color: #45a049;
                 }
             """)
-            
+
             reply = msg_box.exec()
             if reply != QMessageBox.StandardButton.Yes:
                 return
-        
+
         self.individual_prices = individual_prices
         self.accept()
-    
+
     def get_individual_prices(self):
         """Return the individual prices entered by user."""
         return getattr(self, 'individual_prices', {})
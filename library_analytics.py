@@ -0,0 +1,215 @@
+"""
+Library Analytics
+
+Dashboard metrics computed with NumPy over a columnar copy of the library.
+The Hours/Cost/Date columns are converted to arrays once per library version;
+every metric after that is a vectorized operation, memoized until the library
+changes.
+"""
+import threading
+
+import numpy as np
+
+from steam_library import parse_purchase_date, to_float
+
+# Games with fewer hours than this count as backlog
+DEFAULT_BACKLOG_HOURS = 1.0
+DEFAULT_PERCENTILES = (25, 50, 75, 90, 99)
+
+
+class LibraryColumns:
+    """Columnar (NumPy) view of a SteamLibrary."""
+
+    def __init__(self, library):
+        games = library.games
+        count = len(games)
+        self.version = library.version
+        self.names = np.array([str(game['name'] or '') for game in games], dtype=object)
+        self.app_ids = np.array([str(game['app_id']) if game['app_id'] not in (None, '') else '' for game in games], dtype=object)
+        self.methods = np.array([str(game['method'] or '') for game in games], dtype=object)
+        self.types = np.array([str(game['type'] or '') for game in games], dtype=object)
+        self.base_app_ids = np.array([str(game['base_app_id']) if game['base_app_id'] not in (None, '') else '' for game in games], dtype=object)
+
+        self.hours = np.full(count, np.nan)
+        self.cost = np.full(count, np.nan)
+        self.date_ordinal = np.full(count, -1, dtype=np.int64)
+        self.year = np.zeros(count, dtype=np.int32)
+        self.month = np.zeros(count, dtype=np.int32)
+
+        for i, game in enumerate(games):
+            hours = to_float(game['hours'])
+            if hours is not None:
+                self.hours[i] = hours
+            cost = to_float(game['cost'])
+            if cost is not None:
+                self.cost[i] = cost
+            purchase_date = parse_purchase_date(game['date'])
+            if purchase_date is not None:
+                self.date_ordinal[i] = purchase_date.toordinal()
+                self.year[i] = purchase_date.year
+                self.month[i] = purchase_date.month
+
+        self.is_dlc = self.types == 'DLC'
+        self.has_date = self.date_ordinal >= 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def memory_bytes(self):
+        """Approximate memory held by the arrays (object arrays count their pointers only)."""
+        return sum(value.nbytes for value in vars(self).values() if isinstance(value, np.ndarray))
+
+
+class LibraryAnalytics:
+    """Vectorized dashboard metrics for one library version (results are memoized)."""
+
+    def __init__(self, library):
+        self.columns = LibraryColumns(library)
+        self.version = library.version
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def memory_bytes(self):
+        """Approximate memory held by the columns (memoized results are tiny)."""
+        return self.columns.memory_bytes()
+
+    def _memoized(self, key, compute):
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+        value = compute()
+        with self._lock:
+            self._memo[key] = value
+        return value
+
+    def cost_per_hour(self):
+        """Overall cost per hour over games that have both a cost and playtime."""
+        def compute():
+            c = self.columns
+            mask = (c.cost > 0) & (c.hours > 0)
+            total_hours = c.hours[mask].sum()
+            return float(c.cost[mask].sum() / total_hours) if total_hours > 0 else 0.0
+        return self._memoized('cost_per_hour', compute)
+
+    def total_spend(self):
+        def compute():
+            return float(np.nansum(self.columns.cost))
+        return self._memoized('total_spend', compute)
+
+    def spend_by_year(self):
+        """Total purchase cost per year: {year: amount}."""
+        def compute():
+            c = self.columns
+            mask = c.has_date & ~np.isnan(c.cost)
+            if not mask.any():
+                return {}
+            years = c.year[mask]
+            first_year = int(years.min())
+            # Years are a small dense range, so a bincount avoids sorting
+            totals = np.bincount(years - first_year, weights=c.cost[mask])
+            return {first_year + int(i): round(float(totals[i]), 2) for i in np.flatnonzero(totals)}
+        return self._memoized('spend_by_year', compute)
+
+    def spend_by_month(self):
+        """Total purchase cost per month: {'YYYY-MM': amount}."""
+        def compute():
+            c = self.columns
+            mask = c.has_date & ~np.isnan(c.cost)
+            if not mask.any():
+                return {}
+            first_year = int(c.year[mask].min())
+            month_index = (c.year[mask] - first_year) * 12 + (c.month[mask] - 1)
+            totals = np.bincount(month_index, weights=c.cost[mask])
+            return {f"{first_year + int(i) // 12:04d}-{int(i) % 12 + 1:02d}": round(float(totals[i]), 2)
+                    for i in np.flatnonzero(totals)}
+        return self._memoized('spend_by_month', compute)
+
+    def playtime_percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        """Hours played at the given percentiles: {percentile: hours}."""
+        percentiles = tuple(percentiles)
+
+        def compute():
+            hours = self.columns.hours[~np.isnan(self.columns.hours)]
+            if hours.size == 0:
+                return {p: 0.0 for p in percentiles}
+            values = np.percentile(hours, percentiles)
+            return {p: round(float(v), 2) for p, v in zip(percentiles, values)}
+        return self._memoized(('playtime_percentiles', percentiles), compute)
+
+    def backlog_share(self, max_hours=DEFAULT_BACKLOG_HOURS):
+        """Fraction of games (DLC excluded) with less than max_hours played."""
+        def compute():
+            c = self.columns
+            mask = ~c.is_dlc & ~np.isnan(c.hours)
+            total = int(mask.sum())
+            if total == 0:
+                return 0.0
+            return float((c.hours[mask] < max_hours).sum() / total)
+        return self._memoized(('backlog_share', max_hours), compute)
+
+    def top_value_titles(self, n=10):
+        """The n paid titles with the lowest cost per hour: list of dicts, best value first."""
+        def compute():
+            c = self.columns
+            candidates = np.flatnonzero((c.cost > 0) & (c.hours > 0))
+            if candidates.size == 0:
+                return []
+            per_hour = c.cost[candidates] / c.hours[candidates]
+            k = min(n, candidates.size)
+            top = np.argpartition(per_hour, k - 1)[:k]
+            top = top[np.argsort(per_hour[top], kind='stable')]
+            return [{
+                'name': c.names[candidates[i]],
+                'app_id': c.app_ids[candidates[i]],
+                'cost': float(c.cost[candidates[i]]),
+                'hours': float(c.hours[candidates[i]]),
+                'cost_per_hour': float(per_hour[i]),
+            } for i in top]
+        return self._memoized(('top_value_titles', n), compute)
+
+    def dashboard(self):
+        """All dashboard metrics in one dict."""
+        return {
+            'cost_per_hour': self.cost_per_hour(),
+            'total_spend': self.total_spend(),
+            'backlog_share': self.backlog_share(),
+            'spend_by_year': self.spend_by_year(),
+            'spend_by_month': self.spend_by_month(),
+            'playtime_percentiles': self.playtime_percentiles(),
+            'top_value_titles': self.top_value_titles(),
+        }
+
+
+def get_analytics(library):
+    """Get the analytics for a library; built once and kept with the library until it is replaced."""
+    return library.get_derived('analytics', LibraryAnalytics)
+
+
+def format_insights_report(analytics, top_n=10):
+    """Build a plain-text report of the analytics as a list of lines."""
+    dashboard = analytics.dashboard()
+    lines = [
+        f"Total spend: ${dashboard['total_spend']:.2f}",
+        f"Cost per hour: ${dashboard['cost_per_hour']:.2f}",
+        f"Backlog share (< {DEFAULT_BACKLOG_HOURS:g}h played): {dashboard['backlog_share'] * 100:.1f}%",
+        "",
+        "Playtime percentiles:",
+    ]
+    for percentile, hours in dashboard['playtime_percentiles'].items():
+        lines.append(f"  P{percentile:<3} {hours:10.2f} h")
+
+    lines.append("")
+    lines.append("Spend by year:")
+    for year, total in dashboard['spend_by_year'].items():
+        lines.append(f"  {year}  ${total:10.2f}")
+    if not dashboard['spend_by_year']:
+        lines.append("  (no dated purchases)")
+
+    lines.append("")
+    lines.append("Best value titles (lowest cost per hour):")
+    for i, title in enumerate(analytics.top_value_titles(top_n), 1):
+        lines.append(f"  {i:>2}. {title['name']} - ${title['cost_per_hour']:.2f}/h "
+                     f"(${title['cost']:.2f}, {title['hours']:.1f} h)")
+    if not analytics.top_value_titles(top_n):
+        lines.append("  (no paid titles with playtime)")
+    return lines
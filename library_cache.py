@@ -0,0 +1,133 @@
+"""
+Per-User Library Cache
+
+Keeps the libraries of recently used Steam users in memory, together with
+everything derived from them (analytics columns, picker tables), so switching
+back to one of them is instant. The cache is an LRU bounded by both a user
+count and an estimated memory budget; entries whose spreadsheet's (size, mtime)
+fingerprint changed are dropped instead of being served, and the background
+load decides what the file holds now.
+"""
+import os
+import sys
+from collections import OrderedDict
+
+import metrics
+from steam_library import is_library_current
+
+DEFAULT_MAX_USERS = 5
+# Override with STEAMHOURS_LIBRARY_CACHE_MB
+DEFAULT_MAX_MB = 256
+
+# Games sampled when estimating the size of a big library
+SIZE_SAMPLE = 1000
+
+
+def estimate_library_bytes(library):
+    """
+    Estimate the memory held by a library and its derived structures.
+
+    The game dicts are sampled and scaled up; derived structures report their
+    own size through a memory_bytes() method.
+    """
+    games = library.games
+    total = sys.getsizeof(games)
+    if games:
+        step = max(1, len(games) // SIZE_SAMPLE)
+        sample = games[::step]
+        sample_bytes = 0
+        for game in sample:
+            sample_bytes += sys.getsizeof(game)
+            sample_bytes += sum(sys.getsizeof(value) for value in game.values() if value is not None)
+        total += int(sample_bytes * len(games) / len(sample))
+
+    for value in list(library.derived.values()):
+        memory_bytes = getattr(value, 'memory_bytes', None)
+        if memory_bytes is not None:
+            total += memory_bytes()
+    return total
+
+
+def format_bytes(size):
+    """Format a byte count for display."""
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / 1024:.1f} KB"
+
+
+class LibraryCache:
+    """LRU of loaded libraries keyed by Steam ID."""
+
+    def __init__(self, max_users=DEFAULT_MAX_USERS, max_bytes=None):
+        if max_bytes is None:
+            try:
+                max_bytes = int(float(os.getenv('STEAMHOURS_LIBRARY_CACHE_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+            except ValueError:
+                max_bytes = DEFAULT_MAX_MB * 1024 * 1024
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # steam_id -> library, least recently used first
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, steam_id):
+        return str(steam_id) in self._entries
+
+    def get(self, steam_id, spreadsheet_path):
+        """
+        Get a user's cached library if the spreadsheet on disk is unchanged (only stats the file).
+
+        Returns:
+            SteamLibrary: The cached library (now most recently used), or None
+        """
+        steam_id = str(steam_id)
+        library = self._entries.get(steam_id)
+        if library is None:
+            metrics.inc('cache_requests_total', cache='library', result='miss')
+            return None
+        if not is_library_current(library, spreadsheet_path):
+            print(f"Library cache: {steam_id} changed on disk, dropping cached copy")
+            del self._entries[steam_id]
+            metrics.inc('cache_requests_total', cache='library', result='stale')
+            return None
+        metrics.inc('cache_requests_total', cache='library', result='hit')
+        self._entries.move_to_end(steam_id)
+        return library
+
+    def put(self, steam_id, library):
+        """Store (or refresh) a user's library as the most recently used entry and enforce the limits."""
+        steam_id = str(steam_id)
+        self._entries[steam_id] = library
+        self._entries.move_to_end(steam_id)
+        self._evict(keep=steam_id)
+
+    def discard(self, steam_id):
+        self._entries.pop(str(steam_id), None)
+
+    def sizes(self):
+        """Get [(steam_id, games, estimated bytes)] from least to most recently used."""
+        return [(steam_id, len(library), estimate_library_bytes(library))
+                for steam_id, library in self._entries.items()]
+
+    def _evict(self, keep):
+        sizes = {steam_id: size for steam_id, _, size in self.sizes()}
+        total = sum(sizes.values())
+        for steam_id in list(self._entries):
+            if len(self._entries) <= self.max_users and total <= self.max_bytes:
+                break
+            if steam_id == keep:
+                continue  # The current user always stays resident
+            del self._entries[steam_id]
+            total -= sizes[steam_id]
+            print(f"Library cache: evicted {steam_id} ({format_bytes(sizes[steam_id])})")
+
+    def report(self):
+        """Build a report of the resident users and what each one costs, as a list of lines."""
+        sizes = self.sizes()
+        total = sum(size for _, _, size in sizes)
+        lines = [f"Library cache: {len(sizes)}/{self.max_users} users, "
+                 f"{format_bytes(total)} of {format_bytes(self.max_bytes)}"]
+        for steam_id, games, size in reversed(sizes):
+            lines.append(f"  {steam_id}: {games} entries, {format_bytes(size)}")
+        return lines
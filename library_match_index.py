@@ -0,0 +1,157 @@
+"""
+Library Match Index
+
+Hash index over a library's game names for the CSV importers. Every library
+name is expanded once into its Roman/Arabic numeral variants
+(normalize_numbers_in_title) and its edition-stripped base name
+(normalize_game_name), so matching a purchased title is a few dictionary
+lookups instead of normalizing and comparing every row for every purchase.
+Fuzzy matching goes through a GameNameIndex over the same rows.
+
+Matching follows the importer's original row-by-row rules, including which
+row wins when several match: the first row in sheet order.
+"""
+import sys
+from collections import defaultdict
+
+from game_search import GameNameIndex
+from name_normalization import normalize_game_name, normalize_numbers_in_title
+
+
+class LibraryMatchIndex:
+    """Exact, partial (edition-stripped) and edition lookups over one library version."""
+
+    def __init__(self):
+        self.games = []                  # [{'name', 'app_id', 'game_name'}] in row order, for fuzzy matching
+        self.row_variants = []           # row -> numeral variants of the lowercase name
+        self.variants = {}               # variant -> first row
+        self.exact_names = {}            # lowercase name -> first row
+        self.bases = {}                  # edition-stripped base name -> first row
+        self.words = defaultdict(list)   # word -> rows whose variants contain it (ascending)
+        self.sheet_rows = 1              # last sheet row indexed (header is row 1)
+        # Fuzzy candidates over the same games; catches up with added rows on each search
+        self.search_index = GameNameIndex(self.games)
+
+    def __len__(self):
+        return len(self.games)
+
+    def memory_bytes(self):
+        # Dicts, lists and their keys; the name strings are shared with the library
+        containers = [self.games, self.row_variants, self.variants, self.exact_names, self.bases, self.words]
+        total = sum(sys.getsizeof(container) for container in containers)
+        total += sum(sys.getsizeof(game) for game in self.games)
+        total += sum(sys.getsizeof(rows) for rows in self.words.values())
+        total += sum(sys.getsizeof(key) for key in self.variants)
+        return total + self.search_index.memory_bytes()
+
+    def add(self, name, app_id):
+        """Index one more library row (rows must be added in sheet order)."""
+        row = len(self.games)
+        name = str(name)
+        self.games.append({'name': name, 'app_id': str(app_id), 'game_name': name})
+
+        clean_name = name.lower().strip()
+        variations = normalize_numbers_in_title(clean_name)
+        self.row_variants.append(variations)
+        for variation in variations:
+            self.variants.setdefault(variation, row)
+        self.exact_names.setdefault(clean_name, row)
+        self.bases.setdefault(normalize_game_name(clean_name)[0], row)
+
+        words = set()
+        for variation in variations:
+            words.update(variation.split())
+        for word in words:
+            self.words[word].append(row)
+
+    @classmethod
+    def from_sheet(cls, sheet):
+        index = cls()
+        index.update_from_sheet(sheet)
+        return index
+
+    @classmethod
+    def from_library(cls, library):
+        index = cls()
+        for game in library.games:
+            if game['name'] and game['app_id']:
+                index.add(game['name'], game['app_id'])
+        return index
+
+    def update_from_sheet(self, sheet):
+        """Index rows appended to the sheet since the last update (the importer adds rows as it goes)."""
+        if sheet.max_row <= self.sheet_rows:
+            return
+        for row in sheet.iter_rows(min_row=self.sheet_rows + 1, max_col=2, values_only=True):
+            # Rows without an App ID can't be matched to anything useful
+            if len(row) >= 2 and row[0] and row[1]:
+                self.add(row[0], row[1])
+        self.sheet_rows = sheet.max_row
+
+    def find_exact(self, game_name):
+        """
+        Find a purchased title by exact numeral variants, or by its edition-stripped base name
+        contained in (or containing) a library name with at least two words in common.
+
+        Returns:
+            tuple: (app_id, method) with method 'exact' or 'partial', or (None, None)
+        """
+        clean_name = game_name.lower().strip()
+        base_name, removed_suffix = normalize_game_name(clean_name)
+        search_variations = normalize_numbers_in_title(clean_name)
+        base_variations = normalize_numbers_in_title(base_name) if base_name != clean_name else []
+
+        exact_row = None
+        for variation in search_variations + base_variations:
+            row = self.variants.get(variation)
+            if row is not None and (exact_row is None or row < exact_row):
+                exact_row = row
+
+        partial_row = None
+        if removed_suffix and base_name != clean_name:
+            partial_row = self._find_partial(base_variations, exact_row)
+
+        if partial_row is not None:
+            return self.games[partial_row]['app_id'], 'partial'
+        if exact_row is not None:
+            return self.games[exact_row]['app_id'], 'exact'
+        return None, None
+
+    def _find_partial(self, base_variations, before_row):
+        # Only rows sharing two or more words can match; count shared words through the word index
+        words = set()
+        for base_var in base_variations:
+            words.update(base_var.split())
+        shared = defaultdict(int)
+        for word in words:
+            for row in self.words.get(word, ()):
+                if before_row is not None and row >= before_row:
+                    break  # Posting lists are ascending; later rows lose to the exact match
+                shared[row] += 1
+        for row in sorted(row for row, count in shared.items() if count >= 2):
+            for base_var in base_variations:
+                words_base = set(base_var.split())
+                for existing_var in self.row_variants[row]:
+                    if base_var in existing_var or existing_var in base_var:
+                        if len(words_base.intersection(existing_var.split())) >= 2:
+                            return row
+        return None
+
+    def find_edition(self, base_name):
+        """
+        Find the library entry for an edition's base name: the game itself, or another
+        edition of it.
+
+        Returns:
+            dict: {'name', 'app_id', 'game_name'} of the first matching row, or None
+        """
+        base_name = base_name.lower().strip()
+        row = self.exact_names.get(base_name)
+        if row is None:
+            row = self.bases.get(base_name)
+        return self.games[row] if row is not None else None
+
+
+def get_match_index(library):
+    """Get the match index of a library; built once and kept with the library until it is replaced."""
+    return library.get_derived('match_index', LibraryMatchIndex.from_library)
@@ -0,0 +1,607 @@
+"""
+Library Query Engine
+
+Ad-hoc questions over a loaded library, answered with NumPy masks instead of
+row-by-row loops. Queries can be written as text:
+
+    hours < 1 and cost > 20 and year = 2024
+    name ~ "war" and not type = DLC sort by hours desc limit 10
+    date >= 2024-01-01 and date < 2024-07-01 group by method
+    (method = Gift or method = Bundle) and cost is empty
+
+or built with the Python API:
+
+    LibraryQuery(library).where('hours', '<', 1).where('cost', '>', 20).sort_by('cost', descending=True).run()
+
+Fields: name, app_id, hours, cost, date, method, type, base_app_id (or base),
+year, month, cost_per_hour. Operators: = != < <= > >= ~ (contains) !~ and
+'is empty' / 'is not empty'. Text comparisons ignore case. Date, year
+and month filters go through a sorted purchase-date index (binary search).
+"""
+import re
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+from library_analytics import get_analytics
+from steam_library import parse_purchase_date
+
+TEXT_FIELDS = {'name', 'method', 'type'}
+NUMERIC_FIELDS = {'hours', 'cost', 'app_id', 'base_app_id', 'cost_per_hour', 'month'}
+DATE_FIELDS = {'date', 'year'}
+FIELDS = TEXT_FIELDS | NUMERIC_FIELDS | DATE_FIELDS
+FIELD_ALIASES = {'base': 'base_app_id', 'game': 'name', 'price': 'cost', 'playtime': 'hours', 'appid': 'app_id'}
+GROUP_FIELDS = {'name', 'method', 'type', 'base_app_id', 'year', 'month'}
+OPERATORS = {'=', '!=', '<', '<=', '>', '>=', '~', '!~'}
+KEYWORDS = {'and', 'or', 'not', 'sort', 'order', 'by', 'asc', 'desc', 'group', 'limit', 'is', 'empty'}
+
+
+class QueryError(ValueError):
+    """Raised for queries that cannot be parsed or evaluated."""
+
+
+def _resolve_field(name):
+    field = FIELD_ALIASES.get(name.lower(), name.lower())
+    if field not in FIELDS:
+        raise QueryError(f"Unknown field '{name}'. Fields: {', '.join(sorted(FIELDS))}")
+    return field
+
+
+def _to_number(value):
+    try:
+        return float(str(value).replace('$', '').replace(',', ''))
+    except ValueError:
+        raise QueryError(f"Expected a number, got '{value}'")
+
+
+def _to_date(value):
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    parsed = parse_purchase_date(text)
+    if parsed is None:
+        raise QueryError(f"Expected a date like 2024-03-17 or 17-Mar-24, got '{value}'")
+    return parsed
+
+
+class QueryIndex:
+    """Query-ready arrays for one library: lowercase text, numeric IDs and a sorted date index."""
+
+    def __init__(self, library):
+        self.columns = get_analytics(library).columns
+        c = self.columns
+        self.text = {
+            'name': np.array([name.lower() for name in c.names], dtype=str),
+            'method': np.array([method.lower() for method in c.methods], dtype=str),
+            'type': np.array([entry_type.lower() for entry_type in c.types], dtype=str),
+        }
+        self.numeric = {
+            'hours': c.hours,
+            'cost': c.cost,
+            'app_id': self._ids_to_float(c.app_ids),
+            'base_app_id': self._ids_to_float(c.base_app_ids),
+            'month': np.where(c.has_date, c.month, np.nan),
+        }
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.numeric['cost_per_hour'] = np.where((c.cost > 0) & (c.hours > 0), c.cost / c.hours, np.nan)
+
+        self._ranks = {}
+
+        # Purchase-date index: row indices ordered by date, plus the sorted ordinals for searchsorted
+        dated = np.flatnonzero(c.has_date)
+        order = np.argsort(c.date_ordinal[dated], kind='stable')
+        self.date_rows = dated[order]
+        self.sorted_dates = c.date_ordinal[self.date_rows]
+
+    @staticmethod
+    def _ids_to_float(values):
+        result = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            if value:
+                try:
+                    result[i] = float(value)
+                except ValueError:
+                    pass
+        return result
+
+    def __len__(self):
+        return len(self.columns)
+
+    def memory_bytes(self):
+        arrays = list(self.text.values()) + list(self.numeric.values()) + [self.date_rows, self.sorted_dates]
+        return sum(array.nbytes for array in arrays)
+
+    def ranks(self, field, lowercase=True):
+        """
+        (distinct values, rank of each row's value) for a text-like field, computed once.
+
+        Ranks order like the values, so they can stand in for the strings when sorting
+        or grouping.
+        """
+        key = (field, lowercase)
+        ranks = self._ranks.get(key)
+        if ranks is None:
+            if lowercase and field in self.text:
+                values = self.text[field]
+            else:
+                values = {'name': self.columns.names, 'method': self.columns.methods,
+                          'type': self.columns.types, 'base_app_id': self.columns.base_app_ids}[field].astype(str)
+            distinct, inverse = np.unique(values, return_inverse=True)
+            ranks = (distinct, inverse)
+            self._ranks[key] = ranks
+        return ranks
+
+    def date_range_mask(self, start=None, end=None):
+        """Rows purchased in [start, end) (date ordinals; None = open-ended), via binary search."""
+        lo = 0 if start is None else np.searchsorted(self.sorted_dates, start, side='left')
+        hi = len(self.sorted_dates) if end is None else np.searchsorted(self.sorted_dates, end, side='left')
+        mask = np.zeros(len(self), dtype=bool)
+        if hi > lo:
+            mask[self.date_rows[lo:hi]] = True
+        return mask
+
+    def is_empty(self, field):
+        """Mask of rows where the field has no value."""
+        if field in TEXT_FIELDS:
+            return self.text[field] == ''
+        if field in DATE_FIELDS:
+            return ~self.columns.has_date
+        return np.isnan(self.numeric[field])
+
+
+def get_query_index(library):
+    """Get the query index for a library (built once and kept with the library)."""
+    return library.get_derived('query_index', QueryIndex)
+
+
+# ---------------------------------------------------------------------------
+# Predicate compilation
+# ---------------------------------------------------------------------------
+
+def _date_bounds(op, start, end):
+    """Turn 'value op X' on a [start, end) ordinal span into a [lo, hi) range (None = open)."""
+    if op == '=':
+        return start, end
+    if op == '<':
+        return None, start
+    if op == '<=':
+        return None, end
+    if op == '>':
+        return end, None
+    if op == '>=':
+        return start, None
+    raise QueryError(f"Operator '{op}' is not supported for dates")
+
+
+def compile_condition(field, op, value):
+    """
+    Compile one comparison into a function index -> boolean mask.
+
+    Values are checked and converted here, so errors surface before anything runs.
+    """
+    field = _resolve_field(field)
+    if op not in OPERATORS:
+        raise QueryError(f"Unknown operator '{op}'")
+
+    if field in TEXT_FIELDS:
+        text = str(value).lower()
+        if op == '=':
+            return lambda index: index.text[field] == text
+        if op == '!=':
+            return lambda index: index.text[field] != text
+        if op == '~':
+            return lambda index: np.char.find(index.text[field], text) >= 0
+        if op == '!~':
+            return lambda index: np.char.find(index.text[field], text) < 0
+        raise QueryError(f"Operator '{op}' is not supported for text field '{field}'")
+
+    if field in DATE_FIELDS:
+        if op in ('~', '!~'):
+            raise QueryError(f"Operator '{op}' is not supported for '{field}'")
+        if field == 'year':
+            year = int(_to_number(value))
+            start, end = date(year, 1, 1).toordinal(), date(year + 1, 1, 1).toordinal()
+        else:
+            day = _to_date(value).toordinal()
+            start, end = day, day + 1
+        if op == '!=':
+            return lambda index: index.date_range_mask(None, start) | index.date_range_mask(end, None)
+        lo, hi = _date_bounds(op, start, end)
+        return lambda index: index.date_range_mask(lo, hi)
+
+    if op in ('~', '!~'):
+        raise QueryError(f"Operator '{op}' is not supported for number field '{field}'")
+    number = _to_number(value)
+    comparisons = {
+        '=': np.equal, '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+    }
+    if op == '!=':
+        # Rows without a value never match, as with the other operators
+        return lambda index: ~np.isnan(index.numeric[field]) & (index.numeric[field] != number)
+    compare = comparisons[op]
+    return lambda index: compare(index.numeric[field], number)
+
+
+def compile_empty(field, negate=False):
+    field = _resolve_field(field)
+    if negate:
+        return lambda index: ~index.is_empty(field)
+    return lambda index: index.is_empty(field)
+
+
+def compile_and(left, right):
+    return lambda index: left(index) & right(index)
+
+
+def compile_or(left, right):
+    return lambda index: left(index) | right(index)
+
+
+def compile_not(inner):
+    return lambda index: ~inner(index)
+
+
+# ---------------------------------------------------------------------------
+# Text parser
+# ---------------------------------------------------------------------------
+
+TOKEN_RE = re.compile(r'''\s*(?:
+    (?P<string>"[^"]*"|'[^']*')
+  | (?P<op>!=|<=|>=|!~|=|<|>|~|\(|\)|,)
+  | (?P<word>[^\s"'()<>=!~,]+)
+)''', re.VERBOSE)
+
+
+def tokenize(text):
+    """Split a query into (kind, value) tokens."""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise QueryError(f"Unexpected character at position {position}: '{text[position]}'")
+        position = match.end()
+        if match.group('string') is not None:
+            tokens.append(('string', match.group('string')[1:-1]))
+        elif match.group('op') is not None:
+            tokens.append(('op', match.group('op')))
+        else:
+            word = match.group('word')
+            kind = 'keyword' if word.lower() in KEYWORDS else 'word'
+            tokens.append((kind, word.lower() if kind == 'keyword' else word))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self, kind=None, value=None):
+        if self.position >= len(self.tokens):
+            return None
+        token = self.tokens[self.position]
+        if kind is not None and token[0] != kind:
+            return None
+        if value is not None and token[1] != value:
+            return None
+        return token
+
+    def take(self, kind=None, value=None, expected=None):
+        token = self.peek(kind, value)
+        if token is None:
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else 'end of query'
+            raise QueryError(f"Expected {expected or value or kind}, found '{found}'")
+        self.position += 1
+        return token
+
+    def parse(self, query):
+        if self.peek() and not self.peek('keyword', 'sort') and not self.peek('keyword', 'order') \
+                and not self.peek('keyword', 'group') and not self.peek('keyword', 'limit'):
+            query.where_compiled(self.parse_or())
+
+        while self.peek():
+            if self.peek('keyword', 'sort') or self.peek('keyword', 'order'):
+                self.position += 1
+                self.take('keyword', 'by')
+                while True:
+                    field = self.take('word', expected='a field name')[1]
+                    descending = False
+                    if self.peek('keyword', 'desc') or self.peek('keyword', 'asc'):
+                        descending = self.take()[1] == 'desc'
+                    query.sort_by(field, descending)
+                    if not self.peek('op', ','):
+                        break
+                    self.position += 1
+            elif self.peek('keyword', 'group'):
+                self.position += 1
+                self.take('keyword', 'by')
+                query.group_by(self.take('word', expected='a field name')[1])
+            elif self.peek('keyword', 'limit'):
+                self.position += 1
+                value = self.take('word', expected='a number')[1]
+                if not value.isdigit():
+                    raise QueryError(f"Limit must be a whole number, got '{value}'")
+                query.limit(int(value))
+            else:
+                raise QueryError(f"Unexpected '{self.peek()[1]}'")
+        return query
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek('keyword', 'or'):
+            self.position += 1
+            node = compile_or(node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek('keyword', 'and'):
+            self.position += 1
+            node = compile_and(node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek('keyword', 'not'):
+            self.position += 1
+            return compile_not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        if self.peek('op', '('):
+            self.position += 1
+            node = self.parse_or()
+            self.take('op', ')', expected="')'")
+            return node
+
+        field = self.take('word', expected='a field name')[1]
+        if self.peek('keyword', 'is'):
+            self.position += 1
+            negate = bool(self.peek('keyword', 'not'))
+            if negate:
+                self.position += 1
+            self.take('keyword', 'empty', expected="'empty'")
+            return compile_empty(field, negate)
+
+        op = self.take('op', expected='an operator')[1]
+        token = self.peek()
+        if token is None or token[0] not in ('word', 'string'):
+            raise QueryError(f"Expected a value after '{field} {op}'")
+        self.position += 1
+        return compile_condition(field, op, token[1])
+
+
+# ---------------------------------------------------------------------------
+# Query API
+# ---------------------------------------------------------------------------
+
+class QueryResult:
+    """Matching rows (in result order) or grouped aggregates."""
+
+    def __init__(self, library, indices, total_matches, groups=None, group_field=None, elapsed_ms=0.0):
+        self.library = library
+        self.indices = indices
+        self.total_matches = total_matches
+        self.groups = groups
+        self.group_field = group_field
+        self.elapsed_ms = elapsed_ms
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def games(self):
+        """The matching game dicts, in result order."""
+        return [self.library.games[i] for i in self.indices]
+
+
+class LibraryQuery:
+    """Filter/sort/group builder over one library; conditions added with where() are ANDed."""
+
+    def __init__(self, library):
+        self.library = library
+        self.index = get_query_index(library)
+        self._predicate = None
+        self._sort = []
+        self._group = None
+        self._limit = None
+
+    def where_compiled(self, predicate):
+        """AND an already compiled predicate (index -> mask) into the query."""
+        self._predicate = predicate if self._predicate is None else compile_and(self._predicate, predicate)
+        return self
+
+    def where(self, field, op, value):
+        """Keep rows where 'field op value' holds (op is one of = != < <= > >= ~ !~)."""
+        return self.where_compiled(compile_condition(field, op, value))
+
+    def where_empty(self, field, empty=True):
+        return self.where_compiled(compile_empty(field, negate=not empty))
+
+    def sort_by(self, field, descending=False):
+        """Add a sort key (earlier keys win); rows without a value always sort last."""
+        self._sort.append((_resolve_field(field), descending))
+        return self
+
+    def group_by(self, field):
+        field = _resolve_field(field)
+        if field not in GROUP_FIELDS:
+            raise QueryError(f"Cannot group by '{field}'. Group fields: {', '.join(sorted(GROUP_FIELDS))}")
+        self._group = field
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def mask(self):
+        """Boolean mask of the rows matching the conditions."""
+        if self._predicate is None:
+            return np.ones(len(self.index), dtype=bool)
+        return self._predicate(self.index)
+
+    def _sort_key(self, field, descending, rows):
+        """One float key per row for a field; missing values map to +inf so they sort last either way."""
+        if field in TEXT_FIELDS:
+            # Ranks stand in for the strings so text sorts in both directions
+            distinct, ranks = self.index.ranks(field)
+            values = ranks[rows].astype(float)
+            # '' sorts first among the distinct values, so empty cells have rank 0
+            missing = values == 0 if len(distinct) and distinct[0] == '' else np.zeros(len(rows), dtype=bool)
+        elif field in DATE_FIELDS:
+            values = self.index.columns.date_ordinal[rows].astype(float)
+            missing = values < 0
+        else:
+            values = self.index.numeric[field][rows]
+            missing = np.isnan(values)
+        if descending:
+            values = -values
+        return np.where(missing, np.inf, values)
+
+    def _order(self, rows):
+        if not self._sort:
+            return rows
+        keys = [self._sort_key(field, descending, rows) for field, descending in self._sort]
+        if len(keys) == 1:
+            key = keys[0]
+            if self._limit is not None and self._limit < len(rows) // 4:
+                # Only the first rows are needed: keep everything up to the limit-th key (ties
+                # included) and stable-sort that, which gives the same order as a full sort
+                if self._limit == 0:
+                    return rows[:0]
+                threshold = np.partition(key, self._limit - 1)[self._limit - 1]
+                candidates = np.flatnonzero(key <= threshold)
+                return rows[candidates[np.argsort(key[candidates], kind='stable')]]
+            return rows[np.argsort(key, kind='stable')]
+        # np.lexsort treats the last key as the primary one
+        return rows[np.lexsort(keys[::-1])]
+
+    def _group_keys(self, rows):
+        """(group number of each row, label of each group number) for the grouping field."""
+        c = self.index.columns
+        field = self._group
+        if field in ('year', 'month'):
+            dated = c.has_date[rows]
+            if field == 'year':
+                numbers = c.year[rows].astype(np.int64)
+            else:
+                numbers = c.year[rows].astype(np.int64) * 12 + (c.month[rows] - 1)
+            # Undated rows go to group 0; dates are dense, so no sort is needed
+            first = int(numbers[dated].min()) if dated.any() else 0
+            keys = np.where(dated, numbers - first + 1, 0)
+            if field == 'year':
+                label = lambda key: str(first + key - 1) if key else ''
+            else:
+                label = lambda key: f"{(first + key - 1) // 12:04d}-{(first + key - 1) % 12 + 1:02d}" if key else ''
+            return keys, label
+
+        distinct, inverse = self.index.ranks(field, lowercase=False)
+        return inverse[rows], lambda key: distinct[key]
+
+    def _groups(self, rows):
+        """Aggregate the rows per group, sorted and limited before any dicts are built."""
+        if len(rows) == 0:
+            return []
+        c = self.index.columns
+        keys, label = self._group_keys(rows)
+        counts = np.bincount(keys)
+        total_hours = np.bincount(keys, weights=np.nan_to_num(c.hours[rows]))
+        total_cost = np.bincount(keys, weights=np.nan_to_num(c.cost[rows]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per_hour = np.where(total_hours > 0, total_cost / total_hours, np.nan)
+
+        # Groups come out in key order; a sort on an aggregate (or descending keys) reorders them
+        group_numbers = np.flatnonzero(counts)
+        if self._sort:
+            field, descending = self._sort[0]
+            aggregates = {'hours': total_hours, 'cost': total_cost, 'cost_per_hour': per_hour}
+            if field in aggregates:
+                values = aggregates[field][group_numbers]
+                values = np.where(np.isnan(values), np.inf, -values if descending else values)
+                group_numbers = group_numbers[np.argsort(values, kind='stable')]
+            elif descending:
+                group_numbers = group_numbers[::-1]
+        if self._limit is not None:
+            group_numbers = group_numbers[:self._limit]
+
+        return [{
+            'key': label(int(key)) or '(none)',
+            'count': int(counts[key]),
+            'hours': round(float(total_hours[key]), 2),
+            'cost': round(float(total_cost[key]), 2),
+            'cost_per_hour': round(float(per_hour[key]), 2) if total_hours[key] > 0 else None,
+        } for key in group_numbers]
+
+    def run(self):
+        """Evaluate the query."""
+        start = time.perf_counter()
+        rows = np.flatnonzero(self.mask())
+        total = len(rows)
+        groups = None
+        if self._group:
+            groups = self._groups(rows)
+        else:
+            rows = self._order(rows)
+            if self._limit is not None:
+                rows = rows[:self._limit]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return QueryResult(self.library, rows, total, groups, self._group, elapsed_ms)
+
+
+def parse_query(library, text):
+    """Parse a text query into a LibraryQuery for a library."""
+    return _Parser(text).parse(LibraryQuery(library))
+
+
+def run_query(library, text):
+    """Parse and run a text query."""
+    return parse_query(library, text).run()
+
+
+def format_result(result, max_rows=50):
+    """Format a query result as a list of text lines."""
+    if result.groups is not None:
+        lines = [f"{result.total_matches} matching entries in {len(result.groups)} groups by {result.group_field} "
+                 f"({result.elapsed_ms:.1f} ms)", ""]
+        lines.append(f"{result.group_field.title():<30}{'Count':>8}{'Hours':>12}{'Cost':>12}{'$/Hour':>10}")
+        for group in result.groups[:max_rows]:
+            per_hour = f"{group['cost_per_hour']:.2f}" if group['cost_per_hour'] is not None else '-'
+            lines.append(f"{group['key'][:29]:<30}{group['count']:>8}{group['hours']:>12.2f}{group['cost']:>12.2f}{per_hour:>10}")
+        return lines
+
+    lines = [f"{result.total_matches} matching entries ({result.elapsed_ms:.1f} ms)"]
+    if len(result) < result.total_matches:
+        lines[0] += f", showing {len(result)}"
+    lines.append("")
+    for game in result.games[:max_rows]:
+        cost = f"${float(game['cost']):.2f}" if game['cost'] not in (None, '') else '-'
+        hours = game['hours'] if game['hours'] not in (None, '') else '-'
+        lines.append(f"{str(game['name'])[:45]:<46}{str(game['app_id'] or ''):>10}  {str(hours):>8} h  {cost:>9}  {game['date'] or ''}")
+    if len(result) > max_rows:
+        lines.append(f"... {len(result) - max_rows} more")
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from steam_library import load_library
+    from user_paths import get_user_spreadsheet_path, load_default_steam_id
+
+    parser = argparse.ArgumentParser(description="Query a Steam library spreadsheet.")
+    parser.add_argument('query', help='e.g. "hours < 1 and cost > 20 and year = 2024 sort by cost desc"')
+    parser.add_argument('--steam-id', help='Steam ID whose spreadsheet to query (default: last used)')
+    parser.add_argument('--path', help='Spreadsheet path (overrides --steam-id)')
+    parser.add_argument('--max-rows', type=int, default=50, help='Rows to print')
+    args = parser.parse_args()
+
+    spreadsheet_path = args.path or get_user_spreadsheet_path(args.steam_id or load_default_steam_id())
+    try:
+        result = run_query(load_library(spreadsheet_path), args.query)
+    except QueryError as e:
+        print(f"Query error: {e}")
+        sys.exit(2)
+    print('\n'.join(format_result(result, args.max_rows)))
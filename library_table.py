@@ -0,0 +1,609 @@
+"""
+Library Table View
+
+Full-library browser backed by a lazy QAbstractTableModel over the in-memory
+SteamLibrary. Rows are handed to the view in batches as it scrolls
+(canFetchMore/fetchMore), sorting uses per-column keys computed once per
+library version, and filtering runs over precomputed lowercase strings.
+
+The query window shows the results of library_query queries in the same model,
+and the search window the ranked matches of the search-as-you-type
+NamePrefixIndex (name_prefix_index).
+"""
+import time
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableView, QHeaderView, QPushButton, QTextEdit
+
+import metrics
+from custom_textbox import CustomTextBox
+from steam_library import LIBRARY_COLUMNS, COLUMN_TITLES, parse_purchase_date, to_float
+
+NUMERIC_COLUMNS = {'hours', 'cost'}
+
+
+def _format_value(column, value):
+    """Format a cell value for display."""
+    if value is None or value == "":
+        return ""
+    if column == 'cost':
+        number = to_float(value)
+        return f"${number:.2f}" if number is not None else str(value)
+    if column == 'hours':
+        number = to_float(value)
+        return f"{number:.2f}" if number is not None else str(value)
+    return str(value)
+
+
+def _sort_key(column, value):
+    """Sort key for a cell; the first element is 1 for empty cells."""
+    if column in NUMERIC_COLUMNS or column in ('app_id', 'base_app_id'):
+        number = to_float(value)
+        if number is not None:
+            return (0, number, "")
+    elif column == 'date':
+        parsed = parse_purchase_date(value)
+        if parsed is not None:
+            return (0, parsed.toordinal(), "")
+    if value is None or value == "":
+        return (1, 0, "")
+    return (0, 0, str(value).lower())
+
+
+class LibraryTableModel(QAbstractTableModel):
+    """Table model over a SteamLibrary with lazy row fetching, key-based sorting and column filters."""
+
+    BATCH_SIZE = 256
+
+    def __init__(self, library=None, columns=None, parent=None):
+        super().__init__(parent)
+        self.columns = columns or LIBRARY_COLUMNS
+        self._games = []
+        self._sorted = []       # all game indices in the current sort order
+        self._visible = []      # filtered subset of _sorted, in order
+        self._loaded = 0        # rows handed to the view so far
+        self._sort_keys = {}    # column -> list of keys, one per game
+        self._search_text = {}  # column (or None for all) -> list of lowercase strings
+        self._filter = (None, "")
+        if library is not None:
+            self.set_library(library)
+
+    def set_library(self, library, indices=None):
+        """Show a library (or a subset of it given as game indices), keeping the filter."""
+        self.beginResetModel()
+        self._games = library.games
+        self._sort_keys = {}
+        self._search_text = {}
+        self._sorted = list(indices) if indices is not None else list(range(len(self._games)))
+        self._apply_filter()
+        self._loaded = min(self.BATCH_SIZE, len(self._visible))
+        self.endResetModel()
+
+    def total_count(self):
+        return len(self._sorted)
+
+    def visible_count(self):
+        return len(self._visible)
+
+    def game_at(self, row):
+        """Get the game dict shown at a view row."""
+        return self._games[self._visible[row]]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._visible)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.BATCH_SIZE, len(self._visible) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        column = self.columns[index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return _format_value(column, self._games[self._visible[index.row()]].get(column))
+        if role == Qt.ItemDataRole.TextAlignmentRole and column in NUMERIC_COLUMNS:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMN_TITLES.get(self.columns[section], self.columns[section])
+        return str(section + 1)
+
+    def _keys_for(self, column):
+        keys = self._sort_keys.get(column)
+        if keys is None:
+            keys = [_sort_key(column, game.get(column)) for game in self._games]
+            self._sort_keys[column] = keys
+        return keys
+
+    def _text_for(self, column):
+        texts = self._search_text.get(column)
+        if texts is None:
+            if column is None:
+                texts = [' '.join(_format_value(c, game.get(c)) for c in self.columns).lower() for game in self._games]
+            else:
+                texts = [_format_value(column, game.get(column)).lower() for game in self._games]
+            self._search_text[column] = texts
+        return texts
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        keys = self._keys_for(self.columns[column])
+        self.beginResetModel()
+        # Empty cells stay at the bottom in both directions
+        present = [i for i in self._sorted if keys[i][0] == 0]
+        missing = [i for i in self._sorted if keys[i][0] != 0]
+        present.sort(key=keys.__getitem__, reverse=order == Qt.SortOrder.DescendingOrder)
+        self._sorted = present + missing
+        self._apply_filter()
+        self._loaded = min(max(self._loaded, self.BATCH_SIZE), len(self._visible))
+        self.endResetModel()
+
+    def set_filter(self, column, text):
+        """Filter rows whose column (None = any column) contains the text (case-insensitive)."""
+        self.beginResetModel()
+        self._filter = (column, text.lower().strip())
+        self._apply_filter()
+        self._loaded = min(self.BATCH_SIZE, len(self._visible))
+        self.endResetModel()
+
+    def _apply_filter(self):
+        column, text = self._filter
+        if not text:
+            self._visible = list(self._sorted)
+            return
+        texts = self._text_for(column)
+        self._visible = [i for i in self._sorted if text in texts[i]]
+
+
+class LibraryTableWindow(QDialog):
+    """Non-modal window for browsing, sorting and filtering the whole library."""
+
+    def __init__(self, library, parent=None, title='Steam Library'):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setMinimumSize(1000, 600)
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #2b2b2b;
+                color: white;
+            }
+            QLabel {
+                color: white;
+            }
+            QComboBox {
+                background-color: #404040;
+                color: white;
+                border: 1px solid #666;
+                padding: 5px;
+            }
+            QComboBox QAbstractItemView {
+                background-color: #404040;
+                color: white;
+            }
+            QTableView {
+                background-color: #404040;
+                alternate-background-color: #363636;
+                color: white;
+                gridline-color: #555;
+                border: 1px solid #666;
+            }
+            QHeaderView::section {
+                background-color: #2b2b2b;
+                color: white;
+                border: 1px solid #555;
+                padding: 4px;
+            }
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                margin: 5px 2px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background-color: #45a049;
+            }
+        """)
+
+        layout = QVBoxLayout()
+
+        # Filter row
+        filter_layout = QHBoxLayout()
+        filter_label = QLabel('Filter:')
+        filter_label.setFont(QFont("Arial", 11))
+        filter_layout.addWidget(filter_label)
+
+        self.column_combo = QComboBox()
+        self.column_combo.addItem('All Columns', None)
+        for column in LIBRARY_COLUMNS:
+            self.column_combo.addItem(COLUMN_TITLES[column], column)
+        filter_layout.addWidget(self.column_combo)
+
+        self.filter_input = CustomTextBox()
+        self.filter_input.setPlaceholderText('Type to filter...')
+        filter_layout.addWidget(self.filter_input, 1)
+        layout.addLayout(filter_layout)
+
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+
+        # Table
+        self.model = LibraryTableModel(library, parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.setAlternatingRowColors(True)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 350)
+        layout.addWidget(self.table)
+
+        close_button = QPushButton('Close')
+        close_button.clicked.connect(self.close)
+        layout.addWidget(close_button)
+        self.setLayout(layout)
+
+        # Debounce filtering so typing stays smooth on big libraries
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_input.textChanged.connect(self.filter_timer.start)
+        self.column_combo.currentIndexChanged.connect(self.apply_filter)
+
+        self.update_count_label()
+
+    def set_library(self, library, indices=None):
+        """Replace the displayed library (e.g. after a reload), keeping the current sort."""
+        self.model.set_library(library, indices)
+        header = self.table.horizontalHeader()
+        if header.sortIndicatorSection() >= 0:
+            self.model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+        self.update_count_label()
+
+    def apply_filter(self):
+        self.model.set_filter(self.column_combo.currentData(), self.filter_input.text())
+        self.update_count_label()
+
+    def update_count_label(self):
+        self.count_label.setText(f"Showing {self.model.visible_count()} of {self.model.total_count()} entries")
+
+
+class LibraryQueryWindow(QDialog):
+    """Non-modal window for running library queries (see library_query) and browsing the matches."""
+
+    EXAMPLES = [
+        'hours < 1 and cost > 20 and year = 2024',
+        'name ~ "war" and not type = DLC sort by hours desc',
+        'cost is not empty group by year',
+        'cost_per_hour > 5 sort by cost_per_hour desc limit 25',
+    ]
+
+    def __init__(self, library, parent=None, title='Query Library'):
+        super().__init__(parent)
+        self.library = library
+        self.setWindowTitle(title)
+        self.setMinimumSize(1000, 650)
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #2b2b2b;
+                color: white;
+            }
+            QLabel {
+                color: white;
+            }
+            QComboBox {
+                background-color: #404040;
+                color: white;
+                border: 1px solid #666;
+                padding: 5px;
+            }
+            QComboBox QAbstractItemView {
+                background-color: #404040;
+                color: white;
+            }
+            QTableView, QTextEdit {
+                background-color: #404040;
+                alternate-background-color: #363636;
+                color: white;
+                gridline-color: #555;
+                border: 1px solid #666;
+            }
+            QTextEdit {
+                font-family: 'Courier New', monospace;
+            }
+            QHeaderView::section {
+                background-color: #2b2b2b;
+                color: white;
+                border: 1px solid #555;
+                padding: 4px;
+            }
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                margin: 5px 2px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background-color: #45a049;
+            }
+        """)
+
+        layout = QVBoxLayout()
+
+        query_layout = QHBoxLayout()
+        query_label = QLabel('Query:')
+        query_label.setFont(QFont("Arial", 11))
+        query_layout.addWidget(query_label)
+        self.query_input = CustomTextBox()
+        self.query_input.setPlaceholderText(self.EXAMPLES[0])
+        query_layout.addWidget(self.query_input, 1)
+        run_button = QPushButton('Run')
+        run_button.setDefault(True)  # Enter in the query box runs it
+        run_button.clicked.connect(self.run_query)
+        query_layout.addWidget(run_button)
+        layout.addLayout(query_layout)
+
+        self.examples_combo = QComboBox()
+        self.examples_combo.addItem('Examples...', None)
+        for example in self.EXAMPLES:
+            self.examples_combo.addItem(example, example)
+        self.examples_combo.activated.connect(self.use_example)
+        layout.addWidget(self.examples_combo)
+
+        help_label = QLabel("Fields: name, app_id, hours, cost, date, method, type, base, year, month, cost_per_hour.  "
+                            "Operators: = != < <= > >= ~ (contains) !~, is empty.  "
+                            "Combine with and / or / not; add sort by, group by, limit.")
+        help_label.setWordWrap(True)
+        layout.addWidget(help_label)
+
+        self.status_label = QLabel('Enter a query and press Run')
+        layout.addWidget(self.status_label)
+
+        # Matching rows
+        self.model = LibraryTableModel(parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setAlternatingRowColors(True)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 350)
+        layout.addWidget(self.table)
+
+        # Grouped results
+        self.groups_text = QTextEdit()
+        self.groups_text.setReadOnly(True)
+        self.groups_text.hide()
+        layout.addWidget(self.groups_text)
+
+        close_button = QPushButton('Close')
+        close_button.setAutoDefault(False)
+        close_button.clicked.connect(self.close)
+        layout.addWidget(close_button)
+        self.setLayout(layout)
+
+    def set_library(self, library):
+        """Switch to a reloaded library and re-run the current query on it."""
+        self.library = library
+        if self.query_input.text().strip():
+            self.run_query()
+        else:
+            self.model.set_library(library, [])
+
+    def use_example(self, index):
+        example = self.examples_combo.itemData(index)
+        if example:
+            self.query_input.setText(example)
+            self.run_query()
+
+    def run_query(self):
+        from library_query import QueryError, run_query, format_result
+
+        text = self.query_input.text().strip()
+        try:
+            result = run_query(self.library, text)
+        except QueryError as e:
+            self.status_label.setText(f"Query error: {e}")
+            return
+
+        if result.groups is not None:
+            self.table.hide()
+            self.groups_text.show()
+            self.groups_text.setPlainText('\n'.join(format_result(result, max_rows=len(result.groups))))
+            self.status_label.setText(f"{result.total_matches} matching entries in {len(result.groups)} groups "
+                                      f"({result.elapsed_ms:.1f} ms)")
+            return
+
+        self.groups_text.hide()
+        self.table.show()
+        self.model.set_library(self.library, result.indices.tolist())
+        status = f"{result.total_matches} matching entries ({result.elapsed_ms:.1f} ms)"
+        if len(result) < result.total_matches:
+            status += f", showing {len(result)}"
+        self.status_label.setText(status)
+
+
+class GameSearchWindow(QDialog):
+    """
+    Non-modal search-as-you-type window over the library's NamePrefixIndex.
+
+    Every (debounced) keystroke runs the prefix lookup on the UI thread and shows the
+    ranked matches right away; when they don't fill the table, fuzzy matches are looked
+    up on the task pool and added below them if the text hasn't changed meanwhile.
+    The library's prefix index must already be built (see get_prefix_index).
+    """
+
+    MAX_RESULTS = 25
+
+    def __init__(self, library, tasks, parent=None, title='Search Game Stats'):
+        super().__init__(parent)
+        self.tasks = tasks
+        self.results = []
+        self.prefix_total = 0
+        self.elapsed = 0.0         # last prefix lookup, in seconds
+        self.pending_fuzzy = None  # text waiting for a fuzzy lookup (one runs at a time)
+        self.setWindowTitle(title)
+        self.setMinimumSize(1000, 500)
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #2b2b2b;
+                color: white;
+            }
+            QLabel {
+                color: white;
+            }
+            QTableView {
+                background-color: #404040;
+                alternate-background-color: #363636;
+                color: white;
+                gridline-color: #555;
+                border: 1px solid #666;
+            }
+            QHeaderView::section {
+                background-color: #2b2b2b;
+                color: white;
+                border: 1px solid #555;
+                padding: 4px;
+            }
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                margin: 5px 2px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background-color: #45a049;
+            }
+        """)
+
+        layout = QVBoxLayout()
+
+        search_layout = QHBoxLayout()
+        search_label = QLabel('Game name:')
+        search_label.setFont(QFont("Arial", 11))
+        search_layout.addWidget(search_label)
+        self.search_input = CustomTextBox()
+        self.search_input.setPlaceholderText('Start typing a game name...')
+        search_layout.addWidget(self.search_input, 1)
+        layout.addLayout(search_layout)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        # Matches in rank order (no column sorting)
+        self.model = LibraryTableModel(parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setAlternatingRowColors(True)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 350)
+        layout.addWidget(self.table)
+
+        close_button = QPushButton('Close')
+        close_button.setAutoDefault(False)
+        close_button.clicked.connect(self.close)
+        layout.addWidget(close_button)
+        self.setLayout(layout)
+
+        # Short debounce: a lookup takes well under a millisecond, this only skips
+        # the intermediate texts of fast typing
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(100)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+
+        self.set_library(library)
+
+    def set_library(self, library):
+        """Switch to a (reloaded) library whose prefix index is built and re-run the search."""
+        from name_prefix_index import get_prefix_index
+
+        self.library = library
+        self.index = get_prefix_index(library)
+        self.run_search()
+
+    def run_search(self):
+        from name_prefix_index import FUZZY_LIMIT, FUZZY_MIN_LENGTH
+
+        self.search_timer.stop()
+        text = self.search_input.text().strip()
+        start = time.perf_counter()
+        self.results, self.prefix_total = self.index.prefix_matches(text, self.MAX_RESULTS)
+        self.elapsed = time.perf_counter() - start
+        metrics.observe('search_keystroke_seconds', self.elapsed)
+        self.model.set_library(self.library, [result['index'] for result in self.results])
+
+        if not text:
+            self.status_label.setText(f"Type to search {len(self.index)} games")
+        else:
+            self.update_status(text)
+
+        self.pending_fuzzy = None
+        room = self.MAX_RESULTS - len(self.results)
+        if room > 0 and len(text) >= FUZZY_MIN_LENGTH:
+            self.pending_fuzzy = (text, min(room, FUZZY_LIMIT))
+            self.start_fuzzy_search()
+
+    def start_fuzzy_search(self):
+        if self.pending_fuzzy is None or self.tasks.is_running('search_fuzzy'):
+            return  # The running lookup starts the pending one when it finishes
+        text, limit = self.pending_fuzzy
+        self.pending_fuzzy = None
+        index = self.index
+        exclude = {result['index'] for result in self.results}
+        self.tasks.run('search_fuzzy', index.fuzzy_matches, text, limit, exclude,
+                       on_result=lambda matches: self.add_fuzzy_matches(index, text, matches),
+                       on_error=lambda error: print(f"Fuzzy search failed: {error}"),
+                       on_finished=self.start_fuzzy_search)
+
+    def add_fuzzy_matches(self, index, text, matches):
+        # Drop results for an older text or library
+        if index is not self.index or text != self.search_input.text().strip() or not matches:
+            return
+        self.results = self.results + matches
+        self.model.set_library(self.library, [result['index'] for result in self.results])
+        self.update_status(text)
+
+    def update_status(self, text):
+        fuzzy = sum(1 for result in self.results if result['match'] == 'fuzzy')
+        if self.prefix_total:
+            status = f"{self.prefix_total} games with a name or word starting with '{text}'"
+            if self.prefix_total > len(self.results) - fuzzy:
+                status += f", showing the best {len(self.results) - fuzzy}"
+        else:
+            status = f"No games starting with '{text}'"
+        if fuzzy:
+            status += f"; {fuzzy} similar names"
+        status += f" ({self.elapsed * 1000:.2f} ms)"
+        self.status_label.setText(status)
@@ -0,0 +1,86 @@
+"""
+Spreadsheet Watcher
+
+Notices when the current user's spreadsheet is rewritten by another process
+(the scheduled sync job, Excel, the DLC compaction script) so the dashboard
+can refresh itself without a restart.
+
+Bursts of file events are debounced into one check, and the check only fires
+when the file's (size, mtime) fingerprint differs from the last one seen. The
+receiver still compares a digest of the rows before replacing the library
+(see steam_library.reload_if_changed).
+"""
+import os
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from steam_library import spreadsheet_fingerprint
+
+
+class SpreadsheetWatcher(QObject):
+    """Debounced QFileSystemWatcher for a single spreadsheet file."""
+
+    # Emitted with the spreadsheet path once writes have settled and the file looks different
+    changed = pyqtSignal(str)
+
+    def __init__(self, parent=None, debounce_ms=500):
+        super().__init__(parent)
+        self.path = None
+        self.fingerprint = None
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._on_event)
+        self.watcher.directoryChanged.connect(self._on_event)
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(debounce_ms)
+        self.debounce_timer.timeout.connect(self._check)
+
+    def watch(self, path, fingerprint=None):
+        """
+        Watch a spreadsheet, treating the given fingerprint as already seen.
+
+        Calling this again for the same path just updates the known fingerprint
+        (e.g. after the app itself has reloaded or saved the file).
+        """
+        path = os.path.abspath(path)
+        self.fingerprint = fingerprint if fingerprint is not None else spreadsheet_fingerprint(path)
+        if path == self.path:
+            self._ensure_watched()
+            return
+
+        self.stop()
+        self.path = path
+        self._ensure_watched()
+
+    def stop(self):
+        """Stop watching."""
+        self.debounce_timer.stop()
+        watched = self.watcher.files() + self.watcher.directories()
+        if watched:
+            self.watcher.removePaths(watched)
+        self.path = None
+        self.fingerprint = None
+
+    def _ensure_watched(self):
+        # Many writers save to a temp file and rename it over the original, which
+        # drops the file watch, so the directory is watched as well.
+        directory = os.path.dirname(self.path) or '.'
+        if os.path.isdir(directory) and directory not in self.watcher.directories():
+            self.watcher.addPath(directory)
+        if os.path.exists(self.path) and self.path not in self.watcher.files():
+            self.watcher.addPath(self.path)
+
+    def _on_event(self, _path):
+        if self.path is not None:
+            self.debounce_timer.start()
+
+    def _check(self):
+        if self.path is None:
+            return
+        self._ensure_watched()
+        fingerprint = spreadsheet_fingerprint(self.path)
+        if fingerprint is None or fingerprint == self.fingerprint:
+            return
+        self.fingerprint = fingerprint
+        self.changed.emit(self.path)
@@ -0,0 +1,214 @@
+"""
+Log Pipeline
+
+Structured, non-blocking logging for the whole project. Callers put records
+on a bounded queue and return immediately; a background writer thread drains
+the queue in batches, groups the records by destination file and writes each
+batch with one open/write per file. Nothing on a hot path ever waits for disk.
+
+    log_pipeline.log_event('game_errors', "Invalid playtime value",
+                           steam_id=steam_id, game=name, app_id=app_id)
+
+Records are JSON lines with time, level, channel, message and any extra
+fields. A record with a steam_id goes to that user's log directory
+(ExcelFiles/<steam_id>/logs/<channel>.jsonl), everything else to
+logs/<channel>.jsonl. Files roll over to a single .1 backup at 5 MB.
+
+If the queue is full (the disk can't keep up), records are dropped and
+counted rather than blocking the caller.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from logging.handlers import QueueHandler
+
+import metrics
+from user_paths import get_user_log_dir
+
+LOG_DIR = 'logs'
+ROOT_LOGGER = 'steamhours'
+QUEUE_SIZE = 10000
+BATCH_SIZE = 500
+# Longest a record waits in the writer before its batch is written
+FLUSH_INTERVAL = 0.5
+MAX_BYTES = 5 * 1024 * 1024
+
+# Attributes every LogRecord has; anything else came in through extra=
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+# Set by the pipeline itself; not part of the JSON line
+_INTERNAL_ATTRIBUTES = {'log_path'}
+
+
+def format_record(record):
+    """Turn a log record into one JSON line (without the newline)."""
+    data = {
+        'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+        'level': record.levelname,
+        'channel': record.name[len(ROOT_LOGGER) + 1:] if record.name.startswith(ROOT_LOGGER + '.') else record.name,
+        'message': record.getMessage(),
+    }
+    for key, value in vars(record).items():
+        if key not in _STANDARD_ATTRIBUTES and key not in _INTERNAL_ATTRIBUTES and not key.startswith('_'):
+            data[key] = value
+    if record.exc_info:
+        data['exception'] = logging.Formatter().formatException(record.exc_info)
+    return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def get_log_path(channel, steam_id=None):
+    """Where records of a channel (and optionally a user) are written."""
+    log_dir = get_user_log_dir(steam_id) if steam_id else LOG_DIR
+    return os.path.join(log_dir, f"{channel}.jsonl")
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of waiting when the queue is full."""
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.pipeline.dropped += 1
+            metrics.inc('log_records_dropped_total')
+
+    def prepare(self, record):
+        # Keep the record as is (extra fields included); formatting happens on the writer thread
+        return record
+
+
+class LogPipeline:
+    """Bounded queue plus one writer thread that writes records in batches."""
+
+    def __init__(self, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, max_bytes=MAX_BYTES):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self.written = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Write everything still queued and stop the writer."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+
+    def flush(self, timeout=2.0):
+        """Wait until every queued record has been written (for exit paths and scripts)."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _run(self):
+        while not self._stop.is_set() or not self.queue.empty():
+            try:
+                first = self.queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"Failed to write {len(batch)} log records: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write_batch(self, batch):
+        lines_by_path = defaultdict(list)
+        for record in batch:
+            lines_by_path[record.log_path].append(format_record(record))
+        for path, lines in lines_by_path.items():
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._roll_over(path)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            self.written += len(lines)
+        metrics.inc('log_records_written_total', len(batch))
+
+    def _roll_over(self, path):
+        try:
+            if os.path.getsize(path) < self.max_bytes:
+                return
+        except OSError:
+            return
+        os.replace(path, f"{path}.1")
+
+
+class _PathFilter(logging.Filter):
+    """Works out each record's file on the caller's thread (cheap) so the writer only groups."""
+
+    def filter(self, record):
+        if not hasattr(record, 'log_path'):
+            channel = record.name[len(ROOT_LOGGER) + 1:] if record.name.startswith(ROOT_LOGGER + '.') else 'app'
+            record.log_path = get_log_path(channel.replace('.', '_'), getattr(record, 'steam_id', None))
+        return True
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """Get the process-wide pipeline, starting it and attaching it to the 'steamhours' logger on first use."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = LogPipeline()
+            _pipeline.start()
+            handler = _NonBlockingQueueHandler(_pipeline)
+            handler.addFilter(_PathFilter())
+            root = logging.getLogger(ROOT_LOGGER)
+            root.addHandler(handler)
+            root.setLevel(logging.INFO)
+            # Structured records go to their files only, not to the console
+            root.propagate = False
+            atexit.register(_pipeline.stop)
+        return _pipeline
+
+
+def get_logger(channel):
+    """Get the logger of a channel (e.g. 'game_errors'); its records go through the pipeline."""
+    get_pipeline()
+    return logging.getLogger(f"{ROOT_LOGGER}.{channel}")
+
+
+def log_event(channel, message, level=logging.INFO, steam_id=None, **fields):
+    """Queue one structured record; extra keyword arguments become JSON fields."""
+    # Fields named like LogRecord attributes (name, args, ...) would be rejected by logging
+    extra = {(f"{key}_" if key in _STANDARD_ATTRIBUTES else key): value for key, value in fields.items()}
+    if steam_id:
+        extra['steam_id'] = str(steam_id)
+    get_logger(channel).log(level, message, extra=extra)
+
+
+def flush(timeout=2.0):
+    if _pipeline is not None:
+        _pipeline.flush(timeout)
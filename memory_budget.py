@@ -0,0 +1,275 @@
+"""
+Memory Budget Mode
+
+Optional tracemalloc instrumentation of the memory-heavy stages (fetch,
+DataFrame build, workbook save/load, CSV load, import). For each stage it
+records the peak traced memory, the net change and the top allocation sites,
+so a memory regression shows up with the lines that caused it.
+
+    with memory_budget.stage('fetch'):
+        games_data = fetch_steam_games(steam_id)
+
+With a budget set, any stage whose peak goes over it is recorded as a
+violation; the CLI then fails the run (exit code 1) after writing the report,
+so scheduled syncs on small runners catch regressions before production.
+
+Tracing slows Python allocations down noticeably, so it is off unless asked
+for. Peaks are process-wide: the numbers are exact for the CLI's single
+operation, approximate when several GUI tasks run at once.
+
+Environment:
+    STEAMHOURS_MEMORY            Set to 1 to trace memory per stage
+    STEAMHOURS_MEMORY_BUDGET_MB  Peak budget per stage in MB (also turns tracing on)
+    STEAMHOURS_MEMORY_TOP        Allocation sites kept per stage (default 10)
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import metrics
+
+LOG_DIR = 'logs'
+DEFAULT_TOP = 10
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """A stage's traced peak went over the configured budget."""
+
+
+def _env_budget_bytes():
+    value = os.getenv('STEAMHOURS_MEMORY_BUDGET_MB', '').strip()
+    if not value:
+        return None
+    try:
+        return int(float(value) * 1024 * 1024)
+    except ValueError:
+        print(f"Ignoring invalid STEAMHOURS_MEMORY_BUDGET_MB: {value}")
+        return None
+
+
+def _env_top():
+    try:
+        return int(os.getenv('STEAMHOURS_MEMORY_TOP', DEFAULT_TOP))
+    except ValueError:
+        return DEFAULT_TOP
+
+
+def _max_rss_bytes():
+    """Peak resident set size of the process, where the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _site_sizes():
+    """Traced {site: (bytes, blocks)} by source line, leaving out tracemalloc's own allocations."""
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ])
+    sizes = {}
+    for statistic in snapshot.statistics('lineno'):
+        frame = statistic.traceback[0]
+        sizes[f"{frame.filename}:{frame.lineno}"] = (statistic.size, statistic.count)
+    return sizes
+
+
+def format_mb(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class _Stage:
+    """One running stage; nested stages pass their peak up to the enclosing one."""
+
+    def __init__(self, name):
+        self.name = name
+        self.peak = 0
+        self.start_current = 0
+        self.start_sites = None
+        self.started = 0.0
+
+
+class MemoryTracker:
+    """Per-stage tracemalloc peaks and allocation sites, checked against a budget."""
+
+    def __init__(self, budget_bytes=None, top=DEFAULT_TOP):
+        self.budget_bytes = budget_bytes
+        self.top = top
+        self.enabled = False
+        self.records = []      # finished stages, in completion order
+        self.violations = []   # records over budget
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enable(self, budget_bytes=None):
+        """Start tracing (if not already) and optionally set the budget."""
+        if budget_bytes is not None:
+            self.budget_bytes = budget_bytes
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, name):
+        stack = self._stack()
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # The parent's peak so far would be lost by the reset below
+            stack[-1].peak = max(stack[-1].peak, peak)
+        entry = _Stage(name)
+        # Only per-line totals are kept; a full snapshot would itself inflate the stage's peak
+        entry.start_sites = _site_sizes()
+        entry.start_current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        entry.started = time.perf_counter()
+        stack.append(entry)
+
+    def end(self):
+        stack = self._stack()
+        entry = stack.pop()
+        current, peak = tracemalloc.get_traced_memory()
+        entry.peak = max(entry.peak, peak)
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, entry.peak)
+
+        seconds = time.perf_counter() - entry.started
+        end_sites = _site_sizes()
+        diffs = []
+        for site in end_sites.keys() | entry.start_sites.keys():
+            end_size, end_count = end_sites.get(site, (0, 0))
+            start_size, start_count = entry.start_sites.get(site, (0, 0))
+            if end_size != start_size:
+                diffs.append({'site': site, 'size_diff': end_size - start_size, 'count_diff': end_count - start_count})
+        diffs.sort(key=lambda diff: abs(diff['size_diff']), reverse=True)
+        sites = diffs[:self.top]
+
+        record = {
+            'stage': entry.name,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'seconds': round(seconds, 3),
+            'peak_bytes': entry.peak,
+            'start_bytes': entry.start_current,
+            'net_bytes': current - entry.start_current,
+            'top_sites': sites,
+        }
+        record['over_budget'] = self.budget_bytes is not None and entry.peak > self.budget_bytes
+        with self._lock:
+            self.records.append(record)
+            if record['over_budget']:
+                self.violations.append(record)
+        metrics.set_gauge('memory_peak_bytes', entry.peak, stage=entry.name)
+        if record['over_budget']:
+            print(f"Memory budget exceeded in stage '{entry.name}': peak {format_mb(entry.peak)} "
+                  f"> budget {format_mb(self.budget_bytes)}")
+        return record
+
+    def stage(self, name):
+        """Context manager that traces one stage (does nothing when tracing is off)."""
+        return _StageContext(self, name)
+
+    def check(self):
+        """Raise MemoryBudgetExceeded if any stage went over the budget."""
+        if self.violations:
+            worst = max(self.violations, key=lambda record: record['peak_bytes'])
+            raise MemoryBudgetExceeded(
+                f"{len(self.violations)} stage(s) over the {format_mb(self.budget_bytes)} memory budget; "
+                f"worst: {worst['stage']} at {format_mb(worst['peak_bytes'])}")
+
+    def get_report(self):
+        """The per-stage report as a list of lines."""
+        budget = format_mb(self.budget_bytes) if self.budget_bytes is not None else 'none'
+        lines = [f"Memory report ({datetime.now().isoformat(timespec='seconds')}), budget per stage: {budget}"]
+        max_rss = _max_rss_bytes()
+        if max_rss is not None:
+            lines.append(f"Process peak RSS: {format_mb(max_rss)}")
+        lines.append("")
+        lines.append(f"{'Stage':<22}{'Peak':>12}{'Net':>12}{'Seconds':>10}")
+        for record in self.records:
+            flag = '  OVER BUDGET' if record['over_budget'] else ''
+            lines.append(f"{record['stage']:<22}{format_mb(record['peak_bytes']):>12}{format_mb(record['net_bytes']):>12}"
+                         f"{record['seconds']:>10.2f}{flag}")
+        for record in self.records:
+            lines.append("")
+            lines.append(f"Top allocation sites in {record['stage']}:")
+            for site in record['top_sites']:
+                lines.append(f"  {site['size_diff'] / 1024:>10.1f} KB  {site['count_diff']:>8} blocks  {site['site']}")
+        return lines
+
+    def write_report(self, run='run', log_dir=LOG_DIR):
+        """Write logs/memory_<run>.txt and .json; returns the text report path."""
+        os.makedirs(log_dir, exist_ok=True)
+        base = os.path.join(log_dir, f"memory_{run}")
+        with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.get_report()) + '\n')
+        with open(f"{base}.json", 'w', encoding='utf-8') as f:
+            json.dump({'budget_bytes': self.budget_bytes, 'max_rss_bytes': _max_rss_bytes(),
+                       'stages': self.records}, f, indent=2)
+        return f"{base}.txt"
+
+
+class _StageContext:
+    def __init__(self, tracker, name):
+        self.tracker = tracker
+        self.name = name
+        self.active = False
+
+    def __enter__(self):
+        self.active = self.tracker.enabled
+        if self.active:
+            self.tracker.begin(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.active:
+            self.tracker.end()
+        return False
+
+
+_tracker = MemoryTracker(budget_bytes=_env_budget_bytes(), top=_env_top())
+if _tracker.budget_bytes is not None or os.getenv('STEAMHOURS_MEMORY', '0').strip().lower() in ('1', 'true', 'yes', 'on'):
+    _tracker.enable()
+
+
+def get_tracker():
+    """Get the process-wide memory tracker."""
+    return _tracker
+
+
+def is_enabled():
+    return _tracker.enabled
+
+
+def enable(budget_mb=None):
+    """Turn memory tracing on for the rest of the process, optionally with a budget in MB."""
+    _tracker.enable(int(budget_mb * 1024 * 1024) if budget_mb is not None else None)
+
+
+def stage(name):
+    return _tracker.stage(name)
+
+
+def traced(name):
+    """Decorator form of stage() for a whole function."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _tracker.enabled:
+                return fn(*args, **kwargs)
+            with _tracker.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,284 @@
+"""
+Metrics Registry
+
+Process-wide counters, gauges and latency histograms for the hot paths
+(Steam requests, cache hits, workbook loads, CSV rows matched, dialogs shown).
+
+    metrics.inc('steam_requests_total', endpoint='owned_games', status='200')
+    metrics.set_gauge('library_rows', 1234)
+    with metrics.timer('workbook_load_seconds', kind='library'):
+        ...
+
+export_metrics() writes a JSON snapshot (metrics/metrics_<run>.json) and a
+Prometheus textfile (metrics/steamhours_<run>.prom) for the node exporter's
+textfile collector. Values cover the current run only; the CLI and the GUI
+export once at the end of each run, one file pair per kind of run so a sync
+doesn't overwrite the numbers of the last import. Every Prometheus series
+carries a run label, so no two files repeat a series. STEAMHOURS_METRICS_DIR
+moves the files (e.g. straight into the collector directory).
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_DIR = 'metrics'
+JSON_FILENAME = 'metrics_{run}.json'
+PROMETHEUS_FILENAME = 'steamhours_{run}.prom'
+PREFIX = 'steamhours_'
+
+# Upper bounds in seconds, from a fast cache hit to a slow workbook save
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    'steam_requests_total': 'Steam Web/Store API requests by endpoint and status',
+    'steam_request_seconds': 'Steam API request latency',
+    'cache_requests_total': 'Cache lookups by cache and result (hit/miss)',
+    'workbook_load_seconds': 'Time to load a workbook',
+    'workbook_save_seconds': 'Time to save a workbook',
+    'library_rows': 'Rows in the last loaded library',
+    'sync_games': 'Games returned by the last sync',
+    'csv_rows_total': 'Purchase CSV rows by stage and outcome',
+    'import_games_total': 'Imported games by outcome',
+    'import_matches_total': 'Library name matches during import by method',
+    'dialogs_shown_total': 'Dialogs shown by type',
+    'ui_handler_seconds': 'GUI button handler duration',
+    'ui_stall_seconds': 'GUI event loop stalls over the threshold',
+    'search_keystroke_seconds': 'Search-as-you-type prefix lookup per keystroke',
+    'run_seconds': 'Duration of the last run',
+    'run_success': '1 if the last run succeeded',
+    'last_run_timestamp_seconds': 'Unix time the last run finished',
+    'normalization_cache_hits': 'Name normalization cache hits by function',
+    'normalization_cache_misses': 'Name normalization cache misses by function',
+    'normalization_cache_hit_ratio': 'Name normalization cache hit rate by function',
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values (seconds)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def to_dict(self):
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            cumulative.append(['+Inf' if bound == float('inf') else bound, running])
+        return {'count': self.count, 'sum': round(self.sum, 6), 'max': round(self.max, 6), 'buckets': cumulative}
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters, gauges and histograms keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}    # name -> {label_key: value}
+        self.gauges = {}      # name -> {label_key: value}
+        self.histograms = {}  # name -> {label_key: Histogram}
+
+    def inc(self, name, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the with-block in seconds (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def get(self, name, **labels):
+        """Current value of a counter or gauge (0 if never set)."""
+        key = _label_key(labels)
+        with self._lock:
+            for store in (self.counters, self.gauges):
+                if name in store and key in store[name]:
+                    return store[name][key]
+        return 0
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """All metrics as a JSON-ready dict."""
+        def series(store, convert=lambda value: value):
+            return {name: [{'labels': dict(key), 'value': convert(value)} for key, value in values.items()]
+                    for name, values in sorted(store.items())}
+
+        with self._lock:
+            return {
+                'timestamp': time.time(),
+                'counters': series(self.counters),
+                'gauges': series(self.gauges),
+                'histograms': series(self.histograms, Histogram.to_dict),
+            }
+
+    def to_prometheus(self, run=None):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        With a run name every series gets a run label (series labelled with another run
+        are left out), so the textfiles of different kinds of run never hold the same
+        series; the textfile collector rejects duplicates.
+        """
+        def run_label(key):
+            return [('run', run)] if run is not None and 'run' not in dict(key) else []
+
+        def other_run(key):
+            return run is not None and dict(key).get('run', str(run)) != str(run)
+
+        lines = []
+        with self._lock:
+            for kind, store in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, values in sorted(store.items()):
+                    full_name = PREFIX + name
+                    if name in HELP:
+                        lines.append(f"# HELP {full_name} {HELP[name]}")
+                    lines.append(f"# TYPE {full_name} {kind}")
+                    for key, value in values.items():
+                        if not other_run(key):
+                            lines.append(f"{full_name}{_format_labels(key, run_label(key))} {value}")
+            for name, values in sorted(self.histograms.items()):
+                full_name = PREFIX + name
+                if name in HELP:
+                    lines.append(f"# HELP {full_name} {HELP[name]}")
+                lines.append(f"# TYPE {full_name} histogram")
+                for key, histogram in values.items():
+                    if other_run(key):
+                        continue
+                    extra = run_label(key)
+                    running = 0
+                    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                        running += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{full_name}_bucket{_format_labels(key, extra + [('le', le)])} {running}")
+                    lines.append(f"{full_name}_sum{_format_labels(key, extra)} {histogram.sum}")
+                    lines.append(f"{full_name}_count{_format_labels(key, extra)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+_registry = MetricsRegistry()
+# Called before each export to refresh values kept elsewhere (e.g. cache statistics)
+_collectors = []
+
+
+def get_registry():
+    """Get the process-wide metrics registry."""
+    return _registry
+
+
+def inc(name, amount=1, **labels):
+    _registry.inc(name, amount, **labels)
+
+
+def set_gauge(name, value, **labels):
+    _registry.set_gauge(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    _registry.observe(name, value, **labels)
+
+
+def timer(name, **labels):
+    return _registry.timer(name, **labels)
+
+
+def register_collector(collect):
+    """Have collect() called before each export, to set gauges from state kept outside the registry."""
+    _collectors.append(collect)
+
+
+def get_metrics_dir():
+    return os.getenv('STEAMHOURS_METRICS_DIR') or METRICS_DIR
+
+
+def _write_atomic(path, text):
+    # The textfile collector may read at any moment, so never expose a half-written file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def export_metrics(run=None, success=True, started=None, metrics_dir=None):
+    """
+    Write the JSON snapshot and the Prometheus textfile.
+
+    Args:
+        run (str): Name of the run (CLI command or 'gui'); adds run duration/success/timestamp metrics
+        success (bool): Whether the run succeeded
+        started (float): time.perf_counter() at the start of the run
+        metrics_dir (str): Output directory (default: STEAMHOURS_METRICS_DIR or metrics/)
+
+    Returns:
+        tuple: (json_path, prometheus_path)
+    """
+    for collect in list(_collectors):
+        try:
+            collect()
+        except Exception as e:
+            print(f"Metrics collector {getattr(collect, '__name__', collect)} failed: {e}")
+
+    if run is not None:
+        if started is not None:
+            set_gauge('run_seconds', round(time.perf_counter() - started, 3), run=run)
+        set_gauge('run_success', 1 if success else 0, run=run)
+        set_gauge('last_run_timestamp_seconds', int(time.time()), run=run)
+
+    metrics_dir = metrics_dir or get_metrics_dir()
+    os.makedirs(metrics_dir, exist_ok=True)
+    file_run = run or 'run'
+    json_path = os.path.join(metrics_dir, JSON_FILENAME.format(run=file_run))
+    prometheus_path = os.path.join(metrics_dir, PROMETHEUS_FILENAME.format(run=file_run))
+    _write_atomic(json_path, json.dumps(_registry.snapshot(), indent=2))
+    _write_atomic(prometheus_path, _registry.to_prometheus(run=file_run))
+    return json_path, prometheus_path
@@ -0,0 +1,259 @@
+"""
+Name Normalization
+
+The one place game names and purchase amounts are normalized, for the
+similarity search, the CSV cleaner, the importers, the library match index
+and the search-as-you-type prefix index. Regular expressions are compiled
+once, edition suffixes are looked up by length instead of tried one by one,
+and normalized names are memoized in bounded LRU caches: the same library
+and purchase names come up again and again (every refund is compared with
+every purchase, every purchase with the library).
+
+    normalize_game_name("Dark Souls III - Deluxe Edition")
+    -> ('dark souls iii', ' - deluxe edition')
+    normalize_numbers_in_title("dark souls iii")
+    -> ['dark souls iii', 'dark souls 3']
+
+cache_stats() reports hits, misses and the hit rate of each cache; they are
+also exported with the other metrics (normalization_cache_*).
+"""
+import functools
+import re
+
+import metrics
+
+# Normalized values kept per cache; a 20k-game library plus its purchases fits
+CACHE_SIZE = 65536
+
+# Common game edition suffixes for normalization
+EDITION_SUFFIXES = [
+    ' (pre-purchase)',
+    ' - standard edition',
+    ' - deluxe edition',
+    ' - ultimate edition',
+    ' - game of the year edition',
+    ' - goty edition',
+    ' - collector\'s edition',
+    ' - special edition',
+    ' - limited edition',
+    ' - enhanced edition',
+    ' - definitive edition',
+    ' - complete edition',
+    ' - gold edition',
+    ' - platinum edition',
+    ' - premium edition',
+    ' - remastered edition',
+    ' remastered edition',
+    ' - remastered',
+    ' remastered',
+    'standard edition (pre-purchase)',
+    # Variations without dashes
+    ' standard edition',
+    ' deluxe edition',
+    ' ultimate edition',
+    ' game of the year edition',
+    ' goty edition',
+    ' collector\'s edition',
+    ' special edition',
+    ' limited edition',
+    ' enhanced edition',
+    ' definitive edition',
+    ' complete edition',
+    ' gold edition',
+    ' platinum edition',
+    ' premium edition',
+]
+
+# Suffix lookup: length -> {suffix: position in EDITION_SUFFIXES}. A name is checked
+# once per distinct length; the earliest suffix in the list wins, as before.
+_SUFFIXES_BY_LENGTH = {}
+for _position, _suffix in enumerate(EDITION_SUFFIXES):
+    _SUFFIXES_BY_LENGTH.setdefault(len(_suffix), {}).setdefault(_suffix, _position)
+_SUFFIX_LENGTHS = sorted(_SUFFIXES_BY_LENGTH)
+
+NUMBER_RE = re.compile(r'\d+')
+ROMAN_RE = re.compile(r'\b([IVX]+)\b', re.IGNORECASE)
+ARABIC_RE = re.compile(r'\b(\d+)\b')
+TITLE_PUNCTUATION_RE = re.compile(r'[:\-\–\—]')
+SPACES_RE = re.compile(r'\s+')
+NON_WORD_RE = re.compile(r'[^\w\s]')
+# Everything that isn't part of a number in an amount like '$39.94' or '($1.11)'
+AMOUNT_JUNK_RE = re.compile(r'[^\d\.\-\(\)]')
+
+_ROMAN_VALUES = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100, 'D': 500, 'M': 1000}
+_INT_TO_ROMAN = [(1000, 'M'), (900, 'CM'), (500, 'D'), (400, 'CD'), (100, 'C'), (90, 'XC'),
+                 (50, 'L'), (40, 'XL'), (10, 'X'), (9, 'IX'), (5, 'V'), (4, 'IV'), (1, 'I')]
+
+
+def roman_to_int(roman):
+    """Convert Roman numeral to integer."""
+    if not roman:
+        return None
+
+    total = 0
+    prev_value = 0
+
+    for char in reversed(roman.upper()):
+        value = _ROMAN_VALUES.get(char)
+        if value is None:
+            return None
+        if value < prev_value:
+            total -= value
+        else:
+            total += value
+        prev_value = value
+
+    return total
+
+
+def int_to_roman(num):
+    """Convert integer to Roman numeral."""
+    if not isinstance(num, int) or num <= 0 or num > 3999:
+        return None
+
+    result = ''
+    for value, numeral in _INT_TO_ROMAN:
+        count = num // value
+        result += numeral * count
+        num -= value * count
+
+    return result
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def extract_numbers(text):
+    """Extract all numbers from text as a (frozen) set."""
+    return frozenset(NUMBER_RE.findall(text))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _number_variations(title):
+    # Normalize punctuation for better matching
+    normalized_title = TITLE_PUNCTUATION_RE.sub(' ', title)  # Replace colons, hyphens, dashes with spaces
+    normalized_title = SPACES_RE.sub(' ', normalized_title).strip()  # Collapse multiple spaces
+
+    variations = [normalized_title.lower()]
+
+    # Convert Roman numerals to Arabic
+    for match in ROMAN_RE.finditer(normalized_title):
+        arabic = roman_to_int(match.group(1))
+        if arabic:
+            # Create variation with Arabic numeral
+            variation = normalized_title[:match.start()] + str(arabic) + normalized_title[match.end():]
+            variations.append(SPACES_RE.sub(' ', variation).strip().lower())
+
+    # Convert Arabic numbers to Roman
+    for match in ARABIC_RE.finditer(normalized_title):
+        roman = int_to_roman(int(match.group(1)))
+        if roman:
+            # Create variation with Roman numeral
+            variation = normalized_title[:match.start()] + roman + normalized_title[match.end():]
+            variations.append(SPACES_RE.sub(' ', variation).strip().lower())
+
+    return tuple(variations)
+
+
+def normalize_numbers_in_title(title):
+    """Convert numbers to both Roman and Arabic numerals for comparison."""
+    return list(_number_variations(title))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def normalize_game_name(game_name):
+    """
+    Normalize a game name by removing common edition suffixes.
+
+    Args:
+        game_name (str): The game name to normalize
+
+    Returns:
+        tuple: (base_name, removed_suffix) where removed_suffix is None if no suffix was found
+    """
+    clean_name = game_name.lower().strip()
+
+    best = None
+    for length in _SUFFIX_LENGTHS:
+        if length > len(clean_name):
+            break
+        position = _SUFFIXES_BY_LENGTH[length].get(clean_name[-length:])
+        if position is not None and (best is None or position < best):
+            best = position
+
+    if best is None:
+        return clean_name, None
+    suffix = EDITION_SUFFIXES[best]
+    return clean_name[:-len(suffix)].strip(), suffix
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def strip_punctuation(text):
+    """Remove everything but word characters and whitespace."""
+    return NON_WORD_RE.sub('', text)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def search_key(text):
+    """Lowercase text for prefix search: colons and dashes become spaces, other punctuation is dropped."""
+    text = TITLE_PUNCTUATION_RE.sub(' ', text.lower())
+    return SPACES_RE.sub(' ', NON_WORD_RE.sub('', text)).strip()
+
+
+def parse_amount(amount_str):
+    """Parse an amount like '$39.94', '-$5.00' or '($1.11)' (negative) into a float; 0.0 if there is none."""
+    if not amount_str:
+        return 0.0
+
+    clean_str = AMOUNT_JUNK_RE.sub('', amount_str)
+
+    if '(' in clean_str and ')' in clean_str:
+        clean_str = clean_str.replace('(', '').replace(')', '')
+        negative = True
+    else:
+        negative = clean_str.startswith('-')
+        clean_str = clean_str.lstrip('-')
+
+    try:
+        value = float(clean_str)
+        return -value if negative else value
+    except ValueError:
+        return 0.0
+
+
+_CACHED = {
+    'extract_numbers': extract_numbers,
+    'normalize_numbers_in_title': _number_variations,
+    'normalize_game_name': normalize_game_name,
+    'strip_punctuation': strip_punctuation,
+    'search_key': search_key,
+}
+
+
+def cache_stats():
+    """Hits, misses, size and hit rate of each normalization cache."""
+    stats = {}
+    for name, function in _CACHED.items():
+        info = function.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'max_size': info.maxsize,
+            'hit_rate': info.hits / lookups if lookups else 0.0,
+        }
+    return stats
+
+
+def clear_caches():
+    for function in _CACHED.values():
+        function.cache_clear()
+
+
+def _record_cache_metrics():
+    for name, stats in cache_stats().items():
+        metrics.set_gauge('normalization_cache_hits', stats['hits'], function=name)
+        metrics.set_gauge('normalization_cache_misses', stats['misses'], function=name)
+        metrics.set_gauge('normalization_cache_hit_ratio', round(stats['hit_rate'], 4), function=name)
+
+
+metrics.register_collector(_record_cache_metrics)
@@ -0,0 +1,178 @@
+"""
+Name Prefix Index
+
+Search-as-you-type over a library's game names. Each name is reduced to a
+search key (name_normalization.search_key) for each of its Roman/Arabic
+numeral variants, and the key plus every word start in it go into one sorted
+array. The names starting with the typed text, or with a word starting with
+it, are then a single bisect range, whatever the size of the library.
+
+Results are ranked: the exact name first, then names starting with the text,
+then names with a word starting with it, shorter names first. When the
+prefixes don't fill the results, a GameNameIndex adds fuzzy matches (typos,
+words in another order) by similarity score.
+
+    results, total = get_prefix_index(library).search("witcher 3")
+    results -> [{'index': 42, 'name': 'The Witcher 3: Wild Hunt', 'match': 'word', 'score': None}, ...]
+"""
+import bisect
+import sys
+
+import numpy as np
+
+from game_search import GameNameIndex
+from name_normalization import normalize_numbers_in_title, search_key
+
+# A match rank packs (tier, key length, row in games) into one int64 so a range sorts by it directly
+_ROW_BITS = 24
+_LENGTH_BITS = 16
+_TIER_SHIFT = _ROW_BITS + _LENGTH_BITS
+_ROW_MASK = (1 << _ROW_BITS) - 1
+_LENGTH_MASK = (1 << _LENGTH_BITS) - 1
+NAME_PREFIX, WORD_PREFIX = 0, 1
+
+# Fuzzy matches need a few characters to mean anything; a handful of them is enough
+FUZZY_MIN_LENGTH = 3
+FUZZY_THRESHOLD = 50
+FUZZY_LIMIT = 10
+
+
+class NamePrefixIndex:
+    """Sorted search keys (and word starts) of a library's game names, for bisect prefix lookups."""
+
+    def __init__(self, library):
+        self.games = []  # [{'name', 'index'}] of the named games, for the fuzzy fallback
+        entries = []     # (key, rank)
+        for position, game in enumerate(library.games):
+            name = game.get('name')
+            name = str(name).strip() if name is not None else ''
+            if not name:
+                continue
+            row = len(self.games)
+            self.games.append({'name': name, 'index': position})
+            keys = {search_key(variation) for variation in normalize_numbers_in_title(name)}
+            for key in keys:
+                if not key:
+                    continue
+                rank = (min(len(key), _LENGTH_MASK) << _ROW_BITS) | row
+                entries.append((key, (NAME_PREFIX << _TIER_SHIFT) | rank))
+                space = key.find(' ')
+                while space != -1:
+                    entries.append((key[space + 1:], (WORD_PREFIX << _TIER_SHIFT) | rank))
+                    space = key.find(' ', space + 1)
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ranks = np.array([rank for _, rank in entries], dtype=np.int64)
+        self.fuzzy_index = GameNameIndex(self.games)
+        # Index the names now, so searches (on any thread) only read the index
+        self.fuzzy_index.upper_bounds(' ')
+
+    def __len__(self):
+        return len(self.games)
+
+    def memory_bytes(self):
+        total = sys.getsizeof(self.keys) + sum(sys.getsizeof(key) for key in self.keys) + self.ranks.nbytes
+        total += sys.getsizeof(self.games) + sum(sys.getsizeof(game) for game in self.games)
+        return total + self.fuzzy_index.memory_bytes()
+
+    def _prefix_range(self, key):
+        lo = bisect.bisect_left(self.keys, key)
+        # Every key starting with the text sorts before the text with its last character bumped
+        hi = bisect.bisect_left(self.keys, key[:-1] + chr(ord(key[-1]) + 1), lo)
+        return lo, hi
+
+    def prefix_matches(self, text, limit=25):
+        """
+        Find the games whose name, or a word in it, starts with the text.
+
+        Args:
+            text (str): What has been typed so far
+            limit (int): Maximum number of games to return
+
+        Returns:
+            tuple: (results, total) - up to limit {'index', 'name', 'match', 'score'} dicts, best
+            first, where index is the game's position in library.games, match is 'exact',
+            'prefix' or 'word' and score is None; and the number of games matching in all
+        """
+        key = search_key(text)
+        if not key or limit <= 0:
+            return [], 0
+        lo, hi = self._prefix_range(key)
+        if lo == hi:
+            return [], 0
+        ranks = self.ranks[lo:hi]
+        rows = np.sort(ranks & _ROW_MASK)
+        total = 1 + int(np.count_nonzero(rows[1:] != rows[:-1]))
+
+        # A game can be in the range several times (variants, words); look at a few times
+        # the limit first and sort the whole range only if that wasn't enough games
+        results = self._best_unique(ranks, key, limit, limit * 4)
+        if len(results) < min(limit, total):
+            results = self._best_unique(ranks, key, limit, len(ranks))
+        return results, total
+
+    def _best_unique(self, ranks, key, limit, count):
+        if count < len(ranks):
+            ranks = np.partition(ranks, count)[:count]
+        ranks = np.sort(ranks)
+        results = []
+        seen = set()
+        for rank in ranks.tolist():
+            row = rank & _ROW_MASK
+            if row in seen:
+                continue
+            seen.add(row)
+            if rank >> _TIER_SHIFT == WORD_PREFIX:
+                match = 'word'
+            elif (rank >> _ROW_BITS) & _LENGTH_MASK == len(key):
+                match = 'exact'
+            else:
+                match = 'prefix'
+            game = self.games[row]
+            results.append({'index': game['index'], 'name': game['name'], 'match': match, 'score': None})
+            if len(results) >= limit:
+                break
+        return results
+
+    def fuzzy_matches(self, text, limit=25, exclude=()):
+        """
+        Find games by similarity score (see game_search), for typos and words the prefixes miss.
+
+        Slower than prefix_matches on big libraries (tens of ms for long texts); the index is
+        read-only once built, so this can run off the UI thread.
+
+        Returns:
+            list: up to limit {'index', 'name', 'match': 'fuzzy', 'score'} dicts, best first,
+            leaving out the library positions in exclude
+        """
+        text = text.strip().lower()
+        if len(text) < FUZZY_MIN_LENGTH or limit <= 0:
+            return []
+        results = []
+        for match in self.fuzzy_index.find_best_matches(text, FUZZY_THRESHOLD, limit + len(exclude)):
+            if match['index'] in exclude:
+                continue
+            results.append({'index': match['index'], 'name': match['name'], 'match': 'fuzzy', 'score': match['score']})
+            if len(results) >= limit:
+                break
+        return results
+
+    def search(self, text, limit=25):
+        """
+        Prefix matches, then up to FUZZY_LIMIT fuzzy ones if there is room.
+
+        Returns:
+            tuple: (results, total) as for prefix_matches, with the fuzzy matches counted in total
+        """
+        results, total = self.prefix_matches(text, limit)
+        if len(results) < limit:
+            fuzzy = self.fuzzy_matches(text, min(limit - len(results), FUZZY_LIMIT),
+                                       {result['index'] for result in results})
+            results += fuzzy
+            total += len(fuzzy)
+        return results, total
+
+
+def get_prefix_index(library):
+    """Get the prefix index of a library; built once and kept with the library until it is replaced."""
+    return library.get_derived('prefix_index', NamePrefixIndex)
@@ -0,0 +1,138 @@
+"""
+Owned Games Snapshot
+
+Per-user copy of the last GetOwnedGames response, saved on every sync. It keeps
+the API fields the spreadsheet has no column for (such as when each game was
+last played) and answers single-game lookups from a dict index by App ID, so
+they only go to the Steam API when the snapshot is older than its TTL.
+"""
+import json
+import os
+import threading
+import time
+
+from user_paths import ensure_user_dir, get_owned_games_path
+
+# How long a full snapshot (or a single refreshed game in it) is trusted
+SNAPSHOT_TTL_SECONDS = 6 * 60 * 60
+
+
+class OwnedGamesSnapshot:
+    """A user's owned games with an App ID index and per-game refresh times."""
+
+    def __init__(self, steam_id, games=None, fetched_at=0.0, game_fetched_at=None):
+        self.steam_id = str(steam_id)
+        self.games = games or []
+        self.fetched_at = fetched_at
+        # App ID -> time of the last single-game refresh (newer than fetched_at)
+        self.game_fetched_at = game_fetched_at or {}
+        self.index = {str(game['appid']): game for game in self.games if 'appid' in game}
+
+    def is_fresh(self, ttl=SNAPSHOT_TTL_SECONDS, now=None):
+        """Check whether the full snapshot is younger than the TTL."""
+        now = time.time() if now is None else now
+        return now - self.fetched_at < ttl
+
+    def is_game_fresh(self, app_id, ttl=SNAPSHOT_TTL_SECONDS, now=None):
+        """Check whether the data for one game is younger than the TTL."""
+        now = time.time() if now is None else now
+        fetched_at = max(self.fetched_at, self.game_fetched_at.get(str(app_id), 0.0))
+        return now - fetched_at < ttl
+
+    def get(self, app_id):
+        """Get the owned game dict for an App ID, or None if it is not in the snapshot."""
+        return self.index.get(str(app_id))
+
+    def update_game(self, app_id, game):
+        """Store a freshly fetched game (None = not owned) in the snapshot."""
+        app_id = str(app_id)
+        old = self.index.pop(app_id, None)
+        if old is not None:
+            self.games.remove(old)
+        if game is not None:
+            self.games.append(game)
+            self.index[app_id] = game
+        self.game_fetched_at[app_id] = time.time()
+
+    def to_dict(self):
+        return {
+            'steam_id': self.steam_id,
+            'fetched_at': self.fetched_at,
+            'game_fetched_at': self.game_fetched_at,
+            'games': self.games,
+        }
+
+
+_snapshots = {}  # steam_id -> (file fingerprint, OwnedGamesSnapshot)
+_snapshots_lock = threading.Lock()
+
+
+def _file_fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _write_snapshot(snapshot):
+    ensure_user_dir(snapshot.steam_id)
+    snapshot_path = get_owned_games_path(snapshot.steam_id)
+    # Write to a temp file first so a crash never leaves a half-written snapshot
+    temp_path = snapshot_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot.to_dict(), f)
+    os.replace(temp_path, snapshot_path)
+    with _snapshots_lock:
+        _snapshots[snapshot.steam_id] = (_file_fingerprint(snapshot_path), snapshot)
+
+
+def save_snapshot(steam_id, games_data):
+    """Save the full owned games list returned by the Steam API for a user."""
+    _write_snapshot(OwnedGamesSnapshot(steam_id, list(games_data), fetched_at=time.time()))
+
+
+def save_game(snapshot, app_id, game):
+    """Record a single refreshed game in a snapshot and save it."""
+    snapshot.update_game(app_id, game)
+    _write_snapshot(snapshot)
+
+
+def get_snapshot(steam_id):
+    """
+    Get a user's snapshot, or None if there isn't a usable one.
+
+    Parsed snapshots are kept in memory and only re-read when the file changes.
+    """
+    steam_id = str(steam_id)
+    snapshot_path = get_owned_games_path(steam_id)
+    fingerprint = _file_fingerprint(snapshot_path)
+    if fingerprint is None:
+        return None
+
+    with _snapshots_lock:
+        cached = _snapshots.get(steam_id)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    try:
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading owned games snapshot {snapshot_path}: {e}")
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get('games'), list):
+        return None
+
+    snapshot = OwnedGamesSnapshot(steam_id, data['games'], data.get('fetched_at', 0.0), data.get('game_fetched_at'))
+    with _snapshots_lock:
+        _snapshots[steam_id] = (fingerprint, snapshot)
+    return snapshot
+
+
+def get_last_played(steam_id):
+    """Get {app_id (str): last played unix time} from the snapshot (0 = never played)."""
+    snapshot = get_snapshot(steam_id)
+    if snapshot is None:
+        return {}
+    return {app_id: int(game.get('rtime_last_played') or 0) for app_id, game in snapshot.index.items()}
@@ -0,0 +1,182 @@
+"""
+Profiling Mode
+
+Wraps top-level operations (sync, import, CSV clean, GUI handlers) in
+cProfile when profiling is switched on, and writes one .pstats dump plus a
+top-N text summary per call into profiles/:
+
+    profiles/update_spreadsheet_20250101-120000_1.pstats
+    profiles/update_spreadsheet_20250101-120000_1.txt
+
+Small functions called many times (find_best_matches) are profiled in
+aggregate instead: all calls share one profile, written when the process
+exits (or on flush_aggregates()).
+
+Switch it on with STEAMHOURS_PROFILE=1 or the CLI's --profile flag. When it
+is off, a wrapped call costs one flag check.
+
+Environment:
+    STEAMHOURS_PROFILE       Set to 1 to profile
+    STEAMHOURS_PROFILE_DIR   Output directory (default profiles/)
+    STEAMHOURS_PROFILE_TOP   Functions listed in each text summary (default 30)
+"""
+import atexit
+import cProfile
+import functools
+import inspect
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+
+PROFILE_DIR = 'profiles'
+DEFAULT_TOP = 30
+
+_enabled = os.getenv('STEAMHOURS_PROFILE', '0').strip().lower() in ('1', 'true', 'yes', 'on')
+_local = threading.local()
+_sequence = itertools.count(1)
+_aggregates = {}  # name -> [cProfile.Profile, calls, seconds, in-use lock]
+_aggregates_lock = threading.Lock()
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled=True):
+    """Turn profiling on or off for the rest of the process."""
+    global _enabled
+    _enabled = enabled
+
+
+def get_profile_dir():
+    return os.getenv('STEAMHOURS_PROFILE_DIR') or PROFILE_DIR
+
+
+def _top_count():
+    try:
+        return int(os.getenv('STEAMHOURS_PROFILE_TOP', DEFAULT_TOP))
+    except ValueError:
+        return DEFAULT_TOP
+
+
+def write_profile(profile, name, seconds, calls=1):
+    """
+    Write a profile as .pstats plus a text summary of the top functions.
+
+    Returns:
+        str: Path of the .pstats file
+    """
+    profile_dir = get_profile_dir()
+    os.makedirs(profile_dir, exist_ok=True)
+    base = os.path.join(profile_dir, f"{name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}_{next(_sequence)}")
+    profile.dump_stats(f"{base}.pstats")
+
+    stream = io.StringIO()
+    stream.write(f"{name}: {calls} call(s), {seconds * 1000:.1f} ms wall time\n")
+    stream.write(f"Load the full profile with: python -m pstats {base}.pstats\n\n")
+    stats = pstats.Stats(profile, stream=stream)
+    stats.sort_stats('cumulative').print_stats(_top_count())
+    stream.write("\nBy own time:\n")
+    stats.sort_stats('tottime').print_stats(_top_count())
+    with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+        f.write(stream.getvalue())
+    print(f"Profile of {name} written to {base}.pstats ({seconds * 1000:.0f} ms)")
+    return f"{base}.pstats"
+
+
+def _call_with_profile(profile, fn, args, kwargs, on_done):
+    """Call fn with the profile enabled, then on_done(seconds) even if fn raised."""
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+ allows one profiler per process; this call runs unprofiled
+        return fn(*args, **kwargs)
+    _local.active = True
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profile.disable()
+        _local.active = False
+        on_done(time.perf_counter() - start)
+
+
+def _run_profiled(name, fn, args, kwargs):
+    # Nested operations are part of the outer profile
+    if getattr(_local, 'active', False):
+        return fn(*args, **kwargs)
+    profile = cProfile.Profile()
+    return _call_with_profile(profile, fn, args, kwargs, lambda seconds: write_profile(profile, name, seconds))
+
+
+def _run_aggregated(name, fn, args, kwargs):
+    if getattr(_local, 'active', False):
+        return fn(*args, **kwargs)
+    with _aggregates_lock:
+        entry = _aggregates.get(name)
+        if entry is None:
+            entry = _aggregates[name] = [cProfile.Profile(), 0, 0.0, threading.Lock()]
+    # A profile object can only record one thread at a time; concurrent calls run unprofiled
+    if not entry[3].acquire(blocking=False):
+        return fn(*args, **kwargs)
+
+    def add_call(seconds):
+        with _aggregates_lock:
+            entry[1] += 1
+            entry[2] += seconds
+    try:
+        return _call_with_profile(entry[0], fn, args, kwargs, add_call)
+    finally:
+        entry[3].release()
+
+
+def profiled(name=None, aggregate=False):
+    """
+    Decorator that profiles each call of a function while profiling is on.
+
+    Args:
+        name (str): Name used for the output files (default: the function name)
+        aggregate (bool): Collect all calls into one profile written at exit
+    """
+    def decorator(fn):
+        label = name or fn.__name__
+        run = _run_aggregated if aggregate else _run_profiled
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            return run(label, fn, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def wrap(name, fn):
+    """Profile calls of an existing callable, e.g. a bound GUI handler (wrap before connecting signals)."""
+    # Qt passes extra signal arguments (e.g. clicked's 'checked') only if the slot accepts them
+    accepted = len(inspect.signature(fn).parameters)
+    profiled_fn = profiled(name)(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args):
+        return profiled_fn(*args[:accepted])
+    return wrapper
+
+
+def flush_aggregates():
+    """Write the aggregated profiles collected so far and start over."""
+    with _aggregates_lock:
+        entries = list(_aggregates.items())
+        _aggregates.clear()
+    paths = []
+    for name, (profile, calls, seconds, _) in entries:
+        if calls:
+            paths.append(write_profile(profile, name, seconds, calls))
+    return paths
+
+
+atexit.register(flush_aggregates)
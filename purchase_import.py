@@ -0,0 +1,220 @@
+"""
+Purchase CSV Import (headless)
+
+Parses Steam purchase-history CSV exports and applies them to a playtime
+spreadsheet without any dialogs, for the command-line tool and scheduled jobs.
+The interactive importer in steam_csv_importer uses the same parser.
+
+Games are matched to the library by name through the library match index
+(Roman/Arabic numeral variants and edition suffixes included), then by a clear
+fuzzy winner. Anything that would need a question in the GUI — unknown games,
+ambiguous matches — is left out and reported instead, so the run can be
+finished in the app later.
+"""
+import csv
+
+import log_pipeline
+import memory_budget
+import metrics
+from profiling import profiled
+from user_paths import get_steam_id_for_path
+
+from game_search import find_best_matches
+from library_match_index import LibraryMatchIndex
+from name_normalization import parse_amount
+
+SHEET_NAME = 'Steam Games Playtime'
+
+# How a bundle's total cost is split between its games
+BUNDLE_SPLITS = ['even', 'weighted', 'skip']
+
+
+def parse_purchase_csv(csv_file_path):
+    """
+    Parse a purchase CSV into purchases, grouping bundle items under their main purchase.
+
+    Returns:
+        list: Purchase dicts with date, main_game, type, cost and bundle_games
+    """
+    purchase_data = []
+
+    try:
+        # First, try to detect the delimiter
+        with open(csv_file_path, 'r', encoding='utf-8') as file:
+            # Read first few lines to detect delimiter
+            sample_lines = [file.readline() for _ in range(3)]
+            tab_count = sum(line.count('\t') for line in sample_lines)
+            comma_count = sum(line.count(',') for line in sample_lines)
+            delimiter = '\t' if tab_count > comma_count else ','
+
+        # Now parse with the detected delimiter
+        with open(csv_file_path, 'r', encoding='utf-8') as file:
+            csv_reader = csv.reader(file, delimiter=delimiter)
+            next(csv_reader)  # Skip header row
+
+            current_bundle = None  # Track current bundle being processed
+
+            for row in csv_reader:
+                if len(row) < 2:  # Need at least game name
+                    continue
+
+                # Get data from CSV
+                purchase_date = row[0].strip() if len(row) > 0 else ""
+                game_name = row[1].strip() if len(row) > 1 else ""
+                purchase_type = row[2].strip() if len(row) > 2 else ""
+                cost_str = row[3] if len(row) > 3 else ""
+
+                # Skip if blank game name or Steam Community Market
+                if not game_name or game_name == "Steam Community Market":
+                    continue
+
+                # Check if this is a main purchase (has date and cost) or bundle item (no date/cost)
+                cost = parse_amount(cost_str)
+
+                if purchase_date and cost > 0:
+                    # This is a main purchase entry - finalize previous bundle first
+                    if current_bundle:
+                        purchase_data.append(current_bundle)
+
+                    # Start new bundle
+                    current_bundle = {
+                        'date': purchase_date,
+                        'main_game': game_name,
+                        'type': purchase_type,
+                        'cost': cost,
+                        'bundle_games': [game_name],  # Include main game as first game in bundle
+                        'processed': False
+                    }
+
+                elif current_bundle and not purchase_date and cost <= 0:
+                    # This is a bundle item (no date, no cost) - add to current bundle
+                    current_bundle['bundle_games'].append(game_name)
+
+            # Don't forget to add the last bundle if it exists
+            if current_bundle:
+                purchase_data.append(current_bundle)
+
+    except Exception as e:
+        print(f"Error parsing CSV file: {e}")
+
+    return purchase_data
+
+
+def find_library_app_id(index, game_name):
+    """Get the App ID for a purchased game name, or None if it can't be decided without asking."""
+    app_id, method = index.find_exact(game_name)
+    if app_id is not None:
+        metrics.inc('import_matches_total', method=method)
+        return app_id
+
+    # Same rule the importer uses without asking: only a clear winner is taken
+    matches = find_best_matches(game_name.lower().strip(), index.search_index, threshold=50, max_results=2)
+    if matches and (len(matches) == 1 or matches[0]['score'] > matches[1]['score'] + 100):
+        metrics.inc('import_matches_total', method='fuzzy')
+        return matches[0]['app_id']
+    metrics.inc('import_matches_total', method='none')
+    return None
+
+
+def split_bundle_cost(total_cost, weights):
+    """Split a cost over weights to the cent, so the parts add up exactly to the total."""
+    total_cents = round(total_cost * 100)
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights = [1] * len(weights)
+        weight_sum = len(weights)
+    cents = [int(total_cents * weight / weight_sum) for weight in weights]
+    # Hand out the rounding leftovers one cent at a time
+    for i in range(total_cents - sum(cents)):
+        cents[i % len(cents)] += 1
+    return [value / 100 for value in cents]
+
+
+def _write_purchase(sheet, row_num, cost, date, method):
+    """Set the purchase columns of a game's row (purchases only ever match games already in the sheet)."""
+    sheet.cell(row=row_num, column=4, value=cost)
+    sheet.cell(row=row_num, column=5, value=date)
+    sheet.cell(row=row_num, column=6, value=method)
+    if not sheet.cell(row=row_num, column=7).value:
+        sheet.cell(row=row_num, column=7, value="Game")
+
+
+@profiled()
+@memory_budget.traced('import')
+def import_purchases(csv_file_path, spreadsheet_path, bundle_split='even', dry_run=False):
+    """
+    Apply a purchase CSV to a spreadsheet without asking anything.
+
+    Args:
+        csv_file_path (str): Steam purchase history CSV
+        spreadsheet_path (str): Playtime spreadsheet to update
+        bundle_split (str): 'even', 'weighted' (by Steam original prices) or 'skip'
+        dry_run (bool): Match and count but don't save
+
+    Returns:
+        dict: Counts, the unmatched game names and whether the spreadsheet was saved
+    """
+    import openpyxl
+
+    if bundle_split not in BUNDLE_SPLITS:
+        raise ValueError(f"Unknown bundle split: {bundle_split} (expected one of {', '.join(BUNDLE_SPLITS)})")
+
+    result = {'purchases': 0, 'updated': 0, 'bundles_skipped': 0, 'unmatched': [], 'saved': False}
+    purchases = parse_purchase_csv(csv_file_path)
+    result['purchases'] = len(purchases)
+    if not purchases:
+        return result
+
+    with metrics.timer('workbook_load_seconds', kind='import'):
+        workbook = openpyxl.load_workbook(spreadsheet_path)
+    if SHEET_NAME not in workbook.sheetnames:
+        raise ValueError(f"{SHEET_NAME} sheet not found in {spreadsheet_path}")
+    sheet = workbook[SHEET_NAME]
+
+    existing_games = {}
+    for row_num, row in enumerate(sheet.iter_rows(min_row=2, max_col=2, values_only=True), start=2):
+        if row[1]:
+            existing_games.setdefault(str(row[1]), row_num)
+    index = LibraryMatchIndex.from_sheet(sheet)
+    steam_id = get_steam_id_for_path(spreadsheet_path)
+
+    for purchase in purchases:
+        games = purchase['bundle_games']
+        if len(games) > 1 and bundle_split == 'skip':
+            result['bundles_skipped'] += 1
+            continue
+
+        app_ids = [find_library_app_id(index, game_name) for game_name in games]
+        for name, app_id in zip(games, app_ids):
+            if not app_id:
+                result['unmatched'].append(name)
+                log_pipeline.log_event('import', "No library match for purchased game", steam_id=steam_id,
+                                       game=name, purchase_date=purchase['date'], csv=csv_file_path)
+        matched = [(name, app_id) for name, app_id in zip(games, app_ids) if app_id]
+        if len(matched) < len(games):
+            # A partial bundle would hand the missing games' share to the others; leave it for the app
+            if len(games) > 1:
+                result['bundles_skipped'] += 1
+            continue
+
+        if len(games) == 1:
+            costs = [purchase['cost']]
+        elif bundle_split == 'weighted':
+            from SteamAPI_Caller import get_bundle_prices
+            steam_prices, _ = get_bundle_prices([app_id for _, app_id in matched])
+            costs = split_bundle_cost(purchase['cost'], [steam_prices.get(app_id, 0.0) for _, app_id in matched])
+        else:
+            costs = split_bundle_cost(purchase['cost'], [1] * len(matched))
+
+        for (_, app_id), cost in zip(matched, costs):
+            _write_purchase(sheet, existing_games[app_id], cost, purchase['date'], "Steam")
+            result['updated'] += 1
+
+    metrics.inc('import_games_total', result['updated'], outcome='updated')
+    metrics.inc('import_games_total', len(result['unmatched']), outcome='unmatched')
+
+    if not dry_run and result['updated']:
+        with metrics.timer('workbook_save_seconds', kind='import'):
+            workbook.save(spreadsheet_path)
+        result['saved'] = True
+    return result
@@ -0,0 +1,203 @@
+"""
+Random Game Picker
+
+Picks a random game from the loaded library with optional filters (unplayed
+only, under N hours, no DLC, bought in a given year) and weightings (uniform,
+by cost per hour, by time since last played).
+
+Each filter/weighting combination gets a Vose alias table built once per
+library version, so every draw after that is O(1).
+"""
+import random
+import threading
+import time
+
+import numpy as np
+
+from library_analytics import get_analytics
+
+WEIGHTINGS = {
+    'uniform': 'Uniform',
+    'cost_per_hour': 'Cost per hour (least value for money first)',
+    'last_played': 'Time since last played',
+}
+
+# Games with no recorded cost keep this share of the average weight so they can still come up
+UNPRICED_WEIGHT_SHARE = 0.05
+
+# Keep tables for the most recent filter combinations only
+MAX_TABLES = 32
+
+
+class AliasTable:
+    """Vose alias table for O(1) weighted sampling over n items (weights=None means uniform)."""
+
+    def __init__(self, weights=None, count=None):
+        if weights is None:
+            self.count = count
+            self.prob = None
+            self.alias = None
+            return
+
+        weights = np.asarray(weights, dtype=float)
+        self.count = len(weights)
+        total = weights.sum()
+        if self.count == 0 or not total > 0:
+            # Nothing has weight; fall back to uniform
+            self.prob = None
+            self.alias = None
+            return
+
+        scaled = (weights * (self.count / total)).tolist()
+        prob = [1.0] * self.count
+        alias = list(range(self.count))
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # Leftovers are 1.0 up to rounding error
+        self.prob = prob
+        self.alias = alias
+
+    def sample(self, rng):
+        """Draw one index."""
+        i = rng.randrange(self.count)
+        if self.prob is None or rng.random() < self.prob[i]:
+            return i
+        return self.alias[i]
+
+
+class RandomGamePicker:
+    """Filtered, weighted random picks over one library version."""
+
+    def __init__(self, library, last_played_loader=None, rng=None):
+        """
+        Args:
+            library (SteamLibrary): Library to pick from
+            last_played_loader (callable): Returns {app_id: last played unix time}; only
+                called the first time the 'last_played' weighting is used
+            rng (random.Random): Random source (a new one by default)
+        """
+        self.library = library
+        self.columns = get_analytics(library).columns
+        self.last_played_loader = last_played_loader
+        self.rng = rng or random.Random()
+        self._last_played = None
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def candidates(self, unplayed_only=False, max_hours=None, exclude_dlc=False, year=None):
+        """Get the indices of the games matching the filters."""
+        c = self.columns
+        hours = np.nan_to_num(c.hours, nan=0.0)
+        mask = c.names != ''
+        if unplayed_only:
+            mask &= hours <= 0
+        if max_hours is not None:
+            mask &= hours < max_hours
+        if exclude_dlc:
+            mask &= ~c.is_dlc
+        if year is not None:
+            mask &= c.year == int(year)
+        return np.flatnonzero(mask)
+
+    def _weights(self, indices, weighting):
+        c = self.columns
+        if weighting == 'uniform':
+            return None
+        if weighting == 'cost_per_hour':
+            cost = np.nan_to_num(c.cost[indices], nan=0.0)
+            hours = np.nan_to_num(c.hours[indices], nan=0.0)
+            weights = np.where(cost > 0, cost / np.maximum(hours, 1.0), 0.0)
+        elif weighting == 'last_played':
+            weights = self._days_since_played(indices)
+        else:
+            raise ValueError(f"Unknown weighting: {weighting}")
+
+        priced = weights > 0
+        if priced.any():
+            weights = np.where(priced, weights, weights[priced].mean() * UNPRICED_WEIGHT_SHARE)
+        return weights
+
+    def _days_since_played(self, indices):
+        if self._last_played is None:
+            self._last_played = self.last_played_loader() if self.last_played_loader else {}
+        last_played = self._last_played
+        now = time.time()
+        days = np.zeros(len(indices))
+        never = np.zeros(len(indices), dtype=bool)
+        app_ids = self.columns.app_ids
+        for position, index in enumerate(indices):
+            timestamp = last_played.get(app_ids[index])
+            if timestamp is None:
+                continue  # Not in the snapshot; gets the small fallback weight
+            if timestamp <= 0:
+                never[position] = True
+            else:
+                days[position] = max((now - timestamp) / 86400.0, 1.0)
+        # Never played counts as the longest wait of all
+        if never.any():
+            days[never] = days.max() if days.max() > 0 else 1.0
+        return days
+
+    def _table_for(self, key, filters, weighting):
+        with self._lock:
+            entry = self._tables.get(key)
+        if entry is None:
+            indices = self.candidates(**filters)
+            entry = (indices, AliasTable(self._weights(indices, weighting), count=len(indices)))
+            with self._lock:
+                if len(self._tables) >= MAX_TABLES:
+                    self._tables.pop(next(iter(self._tables)))
+                self._tables[key] = entry
+        return entry
+
+    def pick(self, unplayed_only=False, max_hours=None, exclude_dlc=False, year=None, weighting='uniform'):
+        """
+        Pick a random game.
+
+        Returns:
+            dict: The picked game (a library game dict), or None if nothing matches the filters
+        """
+        filters = {'unplayed_only': unplayed_only, 'max_hours': max_hours, 'exclude_dlc': exclude_dlc, 'year': year}
+        key = (unplayed_only, max_hours, exclude_dlc, year, weighting)
+        indices, table = self._table_for(key, filters, weighting)
+        if len(indices) == 0:
+            return None
+        return self.library.games[int(indices[table.sample(self.rng)])]
+
+    def match_count(self, unplayed_only=False, max_hours=None, exclude_dlc=False, year=None, weighting='uniform'):
+        """Number of games the picker chooses from for these filters."""
+        filters = {'unplayed_only': unplayed_only, 'max_hours': max_hours, 'exclude_dlc': exclude_dlc, 'year': year}
+        indices, _ = self._table_for((unplayed_only, max_hours, exclude_dlc, year, weighting), filters, weighting)
+        return len(indices)
+
+    def memory_bytes(self):
+        """Approximate memory held by the cached alias tables."""
+        with self._lock:
+            entries = list(self._tables.values())
+        total = 0
+        for indices, table in entries:
+            total += indices.nbytes
+            if table.prob is not None:
+                # Two list slots plus a float object per item (alias ints are mostly shared)
+                total += table.count * (8 + 8 + 24)
+        return total
+
+    def purchase_years(self):
+        """Years with at least one purchase, newest first."""
+        years = np.unique(self.columns.year[self.columns.has_date])
+        return [int(year) for year in years[::-1]]
+
+
+def get_picker(library, last_played_loader=None):
+    """Get the picker for a library; its tables are kept with the library until it is replaced."""
+    return library.get_derived('picker', lambda lib: RandomGamePicker(lib, last_played_loader))
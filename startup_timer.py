@@ -0,0 +1,53 @@
+"""
+Startup Timing
+
+Records named checkpoints during application startup and prints a short
+report showing how long each phase took and which heavy modules had been
+imported by the time the dashboard numbers appeared.
+"""
+import sys
+import time
+
+# Modules that should only be imported when a feature needs them
+HEAVY_MODULES = ['openpyxl', 'pandas', 'numpy', 'requests', 'steam_csv_importer', 'game_search']
+
+_start_time = None
+_marks = []
+_reported = False
+
+
+def start(start_time=None):
+    """Set the reference time for the report (defaults to now)."""
+    global _start_time
+    _start_time = start_time if start_time is not None else time.perf_counter()
+
+
+def mark(label):
+    """Record a checkpoint."""
+    if _start_time is None:
+        start()
+    _marks.append((label, time.perf_counter()))
+
+
+def is_reported():
+    """Check whether the report has already been printed."""
+    return _reported
+
+
+def get_report():
+    """Build the startup report as a list of lines."""
+    lines = ["Startup time report:"]
+    previous = _start_time
+    for label, timestamp in _marks:
+        lines.append(f"  {label:<22} +{(timestamp - previous) * 1000:8.1f} ms  (at {(timestamp - _start_time) * 1000:8.1f} ms)")
+        previous = timestamp
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    lines.append(f"  Heavy modules loaded: {', '.join(loaded) if loaded else 'none'}")
+    return lines
+
+
+def report():
+    """Print the startup report once."""
+    global _reported
+    _reported = True
+    print('\n'.join(get_report()))
@@ -3,6 +3,17 @@ import os
 import re
 from datetime import datetime
 
+import memory_budget
+import metrics
+from name_normalization import parse_amount, strip_punctuation
+from profiling import profiled
+
+DATE_PATTERNS = [
+    re.compile(r'\d{1,2}-[A-Za-z]{3}-\d{2,4}'),  # 7-Dec-24
+    re.compile(r'\d{1,2}/\d{1,2}/\d{2,4}'),      # 7/12/24
+    re.compile(r'\d{4}-\d{1,2}-\d{1,2}'),        # 2024-12-07
+]
+
 class SteamCSVCleaner:
     """Clean Steam CSV files by removing unwanted entries like refunds, gifts, market transactions, etc."""
     
@@ -39,47 +50,26 @@ class SteamCSVCleaner:
     
     def _load_data(self):
         """Load CSV data into memory."""
-        with open(self.input_file, 'r', encoding=self.encoding) as f:
+        with memory_budget.stage('csv_load'), open(self.input_file, 'r', encoding=self.encoding) as f:
             self.rows = list(csv.reader(f))
+        metrics.inc('csv_rows_total', max(len(self.rows) - 1, 0), stage='clean', outcome='read')
     
     def _has_date(self, row):
         """Check if a row starts with a date."""
         if not row or not row[0].strip():
             return False
         
-        date_patterns = [
-            r'\d{1,2}-[A-Za-z]{3}-\d{2,4}',  # 7-Dec-24
-            r'\d{1,2}/\d{1,2}/\d{2,4}',      # 7/12/24
-            r'\d{4}-\d{1,2}-\d{1,2}',        # 2024-12-07
-        ]
-        
-        return any(re.match(pattern, row[0].strip()) for pattern in date_patterns)
+        return any(pattern.match(row[0].strip()) for pattern in DATE_PATTERNS)
     
     def _extract_amount(self, amount_str):
         """Extract numeric value from amount string."""
-        if not amount_str:
-            return 0.0
-        
-        clean_str = re.sub(r'[^\d\.\-\(\)]', '', amount_str)
-        
-        if '(' in clean_str and ')' in clean_str:
-            clean_str = clean_str.replace('(', '').replace(')', '')
-            negative = True
-        else:
-            negative = clean_str.startswith('-')
-            clean_str = clean_str.lstrip('-')
-        
-        try:
-            value = float(clean_str)
-            return -value if negative else value
-        except ValueError:
-            return 0.0
+        return parse_amount(amount_str)
     
     def _game_names_match(self, name1, name2):
         """Check if two game names refer to the same game."""
         # Clean and normalize names
-        clean1 = re.sub(r'[^\w\s]', '', name1.lower().replace('refund', '').strip())
-        clean2 = re.sub(r'[^\w\s]', '', name2.lower().strip())
+        clean1 = strip_punctuation(name1.lower().replace('refund', '').strip())
+        clean2 = strip_punctuation(name2.lower().strip())
         
         if len(clean1) > 3 and clean1 in clean2:
             return True
@@ -236,6 +226,7 @@ class SteamCSVCleaner:
         
         return len(lines_to_remove)
     
+    @profiled('clean_file')
     def clean_file(self, output_file=None):
         """Clean the CSV file and save to output file."""
         if not output_file:
@@ -269,10 +260,12 @@ class SteamCSVCleaner:
                 
                 if should_remove:
                     lines_removed += 1
+                    metrics.inc('csv_rows_total', stage='clean', outcome=reason.lower().replace(' ', '_').replace('/', '_'))
                     print(f"Removed line {i + 1} ({reason}): {', '.join(row[:4])}")
                 else:
                     writer.writerow(row)
                     lines_kept += 1
+                    metrics.inc('csv_rows_total', stage='clean', outcome='kept')
         
         # Summary
         print(f"\n📊 Cleaning Summary:")
@@ -289,29 +282,41 @@ class SteamCSVCleaner:
         
         return output_file
 
-def main():
+def main(argv=None):
     """Main function to run the CSV cleaner."""
-    csv_file = r'D:\SteamHours\ExcelFiles\Book1.csv'
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Remove refunds, gifts, wallet and market entries from a Steam purchase CSV.")
+    parser.add_argument('csv_file', nargs='?', default=os.path.join('ExcelFiles', 'Book1.csv'),
+                        help='Purchase history CSV (default: ExcelFiles/Book1.csv)')
+    parser.add_argument('--output', help='Cleaned CSV path (default: <name>_cleaned.csv next to the input)')
+    parser.add_argument('--yes', '-y', action='store_true', help="Clean without asking for confirmation")
+    args = parser.parse_args(argv)
+    csv_file = args.csv_file
     
     print("🧹 Steam CSV Cleaner v2.0")
     print("=" * 50)
     
     if not os.path.exists(csv_file):
         print(f"❌ File not found: {csv_file}")
-        print("Please update the csv_file variable with the correct path.")
-        return
+        print("Pass the path of the CSV to clean as the first argument.")
+        return None
     
     cleaner = SteamCSVCleaner(csv_file)
+    cleaned_file = None
     
     # Preview changes
     lines_to_remove = cleaner.preview_changes()
     
     if lines_to_remove > 0:
-        response = input(f"\n❓ Do you want to proceed with cleaning? (y/N): ").lower().strip()
+        if args.yes:
+            response = 'y'
+        else:
+            response = input(f"\n❓ Do you want to proceed with cleaning? (y/N): ").lower().strip()
         
         if response in ['y', 'yes']:
             print(f"\n🚀 Cleaning file...")
-            cleaned_file = cleaner.clean_file()
+            cleaned_file = cleaner.clean_file(args.output)
             
             if cleaned_file:
                 print(f"\n✅ File cleaned successfully!")
@@ -323,6 +328,7 @@ def main():
         print(f"\n✅ No changes needed - file is already clean!")
     
     print(f"\n✨ Done!")
+    return cleaned_file
 
 if __name__ == "__main__":
     main()
@@ -1,15 +1,19 @@
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox, QTextEdit, QProgressDialog, QApplication, QInputDialog
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-import csv
 import re
 import openpyxl
-from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox, QTextEdit, QProgressDialog, QApplication, QInputDialog
-from PyQt6.QtGui import QFont
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+import memory_budget
+import metrics
+from profiling import profiled
 from SteamAPI_Caller import get_bundle_prices
+from app_catalog import get_catalog
 from individual_price_dialog import IndividualPriceDialog
-from game_search import calculate_similarity_score, find_best_matches, EDITION_SUFFIXES, normalize_game_name, roman_to_int, int_to_roman, normalize_numbers_in_title, extract_cost_from_string
+from steam_dlc_rows import build_dlc_index, upsert_dlc_row
+from purchase_import import parse_purchase_csv
+from library_match_index import LibraryMatchIndex
+from game_search import calculate_similarity_score, find_best_matches
+from name_normalization import normalize_game_name
 
 
 class PriceBreakdownDialog(QDialog):
@@ -390,12 +394,30 @@ class SteamCSVImporter:
         # Cache for Steam API calls to avoid redundant requests
         self.steam_price_cache = {}
         self.app_id_cache = {}
+        # Name index of the sheet being imported into, built once per import
+        self.match_index = None
+        self._match_index_sheet = None
+    
+    def _show_dialog(self, dialog):
+        """Run a modal dialog, counting it by type for the metrics."""
+        metrics.inc('dialogs_shown_total', dialog=type(dialog).__name__)
+        return dialog.exec()
+    
+    def _run_blocking(self, fn, *args):
+        """Run slow I/O off the UI thread when the parent window has a task runner."""
+        tasks = getattr(self.parent, 'tasks', None)
+        if tasks is None:
+            return fn(*args)
+        return tasks.wait_for(fn, *args)
     
+    @profiled('import_from_file')
+    @memory_budget.traced('import')
     def import_from_file(self, csv_file_path):
         """Import game costs from a CSV file."""
         try:
             # Load existing spreadsheet
-            workbook = openpyxl.load_workbook(self.spreadsheet_path)
+            with metrics.timer('workbook_load_seconds', kind='import'):
+                workbook = self._run_blocking(openpyxl.load_workbook, self.spreadsheet_path)
             
             # Get or create the Steam Games Playtime sheet
             if 'Steam Games Playtime' not in workbook.sheetnames:
@@ -411,13 +433,16 @@ class SteamCSVImporter:
                 if len(row) >= 2 and row[1]:  # If app_id exists (App ID is column B)
                     existing_games[str(row[1])] = row_num
             
+            # Index existing DLC rows by (base App ID, normalized name) so re-imports update instead of appending
+            dlc_index = build_dlc_index(sheet)
+            
             # Process CSV file
             games_processed = 0
             games_skipped = 0
             games_added = 0
             
             # First pass: collect all purchase data to detect bundles
-            purchase_data = self._parse_csv_file(csv_file_path)
+            purchase_data = self._run_blocking(self._parse_csv_file, csv_file_path)
             
             if not purchase_data:
                 return False, "No valid purchase data found in CSV file"
@@ -452,17 +477,20 @@ class SteamCSVImporter:
                     bundle_games = purchase['bundle_games']
                     total_cost = purchase['cost']
                     dialog = BundleTypeDialog(bundle_games, total_cost, self.parent)
-                    result = dialog.exec()
+                    result = self._show_dialog(dialog)
                     if result == 1:
                         # ...existing code for multi purchase...
-                        individual_price_dialog = IndividualPriceDialog(bundle_games, total_cost, self.parent)
-                        price_result = individual_price_dialog.exec()
+                        individual_price_dialog = IndividualPriceDialog(
+                            bundle_games, total_cost, self.parent,
+                            app_ids={name: self.app_id_cache.get(name) for name in bundle_games}
+                        )
+                        price_result = self._show_dialog(individual_price_dialog)
                         if price_result == QDialog.DialogCode.Accepted:
                             individual_prices = individual_price_dialog.get_individual_prices()
                             breakdown_dialog = PriceBreakdownDialog(
                                 individual_prices, total_cost, "Multi Purchase", self.parent
                             )
-                            breakdown_result = breakdown_dialog.exec()
+                            breakdown_result = self._show_dialog(breakdown_dialog)
                             if breakdown_result == QDialog.DialogCode.Accepted:
                                 for game_name in bundle_games:
                                     individual_cost = individual_prices.get(game_name, 0.0)
@@ -489,7 +517,7 @@ class SteamCSVImporter:
                                 weighted_costs, total_cost, "Weighted Purchase", self.parent,
                                 steam_prices=steam_prices, total_steam_value=total_steam_value, game_app_ids=game_app_ids
                             )
-                            breakdown_result = breakdown_dialog.exec()
+                            breakdown_result = self._show_dialog(breakdown_dialog)
                             if breakdown_result == QDialog.DialogCode.Accepted:
                                 for game_name, weighted_cost in weighted_costs.items():
                                     cached_app_id = game_app_ids.get(game_name)
@@ -517,7 +545,7 @@ class SteamCSVImporter:
                             breakdown_dialog = PriceBreakdownDialog(
                                 equal_split_costs, total_cost, "Equal Split (Fallback)", self.parent
                             )
-                            breakdown_result = breakdown_dialog.exec()
+                            breakdown_result = self._show_dialog(breakdown_dialog)
                             if breakdown_result == QDialog.DialogCode.Accepted:
                                 for game_name in bundle_games:
                                     result = self._process_single_game(
@@ -570,7 +598,7 @@ class SteamCSVImporter:
                                 background-color: #45a049;
                             }
                         """)
-                        ok = base_game_dialog.exec()
+                        ok = self._show_dialog(base_game_dialog)
                         base_game = base_game_dialog.textValue()
                         if ok == QDialog.DialogCode.Accepted:
                             # Find App ID for base game
@@ -578,21 +606,20 @@ class SteamCSVImporter:
                             if base_app_id:
                                 row_num = existing_games.get(base_app_id)
                                 if row_num:
-                                    # Add total bundle cost to base game's cost
-                                    prev_cost = sheet.cell(row=row_num, column=4).value or 0
-                                    sheet.cell(row=row_num, column=4, value=prev_cost + total_cost)
-                                    # Optionally, add DLC rows for other games
+                                    # Upsert DLC rows for the other games in the bundle
+                                    any_dlc_created = False
                                     for dlc_game in bundle_games:
                                         if dlc_game != base_game:
-                                            new_row = sheet.max_row + 1
-                                            sheet.cell(row=new_row, column=1, value=dlc_game)
-                                            sheet.cell(row=new_row, column=2, value="")
-                                            sheet.cell(row=new_row, column=3, value=0)
-                                            sheet.cell(row=new_row, column=4, value="")
-                                            sheet.cell(row=new_row, column=5, value=purchase['date'])
-                                            sheet.cell(row=new_row, column=6, value="Steam")
-                                            sheet.cell(row=new_row, column=7, value="DLC")
-                                            sheet.cell(row=new_row, column=8, value=base_app_id)
+                                            _, created = upsert_dlc_row(
+                                                sheet, dlc_index, dlc_game, base_app_id, "", purchase['date']
+                                            )
+                                            any_dlc_created = any_dlc_created or created
+                                    # Add total bundle cost to base game's cost, unless this bundle was already imported
+                                    if any_dlc_created:
+                                        prev_cost = sheet.cell(row=row_num, column=4).value or 0
+                                        sheet.cell(row=row_num, column=4, value=prev_cost + total_cost)
+                                    else:
+                                        print(f"Bundle already imported for base game {base_app_id}; DLC rows updated")
                                     games_processed += len(bundle_games)
                                     games_added += len(bundle_games)
                                     continue
@@ -654,7 +681,7 @@ class SteamCSVImporter:
                                 background-color: #45a049;
                             }
                         """)
-                        ok = input_dialog.exec()
+                        ok = self._show_dialog(input_dialog)
                         dlc_flag = input_dialog.textValue()
                         if ok == QDialog.DialogCode.Accepted and dlc_flag == "Yes":
                             # Prompt user to select base game from spreadsheet
@@ -712,19 +739,14 @@ class SteamCSVImporter:
                                         break
                                 if base_app_id and base_app_id in existing_games:
                                     row_num = existing_games[base_app_id]
-                                    # Add DLC cost to base game's cost (column D)
-                                    prev_cost = sheet.cell(row=row_num, column=4).value or 0
-                                    sheet.cell(row=row_num, column=4, value=prev_cost + purchase['cost'])
-                                    # Optionally, add DLC as a separate row
-                                    new_row = sheet.max_row + 1
-                                    sheet.cell(row=new_row, column=1, value=game_name)  # DLC Name
-                                    sheet.cell(row=new_row, column=2, value="")       # DLC has no App ID
-                                    sheet.cell(row=new_row, column=3, value=0)
-                                    sheet.cell(row=new_row, column=4, value=purchase['cost'])
-                                    sheet.cell(row=new_row, column=5, value=purchase['date'])
-                                    sheet.cell(row=new_row, column=6, value="Steam")
-                                    sheet.cell(row=new_row, column=7, value="DLC")
-                                    sheet.cell(row=new_row, column=8, value=base_app_id)  # Base Game App ID
+                                    # Upsert the DLC row keyed by (base App ID, normalized DLC name)
+                                    _, created = upsert_dlc_row(
+                                        sheet, dlc_index, game_name, base_app_id, purchase['cost'], purchase['date']
+                                    )
+                                    # Add DLC cost to base game's cost (column D) only the first time it is imported
+                                    if created:
+                                        prev_cost = sheet.cell(row=row_num, column=4).value or 0
+                                        sheet.cell(row=row_num, column=4, value=prev_cost + purchase['cost'])
                                     games_processed += 1
                                     games_added += 1
                                     continue
@@ -771,11 +793,15 @@ class SteamCSVImporter:
             )
             
             # Save the workbook
-            workbook.save(self.spreadsheet_path)
+            with metrics.timer('workbook_save_seconds', kind='import'):
+                self._run_blocking(workbook.save, self.spreadsheet_path)
             
             # Close progress dialog
             progress_dialog.close()
             
+            metrics.inc('import_games_total', games_added, outcome='added')
+            metrics.inc('import_games_total', games_skipped, outcome='skipped')
+            
             # Return success with stats
             stats = {
                 'games_processed': games_processed,
@@ -797,71 +823,7 @@ class SteamCSVImporter:
     
     def _parse_csv_file(self, csv_file_path):
         """Parse CSV file and extract purchase data, handling bundle format."""
-        purchase_data = []
-        
-        try:
-            # First, try to detect the delimiter
-            with open(csv_file_path, 'r', encoding='utf-8') as file:
-                # Read first few lines to detect delimiter
-                sample_lines = [file.readline() for _ in range(3)]
-                tab_count = sum(line.count('\t') for line in sample_lines)
-                comma_count = sum(line.count(',') for line in sample_lines)
-                delimiter = '\t' if tab_count > comma_count else ','
-            
-            # Now parse with the detected delimiter
-            with open(csv_file_path, 'r', encoding='utf-8') as file:
-                csv_reader = csv.reader(file, delimiter=delimiter)
-                next(csv_reader)  # Skip header row
-                
-                current_bundle = None  # Track current bundle being processed
-                
-                for row in csv_reader:
-                    if len(row) < 2:  # Need at least game name
-                        continue
-                    
-                    # Get data from CSV
-                    purchase_date = row[0].strip() if len(row) > 0 else ""
-                    game_name = row[1].strip() if len(row) > 1 else ""
-                    purchase_type = row[2].strip() if len(row) > 2 else ""
-                    cost_str = row[3] if len(row) > 3 else ""
-                    
-                    # Skip if blank game name or Steam Community Market
-                    if not game_name or game_name == "Steam Community Market":
-                        continue
-                    
-                    # Check if this is a main purchase (has date and cost) or bundle item (no date/cost)
-                    cost = extract_cost_from_string(cost_str)
-                    
-                    if purchase_date and cost > 0:
-                        # This is a main purchase entry - finalize previous bundle first
-                        if current_bundle:
-                            purchase_data.append(current_bundle)
-                        
-                        # Start new bundle
-                        current_bundle = {
-                            'date': purchase_date,
-                            'main_game': game_name,
-                            'type': purchase_type,
-                            'cost': cost,
-                            'bundle_games': [game_name],  # Include main game as first game in bundle
-                            'processed': False
-                        }
-                        
-                    elif current_bundle and not purchase_date and cost <= 0:
-                        # This is a bundle item (no date, no cost) - add to current bundle
-                        current_bundle['bundle_games'].append(game_name)
-                        
-                    # Note: We don't need the 'else' case since all valid purchases
-                    # should either be main purchases (with date/cost) or bundle items (without date/cost)
-                
-                # Don't forget to add the last bundle if it exists
-                if current_bundle:
-                    purchase_data.append(current_bundle)
-                    
-        except Exception as e:
-            print(f"Error parsing CSV file: {e}")
-        
-        return purchase_data
+        return parse_purchase_csv(csv_file_path)
     
     def _process_single_game_with_app_id(self, game_name, cost, date, method, app_id, existing_games, sheet, games_processed, games_added, games_skipped):
         """Process a single game entry with a known App ID (skips the lookup to avoid double dialogs)."""
@@ -877,13 +839,8 @@ class SteamCSVImporter:
             sheet.cell(row=row_num, column=5, value=date)
             # Update purchase method in column F
             sheet.cell(row=row_num, column=6, value=method)
-            # Set entry type in column G (import from SteamAPI_Caller for DLC detection)
-            try:
-                from SteamAPI_Caller import is_dlc_by_name
-                entry_type = "DLC" if is_dlc_by_name(game_name) else "Game"
-                sheet.cell(row=row_num, column=7, value=entry_type)
-            except ImportError:
-                sheet.cell(row=row_num, column=7, value="Game")  # Default fallback
+            # Set entry type in column G (from the shared catalog once a price lookup has seen the app)
+            sheet.cell(row=row_num, column=7, value=get_catalog().get_type(app_id, "Game"))
             return 'updated'
         else:
             # Add new row for this game
@@ -894,13 +851,8 @@ class SteamCSVImporter:
             sheet.cell(row=new_row, column=4, value=cost)       # Purchase Cost
             sheet.cell(row=new_row, column=5, value=date)       # Purchase Date
             sheet.cell(row=new_row, column=6, value=method)     # Purchase Method
-            # Set entry type in column G
-            try:
-                from SteamAPI_Caller import is_dlc_by_name
-                entry_type = "DLC" if is_dlc_by_name(game_name) else "Game"
-                sheet.cell(row=new_row, column=7, value=entry_type)
-            except ImportError:
-                sheet.cell(row=new_row, column=7, value="Game")  # Default fallback
+            # Set entry type in column G (from the shared catalog once a price lookup has seen the app)
+            sheet.cell(row=new_row, column=7, value=get_catalog().get_type(app_id, "Game"))
             sheet.cell(row=new_row, column=8, value="")         # Base Game App ID (empty for now)
             return 'added'
 
@@ -912,7 +864,7 @@ class SteamCSVImporter:
         if not app_id:
             # Game not found, ask user for App ID
             dialog = GameIdInputDialog(game_name, self.parent)
-            id_result = dialog.exec()
+            id_result = self._show_dialog(dialog)
             
             if id_result == QDialog.DialogCode.Accepted:
                 app_ids = dialog.get_app_ids()
@@ -955,13 +907,8 @@ class SteamCSVImporter:
             sheet.cell(row=row_num, column=5, value=date)
             # Update method to Steam for CSV imports in column F
             sheet.cell(row=row_num, column=6, value=method)
-            # Set entry type in column G
-            try:
-                from SteamAPI_Caller import is_dlc_by_name
-                entry_type = "DLC" if is_dlc_by_name(game_name) else "Game"
-                sheet.cell(row=row_num, column=7, value=entry_type)
-            except ImportError:
-                sheet.cell(row=row_num, column=7, value="Game")  # Default fallback
+            # Set entry type in column G (from the shared catalog once a price lookup has seen the app)
+            sheet.cell(row=row_num, column=7, value=get_catalog().get_type(app_id, "Game"))
             return 'processed'
         else:
             # Add new row for this game
@@ -972,13 +919,8 @@ class SteamCSVImporter:
             sheet.cell(row=new_row, column=4, value=cost)       # Purchase Cost
             sheet.cell(row=new_row, column=5, value=date)       # Purchase Date
             sheet.cell(row=new_row, column=6, value=method)     # Purchase Method
-            # Set entry type in column G
-            try:
-                from SteamAPI_Caller import is_dlc_by_name
-                entry_type = "DLC" if is_dlc_by_name(game_name) else "Game"
-                sheet.cell(row=new_row, column=7, value=entry_type)
-            except ImportError:
-                sheet.cell(row=new_row, column=7, value="Game")  # Default fallback
+            # Set entry type in column G (from the shared catalog once a price lookup has seen the app)
+            sheet.cell(row=new_row, column=7, value=get_catalog().get_type(app_id, "Game"))
             sheet.cell(row=new_row, column=8, value="")         # Base Game App ID (empty for now)
             return 'added'
     
@@ -995,7 +937,7 @@ class SteamCSVImporter:
                     # Game not found, ask user for App ID
                     # PyQt6 imports are now at the top of the file
                     dialog = GameIdInputDialog(game_name, self.parent)
-                    id_result = dialog.exec()
+                    id_result = self._show_dialog(dialog)
                     
                     if id_result == QDialog.DialogCode.Accepted:
                         app_ids_list = dialog.get_app_ids()
@@ -1033,7 +975,7 @@ class SteamCSVImporter:
                 return None, None, None, None
             
             # Get Steam prices for all games
-            steam_prices, total_steam_value = get_bundle_prices(app_ids)
+            steam_prices, total_steam_value = self._run_blocking(get_bundle_prices, app_ids)
             
             if total_steam_value <= 0:
                 print("Error: Total Steam value is zero or negative")
@@ -1065,10 +1007,20 @@ class SteamCSVImporter:
             print(f"Error calculating weighted costs: {e}")
             return None, None, None, None
     
+    def _get_match_index(self, sheet):
+        """Get the name index of a sheet, picking up rows added since it was built."""
+        if self.match_index is None or self._match_index_sheet is not sheet:
+            self.match_index = LibraryMatchIndex.from_sheet(sheet)
+            self._match_index_sheet = sheet
+        else:
+            self.match_index.update_from_sheet(sheet)
+        return self.match_index
+    
     def _find_game_in_library(self, game_name, sheet):
         """Find a game in the library by name and return its App ID."""
         # Check cache first
         if game_name in self.app_id_cache:
+            metrics.inc('import_matches_total', method='cache')
             return self.app_id_cache[game_name]
         
         # Clean the game name for comparison
@@ -1077,58 +1029,25 @@ class SteamCSVImporter:
         # Remove common suffixes that might not match exactly using centralized list
         base_name, removed_suffix = normalize_game_name(clean_name)
         
-        # Try exact match first (including Roman numeral variations)
-        # Test both the full name and the base name (without edition suffixes)
-        search_variations = normalize_numbers_in_title(clean_name)
-        base_variations = normalize_numbers_in_title(base_name) if base_name != clean_name else []
+        index = self._get_match_index(sheet)
         
-        # Combine all search variations (full name + base name variations)
-        all_search_variations = search_variations + base_variations
-        
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            if len(row) >= 2 and row[0]:  # If game name exists (Game Name is column A)
-                existing_name = str(row[0]).lower().strip()
-                existing_variations = normalize_numbers_in_title(existing_name)
-                
-                # First try exact matches
-                for search_var in all_search_variations:
-                    for existing_var in existing_variations:
-                        if search_var == existing_var:
-                            app_id = str(row[1])  # App ID from column B
-                            self.app_id_cache[game_name] = app_id  # Cache the result
-                            return app_id
-                
-                # Then try partial matches for base name (if we removed a suffix)
-                if removed_suffix and base_name != clean_name:
-                    for base_var in base_variations:
-                        for existing_var in existing_variations:
-                            # Check if base name is contained in the existing game (for series matches)
-                            if base_var in existing_var or existing_var in base_var:
-                                # Extra validation: ensure significant overlap
-                                words_base = set(base_var.split())
-                                words_existing = set(existing_var.split())
-                                common_words = words_base.intersection(words_existing)
-                                
-                                # Require at least 2 common words for partial matches
-                                if len(common_words) >= 2:
-                                    app_id = str(row[1])  # App ID from column B
-                                    self.app_id_cache[game_name] = app_id  # Cache the result
-                                    return app_id
+        # Try exact match first (including Roman numeral variations of the full and base name),
+        # then the base name as part of a longer library name (for series matches)
+        app_id, method = index.find_exact(game_name)
+        if app_id is not None:
+            self.app_id_cache[game_name] = app_id  # Cache the result
+            metrics.inc('import_matches_total', method=method)
+            return app_id
         
         # If we removed a suffix, try to find the base game using enhanced matching
         if removed_suffix and base_name != clean_name:
-            # Collect all games from the spreadsheet for edition matching
-            all_games = []
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                if len(row) >= 2 and row[0]:  # If game name exists (Game Name is column A)
-                    all_games.append({
-                        'name': str(row[0]),
-                        'app_id': str(row[1]),
-                        'game_name': str(row[0])  # Keep both for compatibility
-                    })
-            
-            # Use the utility function to find edition matches
-            edition_matches = find_best_matches(base_name, all_games, threshold=200, max_results=3)
+            # The game itself or another edition of it: a direct lookup of the base name
+            edition_match = index.find_edition(base_name)
+            if edition_match is not None:
+                edition_matches = [dict(edition_match, score=0)]
+            else:
+                # Use the utility function to find edition matches
+                edition_matches = find_best_matches(base_name, index.search_index, threshold=200, max_results=3)
             
             # Add exact match bonus for sorting
             for match in edition_matches:
@@ -1147,21 +1066,12 @@ class SteamCSVImporter:
                 if self._confirm_edition_match(game_name, best_edition_match['name'], removed_suffix):
                     app_id = best_edition_match['app_id']
                     self.app_id_cache[game_name] = app_id  # Cache the result
+                    metrics.inc('import_matches_total', method='edition')
                     return app_id
         
         # If no exact match or edition match, try enhanced similarity matching
-        # Collect all games from the spreadsheet
-        all_games = []
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            if len(row) >= 2 and row[0]:  # If game name exists (Game Name is column A)
-                all_games.append({
-                    'name': str(row[0]),
-                    'app_id': str(row[1]),
-                    'game_name': str(row[0])  # Keep both for compatibility
-                })
-        
         # Use the utility function to find best matches
-        potential_matches = find_best_matches(clean_name, all_games, threshold=50, max_results=5)
+        potential_matches = find_best_matches(clean_name, index.search_index, threshold=50, max_results=5)
         
         # If we found potential matches, evaluate them
         if potential_matches:
@@ -1173,6 +1083,7 @@ class SteamCSVImporter:
                 # Clear winner - use it directly
                 app_id = best_match['app_id']
                 self.app_id_cache[game_name] = app_id  # Cache the result
+                metrics.inc('import_matches_total', method='fuzzy')
                 return app_id
             else:
                 # Multiple similar matches - use similarity score for user confirmation
@@ -1180,10 +1091,12 @@ class SteamCSVImporter:
                 if similarity_score >= 200:  # Good enough match threshold
                     app_id = best_match['app_id']
                     self.app_id_cache[game_name] = app_id  # Cache the result
+                    metrics.inc('import_matches_total', method='fuzzy')
                     return app_id
         
         # Cache negative result to avoid repeated lookups
         self.app_id_cache[game_name] = None
+        metrics.inc('import_matches_total', method='none')
         return None
     
     def _confirm_edition_match(self, searched_game, found_game, removed_suffix):
@@ -1226,7 +1139,7 @@ class SteamCSVImporter:
                 background-color: #45a049;
             }
         """)
-        result = msg_box.exec()
+        result = self._show_dialog(msg_box)
         return result == QMessageBox.StandardButton.Yes
 
 # ...existing code...
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+DLC Row Utilities
+
+DLC rows in the Steam Games Playtime sheet have no App ID of their own, so they
+are identified by (base game App ID, normalized DLC name). These helpers upsert
+DLC rows with that key and compact duplicates left behind by earlier imports.
+
+Sheet columns: A Game Name, B App ID, C Hours Played, D Purchase Cost,
+E Purchase Date, F Purchase Method, G Entry Type, H Base Game App ID
+"""
+import sys
+
+from name_normalization import NON_WORD_RE
+
+DLC_ENTRY_TYPE = "DLC"
+
+
+def normalize_dlc_name(dlc_name):
+    """Normalize a DLC name for duplicate detection (case, punctuation and spacing)."""
+    clean_name = NON_WORD_RE.sub(' ', str(dlc_name).lower())
+    return ' '.join(clean_name.split())
+
+
+def dlc_key(base_app_id, dlc_name):
+    """Build the (base App ID, normalized DLC name) key for a DLC row."""
+    return str(base_app_id).strip(), normalize_dlc_name(dlc_name)
+
+
+def _row_dlc_key(row):
+    """Get the DLC key for a row of sheet values, or None if it is not a DLC row."""
+    if len(row) < 8 or not row[0] or row[6] != DLC_ENTRY_TYPE or not row[7]:
+        return None
+    return dlc_key(row[7], row[0])
+
+
+def build_dlc_index(sheet):
+    """Map each DLC key to the first row that holds it."""
+    dlc_index = {}
+    for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+        key = _row_dlc_key(row)
+        if key and key not in dlc_index:
+            dlc_index[key] = row_num
+    return dlc_index
+
+
+def upsert_dlc_row(sheet, dlc_index, dlc_name, base_app_id, cost, date, method="Steam"):
+    """
+    Insert a DLC row, or update the existing row with the same key.
+
+    Args:
+        sheet: The Steam Games Playtime worksheet
+        dlc_index (dict): Index from build_dlc_index (updated in place)
+        dlc_name (str): DLC name as it appears in the purchase history
+        base_app_id (str): App ID of the base game
+        cost: Cost stored on the DLC row ("" when the cost lives on the base game)
+        date (str): Purchase date
+        method (str): Purchase method
+
+    Returns:
+        tuple: (row_num, created) where created is False if the DLC was already present
+    """
+    key = dlc_key(base_app_id, dlc_name)
+    row_num = dlc_index.get(key)
+
+    if row_num:
+        if cost not in (None, ""):
+            sheet.cell(row=row_num, column=4, value=cost)
+        sheet.cell(row=row_num, column=5, value=date)
+        sheet.cell(row=row_num, column=6, value=method)
+        return row_num, False
+
+    row_num = sheet.max_row + 1
+    sheet.cell(row=row_num, column=1, value=dlc_name)      # DLC Name
+    sheet.cell(row=row_num, column=2, value="")            # DLC has no App ID
+    sheet.cell(row=row_num, column=3, value=0)
+    sheet.cell(row=row_num, column=4, value=cost)
+    sheet.cell(row=row_num, column=5, value=date)
+    sheet.cell(row=row_num, column=6, value=method)
+    sheet.cell(row=row_num, column=7, value=DLC_ENTRY_TYPE)
+    sheet.cell(row=row_num, column=8, value=base_app_id)   # Base Game App ID
+    dlc_index[key] = row_num
+    return row_num, True
+
+
+def compact_dlc_rows(sheet):
+    """
+    Merge duplicate DLC rows into the first row with the same key.
+
+    Empty cost/date/method cells on the kept row are filled from its duplicates.
+    Costs already added to base games by earlier imports are left untouched.
+
+    Returns:
+        int: Number of duplicate rows removed
+    """
+    first_rows = {}
+    duplicate_rows = []
+
+    for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+        key = _row_dlc_key(row)
+        if not key:
+            continue
+        if key not in first_rows:
+            first_rows[key] = row_num
+            continue
+
+        kept_row = first_rows[key]
+        for column in (4, 5, 6):
+            if sheet.cell(row=kept_row, column=column).value in (None, "") and row[column - 1] not in (None, ""):
+                sheet.cell(row=kept_row, column=column, value=row[column - 1])
+        duplicate_rows.append(row_num)
+
+    # Delete from the bottom up in contiguous runs so earlier row numbers stay valid
+    duplicate_rows.sort(reverse=True)
+    index = 0
+    while index < len(duplicate_rows):
+        run_end = duplicate_rows[index]
+        run_start = run_end
+        index += 1
+        while index < len(duplicate_rows) and duplicate_rows[index] == run_start - 1:
+            run_start -= 1
+            index += 1
+        sheet.delete_rows(run_start, run_end - run_start + 1)
+
+    return len(duplicate_rows)
+
+
+def compact_spreadsheet(spreadsheet_path):
+    """Compact duplicate DLC rows in a spreadsheet file and save it."""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(spreadsheet_path)
+    if 'Steam Games Playtime' not in workbook.sheetnames:
+        print(f"Steam Games Playtime sheet not found in {spreadsheet_path}")
+        return 0
+
+    removed = compact_dlc_rows(workbook['Steam Games Playtime'])
+    if removed:
+        workbook.save(spreadsheet_path)
+    print(f"Removed {removed} duplicate DLC rows from {spreadsheet_path}")
+    return removed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        from user_paths import get_user_spreadsheet_path, load_default_steam_id
+        path = get_user_spreadsheet_path(load_default_steam_id())
+    compact_spreadsheet(path)
@@ -0,0 +1,211 @@
+"""
+Steam Library Model
+
+In-memory copy of a user's Steam Games Playtime sheet. It is loaded once
+(read-only, values only) and shared by the dashboard, the library table and
+the other views, instead of each feature re-reading the workbook.
+"""
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from functools import lru_cache
+
+import log_pipeline
+import memory_budget
+import metrics
+from user_paths import get_steam_id_for_path
+
+
+# Keys of each game dict, in spreadsheet column order (A-H)
+LIBRARY_COLUMNS = ['name', 'app_id', 'hours', 'cost', 'date', 'method', 'type', 'base_app_id']
+
+COLUMN_TITLES = {
+    'name': 'Game Name',
+    'app_id': 'App ID',
+    'hours': 'Hours Played',
+    'cost': 'Purchase Cost',
+    'date': 'Purchase Date',
+    'method': 'Purchase Method',
+    'type': 'Type',
+    'base_app_id': 'Base Game App ID',
+}
+
+# Date formats seen in Steam purchase history exports and hand-edited sheets
+DATE_FORMATS = ['%d-%b-%y', '%d-%b-%Y', '%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%d %b, %Y', '%b %d, %Y']
+
+_library_versions = itertools.count(1)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_string(text):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_purchase_date(value):
+    """Convert a Purchase Date cell (string or datetime) to a date, or None."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return _parse_date_string(str(value).strip())
+
+
+def to_float(value):
+    """Convert a numeric cell to float, or None if it is empty or not a number."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def spreadsheet_fingerprint(spreadsheet_path):
+    """Cheap change detector for a spreadsheet file: (size, mtime in ns), or None if missing."""
+    try:
+        stat = os.stat(spreadsheet_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def games_digest(games):
+    """Hash of the parsed rows, used to tell real changes from rewrites with the same data."""
+    return hashlib.blake2b(repr(games).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class SteamLibrary:
+    """A user's games as a list of dicts keyed by LIBRARY_COLUMNS."""
+
+    def __init__(self, games, source_path=None, fingerprint=None, digest=None):
+        self.games = games
+        self.source_path = source_path
+        self.fingerprint = fingerprint
+        self.digest = digest
+        # Bumped for every new library so caches keyed on it are invalidated
+        self.version = next(_library_versions)
+        # Structures built from this library (analytics, picker tables, ...) live and die with it
+        self.derived = {}
+        self._derived_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.games)
+
+    def get_derived(self, key, build):
+        """Get a structure derived from this library, building it on first use."""
+        with self._derived_lock:
+            value = self.derived.get(key)
+        if value is None:
+            value = build(self)
+            with self._derived_lock:
+                value = self.derived.setdefault(key, value)
+        return value
+
+    def summary(self):
+        """Get (total_games, total_hours, average_playtime), skipping rows without a numeric Hours Played."""
+        total_games = 0
+        total_hours = 0.0
+        for game in self.games:
+            hours = game['hours']
+            if hours is None:
+                continue
+            hours = to_float(hours)
+            if hours is None:
+                continue
+            total_games += 1
+            total_hours += hours
+
+        if total_games == 0:
+            return 0, 0.0, 0.0
+        return total_games, round(total_hours, 2), round(total_hours / total_games, 2)
+
+
+def read_games(spreadsheet_path):
+    """Read the Steam Games Playtime rows as a list of dicts keyed by LIBRARY_COLUMNS."""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(spreadsheet_path, read_only=True)
+    try:
+        if 'Steam Games Playtime' not in workbook.sheetnames:
+            raise ValueError("Steam Games Playtime sheet not found in spreadsheet.")
+
+        games = []
+        column_count = len(LIBRARY_COLUMNS)
+        for row in workbook['Steam Games Playtime'].iter_rows(min_row=2, max_col=column_count, values_only=True):
+            if not any(value is not None for value in row):
+                continue
+            if len(row) < column_count:
+                row = tuple(row) + (None,) * (column_count - len(row))
+            game = dict(zip(LIBRARY_COLUMNS, row))
+            hours = game['hours']
+            if hours not in (None, "") and not isinstance(hours, (int, float)) and to_float(hours) is None:
+                # summary() and the analytics skip these rows; logged once per read
+                log_pipeline.log_event('game_errors', "Invalid playtime value - could not convert to float",
+                                       level=logging.WARNING, steam_id=get_steam_id_for_path(spreadsheet_path),
+                                       game=game['name'], app_id=game['app_id'], playtime=hours)
+            games.append(game)
+    finally:
+        workbook.close()
+    return games
+
+
+@memory_budget.traced('library_load')
+def load_library(spreadsheet_path):
+    """Load the Steam Games Playtime sheet into a SteamLibrary."""
+    start = time.perf_counter()
+    fingerprint = spreadsheet_fingerprint(spreadsheet_path)
+    games = read_games(spreadsheet_path)
+    metrics.observe('workbook_load_seconds', time.perf_counter() - start, kind='library')
+    metrics.set_gauge('library_rows', len(games))
+    return SteamLibrary(games, source_path=spreadsheet_path, fingerprint=fingerprint, digest=games_digest(games))
+
+
+def is_library_current(library, spreadsheet_path):
+    """
+    Check whether a loaded library still matches the file on disk, by its (size, mtime) fingerprint.
+
+    Only stats the file, so it is safe on the UI thread. A file rewritten with the same
+    data counts as changed here; reload_if_changed tells the two apart off the UI thread.
+    """
+    if library is None or library.source_path != spreadsheet_path:
+        return False
+    fingerprint = spreadsheet_fingerprint(spreadsheet_path)
+    return fingerprint is not None and fingerprint == library.fingerprint
+
+
+def reload_if_changed(library, spreadsheet_path):
+    """
+    Load a spreadsheet again unless its rows still match a loaded library.
+
+    Reads the file once: the rows' digest decides whether it changed, and the
+    new library is built from the same rows. The library passed in is not
+    modified, so this can run on the task pool.
+
+    Returns:
+        tuple: (fingerprint, new_library) - the file's fingerprint when it was read, and the
+        reloaded SteamLibrary, or None if the content is the same (store the fingerprint on
+        the old library so the next check stays cheap)
+    """
+    fingerprint = spreadsheet_fingerprint(spreadsheet_path)
+    same_file = library is not None and library.source_path == spreadsheet_path
+    if same_file and fingerprint is not None and fingerprint == library.fingerprint:
+        return fingerprint, None
+    start = time.perf_counter()
+    games = read_games(spreadsheet_path)
+    metrics.observe('workbook_load_seconds', time.perf_counter() - start, kind='library')
+    digest = games_digest(games)
+    if same_file and digest == library.digest:
+        return fingerprint, None
+    metrics.set_gauge('library_rows', len(games))
+    return fingerprint, SteamLibrary(games, source_path=spreadsheet_path, fingerprint=fingerprint, digest=digest)
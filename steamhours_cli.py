@@ -0,0 +1,315 @@
+"""
+SteamHours Command Line
+
+Qt-free entry point for scheduled jobs and scripts:
+
+    python steamhours_cli.py sync
+    python steamhours_cli.py clean ExcelFiles/Book1.csv
+    python steamhours_cli.py import ExcelFiles/Book1_cleaned.csv --bundle-split weighted
+    python steamhours_cli.py stats
+    python steamhours_cli.py search "witcher 3"
+    python steamhours_cli.py compact-dlc
+    python steamhours_cli.py refresh-prices
+    python steamhours_cli.py query "hours < 1 and cost > 20 sort by cost desc"
+
+Every command works on one user's files (--steam-id, default: the last used
+user) or an explicit spreadsheet (--path). With --json, the result is printed
+as a single JSON object on stdout and all progress output goes to stderr.
+
+Modules are imported inside the commands, so starting the tool only costs
+what the chosen command needs.
+
+Exit codes: 0 success, 1 failure, 2 invalid arguments or query.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+
+class CommandError(Exception):
+    """A command failed in an expected way; the message is shown to the user."""
+
+
+def _resolve_paths(args):
+    from user_paths import get_steam_id_for_path, get_user_spreadsheet_path, load_default_steam_id
+    if args.path:
+        # The user is the one whose folder the file is in; None for a file outside ExcelFiles/<id>/
+        return args.steam_id or get_steam_id_for_path(args.path), args.path
+    steam_id = str(args.steam_id or load_default_steam_id())
+    return steam_id, get_user_spreadsheet_path(steam_id)
+
+
+def _load_library(spreadsheet_path):
+    from steam_library import load_library
+    if not os.path.exists(spreadsheet_path):
+        raise CommandError(f"Spreadsheet not found: {spreadsheet_path} (run 'sync' first)")
+    return load_library(spreadsheet_path)
+
+
+def cmd_sync(args):
+    """Fetch the owned games from the Steam API into the user's spreadsheet."""
+    from SteamAPI_Caller import get_api_key, update_spreadsheet
+    from user_paths import ensure_user_dir
+
+    steam_id, spreadsheet_path = _resolve_paths(args)
+    if not get_api_key():
+        raise CommandError("STEAM_API_KEY is not set (environment or .env)")
+    if not steam_id:
+        raise CommandError(f"No Steam ID for {spreadsheet_path}; pass --steam-id", 2)
+    if not args.path:
+        ensure_user_dir(steam_id)
+    try:
+        update_spreadsheet(steam_id=steam_id, spreadsheet_path=spreadsheet_path)
+    except RuntimeError as e:
+        raise CommandError(f"Sync failed: {e}")
+
+    total_games, total_hours, average = _load_library(spreadsheet_path).summary()
+    data = {'steam_id': steam_id, 'spreadsheet': spreadsheet_path,
+            'total_games': total_games, 'total_hours': total_hours, 'average_hours': average}
+    return data, [f"Synced {total_games} games ({total_hours:.2f} h) into {spreadsheet_path}"]
+
+
+def cmd_clean(args):
+    """Remove refunds, gifts, wallet and market entries from a purchase CSV."""
+    from steam_csv_cleaner import SteamCSVCleaner
+
+    if not os.path.exists(args.csv_file):
+        raise CommandError(f"File not found: {args.csv_file}")
+    cleaner = SteamCSVCleaner(args.csv_file)
+    lines_removed = cleaner.preview_changes()
+    output = None
+    if lines_removed and not args.dry_run:
+        output = cleaner.clean_file(args.output)
+
+    data = {'input': args.csv_file, 'output': output, 'lines_removed': lines_removed, 'dry_run': args.dry_run}
+    if not lines_removed:
+        return data, ["No changes needed - file is already clean"]
+    if args.dry_run:
+        return data, [f"{lines_removed} lines would be removed (dry run)"]
+    return data, [f"Removed {lines_removed} lines; cleaned file: {output}"]
+
+
+def cmd_import(args):
+    """Apply a purchase CSV to the spreadsheet without prompts."""
+    from purchase_import import import_purchases
+
+    steam_id, spreadsheet_path = _resolve_paths(args)
+    if not os.path.exists(args.csv_file):
+        raise CommandError(f"File not found: {args.csv_file}")
+    if not os.path.exists(spreadsheet_path):
+        raise CommandError(f"Spreadsheet not found: {spreadsheet_path} (run 'sync' first)")
+    result = import_purchases(args.csv_file, spreadsheet_path, bundle_split=args.bundle_split, dry_run=args.dry_run)
+
+    data = dict(result, steam_id=steam_id, spreadsheet=spreadsheet_path, dry_run=args.dry_run)
+    lines = [f"{result['purchases']} purchases: {result['updated']} games updated, "
+             f"{result['bundles_skipped']} bundles skipped" + (" (dry run)" if args.dry_run else "")]
+    if result['unmatched']:
+        lines.append(f"{len(result['unmatched'])} games not found in the library (import them in the app):")
+        lines.extend(f"  {name}" for name in result['unmatched'])
+    return data, lines
+
+
+def cmd_stats(args):
+    """Library totals and the dashboard analytics."""
+    from library_analytics import format_insights_report, get_analytics
+
+    steam_id, spreadsheet_path = _resolve_paths(args)
+    library = _load_library(spreadsheet_path)
+    total_games, total_hours, average = library.summary()
+    analytics = get_analytics(library)
+
+    data = {'steam_id': steam_id, 'spreadsheet': spreadsheet_path, 'entries': len(library),
+            'total_games': total_games, 'total_hours': total_hours, 'average_hours': average}
+    data.update(analytics.dashboard())
+    data['top_value_titles'] = analytics.top_value_titles(args.top)
+    lines = [f"Total games: {total_games}", f"Total hours: {total_hours:.2f}", f"Average hours: {average:.2f}", ""]
+    lines.extend(format_insights_report(analytics, args.top))
+    return data, lines
+
+
+def cmd_search(args):
+    """Fuzzy search of the library by name."""
+    from game_search import GameNameIndex, find_best_matches
+
+    _, spreadsheet_path = _resolve_paths(args)
+    library = _load_library(spreadsheet_path)
+    search_index = library.get_derived('search_index', lambda lib: GameNameIndex(lib.games))
+    matches = find_best_matches(args.term, search_index, threshold=args.threshold, max_results=args.limit)
+    lines = [f"{len(matches)} matches for '{args.term}'"]
+    for match in matches:
+        lines.append(f"  {match['score']:>7.1f}  {match['name'][:50]:<51}{str(match.get('app_id') or ''):>10}")
+    return {'term': args.term, 'matches': matches}, lines
+
+
+def cmd_compact_dlc(args):
+    """Merge duplicate DLC rows in the spreadsheet."""
+    from steam_dlc_rows import compact_spreadsheet
+
+    _, spreadsheet_path = _resolve_paths(args)
+    if not os.path.exists(spreadsheet_path):
+        raise CommandError(f"Spreadsheet not found: {spreadsheet_path}")
+    removed = compact_spreadsheet(spreadsheet_path)
+    return {'spreadsheet': spreadsheet_path, 'rows_removed': removed}, [f"Removed {removed} duplicate DLC rows"]
+
+
+def cmd_refresh_prices(args):
+    """Fetch store prices (and Game/DLC types) for every app in the shared catalog."""
+    from SteamAPI_Caller import refresh_catalog_prices
+
+    prices = refresh_catalog_prices(max_age_days=args.max_age_days)
+    priced = sum(1 for price in prices.values() if price)
+    data = {'apps': len(prices), 'priced': priced, 'max_age_days': args.max_age_days}
+    return data, [f"Prices available for {priced} of {len(prices)} catalog apps"]
+
+
+def cmd_query(args):
+    """Run a library query (see library_query for the syntax)."""
+    from library_query import QueryError, format_result, run_query
+
+    _, spreadsheet_path = _resolve_paths(args)
+    library = _load_library(spreadsheet_path)
+    try:
+        result = run_query(library, args.query)
+    except QueryError as e:
+        raise CommandError(f"Query error: {e}", 2)
+
+    data = {'query': args.query, 'total_matches': result.total_matches, 'query_ms': round(result.elapsed_ms, 2)}
+    if result.groups is not None:
+        data['group_field'] = result.group_field
+        data['groups'] = result.groups
+    else:
+        data['rows'] = result.games[:args.max_rows]
+    return data, format_result(result, args.max_rows)
+
+
+def _json_default(value):
+    # numpy scalars and dates
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='steamhours_cli.py', description="SteamHours command line tools.")
+    parser.add_argument('--steam-id', help='Steam ID whose files to use (default: last used in the app)')
+    parser.add_argument('--path', help='Spreadsheet path (overrides --steam-id)')
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON; progress goes to stderr')
+    parser.add_argument('--profile', action='store_true',
+                        help='Write cProfile dumps and summaries of the operation to profiles/')
+    parser.add_argument('--memory', action='store_true',
+                        help='Trace memory per stage and write logs/memory_<command>.txt')
+    parser.add_argument('--memory-budget', type=float, metavar='MB',
+                        help='Fail the run if any stage peaks above this many MB (implies --memory)')
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    sync = commands.add_parser('sync', help='Fetch owned games and playtime from the Steam API')
+    sync.set_defaults(handler=cmd_sync)
+
+    clean = commands.add_parser('clean', help='Clean a Steam purchase history CSV')
+    clean.add_argument('csv_file')
+    clean.add_argument('--output', help='Cleaned CSV path (default: <name>_cleaned.csv)')
+    clean.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+    clean.set_defaults(handler=cmd_clean)
+
+    import_parser = commands.add_parser('import', help='Import purchase costs from a CSV without prompts')
+    import_parser.add_argument('csv_file')
+    import_parser.add_argument('--bundle-split', choices=['even', 'weighted', 'skip'], default='even',
+                               help='How to split bundle costs (weighted uses Steam prices; default: even)')
+    import_parser.add_argument('--dry-run', action='store_true', help="Match and count but don't save")
+    import_parser.set_defaults(handler=cmd_import)
+
+    stats = commands.add_parser('stats', help='Library totals and analytics')
+    stats.add_argument('--top', type=int, default=10, help='Best value titles to list')
+    stats.set_defaults(handler=cmd_stats)
+
+    search = commands.add_parser('search', help='Search the library by name')
+    search.add_argument('term')
+    search.add_argument('--limit', type=int, default=10)
+    search.add_argument('--threshold', type=float, default=50, help='Minimum similarity score')
+    search.set_defaults(handler=cmd_search)
+
+    compact = commands.add_parser('compact-dlc', help='Merge duplicate DLC rows')
+    compact.set_defaults(handler=cmd_compact_dlc)
+
+    refresh = commands.add_parser('refresh-prices',
+                                  help='Refresh store prices for every app in the shared catalog (all users)')
+    refresh.add_argument('--max-age-days', type=float, default=1,
+                         help='Keep cached prices younger than this (default: 1)')
+    refresh.set_defaults(handler=cmd_refresh_prices)
+
+    query = commands.add_parser('query', help='Run a library query')
+    query.add_argument('query', help='e.g. "hours < 1 and cost > 20 and year = 2024 sort by cost desc"')
+    query.add_argument('--max-rows', type=int, default=50)
+    query.set_defaults(handler=cmd_query)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    handler = args.handler
+    if args.profile:
+        import profiling
+        profiling.set_enabled(True)
+        # The whole command is one profile; profiled functions it calls become part of it
+        handler = profiling.profiled(f"cli_{args.command.replace('-', '_')}")(handler)
+    if args.memory or args.memory_budget is not None:
+        import memory_budget
+        memory_budget.enable(args.memory_budget)
+    exit_code = 0
+    try:
+        if args.json:
+            # Keep stdout clean for the JSON document
+            with contextlib.redirect_stdout(sys.stderr):
+                data, lines = handler(args)
+        else:
+            data, lines = handler(args)
+    except CommandError as e:
+        exit_code = e.args[1] if len(e.args) > 1 else 1
+        data, lines = {'error': e.args[0]}, [e.args[0]]
+    except Exception as e:
+        exit_code = 1
+        data, lines = {'error': f"{type(e).__name__}: {e}"}, [f"Error: {e}"]
+
+    # Also picks up STEAMHOURS_MEMORY / STEAMHOURS_MEMORY_BUDGET_MB, which enable tracing on import
+    memory_budget = sys.modules.get('memory_budget')
+    if memory_budget is not None and memory_budget.is_enabled():
+        tracker = memory_budget.get_tracker()
+        report_path = tracker.write_report(args.command)
+        data = dict(data, memory={'report': report_path, 'budget_bytes': tracker.budget_bytes,
+                                  'stages': [{key: record[key] for key in ('stage', 'peak_bytes', 'net_bytes', 'over_budget')}
+                                             for record in tracker.records]})
+        try:
+            tracker.check()
+        except memory_budget.MemoryBudgetExceeded as e:
+            exit_code = exit_code or 1
+            data['error'] = str(e)
+            lines = lines + ["", f"Error: {e}"]
+        lines = lines + [f"Memory report: {report_path}"]
+
+    try:
+        import metrics
+        metrics.export_metrics(run=args.command, success=exit_code == 0, started=start)
+    except OSError as e:
+        print(f"Error writing metrics: {e}", file=sys.stderr)
+
+    try:
+        if args.json:
+            data = dict(data, command=args.command, ok=exit_code == 0,
+                        elapsed_ms=round((time.perf_counter() - start) * 1000, 1))
+            print(json.dumps(data, default=_json_default))
+        else:
+            print('\n'.join(lines), file=sys.stderr if exit_code else sys.stdout)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); point stdout at devnull so the flush at exit stays quiet
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
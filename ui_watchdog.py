@@ -0,0 +1,198 @@
+"""
+UI Watchdog
+
+Finds out what freezes the GUI.
+
+- A heartbeat QTimer ticks on the UI thread while a background thread checks
+  that the ticks keep coming. When the event loop stalls for longer than the
+  threshold, the thread captures the Python stack of the main thread at that
+  moment.
+- Button handlers can be wrapped so each call's duration is recorded.
+
+Stalls and handler timings go to a JSON-lines log (logs/ui_latency.jsonl,
+written by the log pipeline off the UI thread) and a percentile summary
+(logs/ui_latency_summary.txt) is written on exit, ready to attach to bug reports.
+
+Environment:
+    STEAMHOURS_STALL_MS   Stall threshold in milliseconds (default 250)
+    STEAMHOURS_WATCHDOG   Set to 0 to disable the watchdog
+"""
+import functools
+import inspect
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict, deque
+from datetime import datetime
+
+from PyQt6.QtCore import QObject, QTimer
+
+import log_pipeline
+import metrics
+
+LOG_DIR = 'logs'
+SUMMARY_PATH = f'{LOG_DIR}/ui_latency_summary.txt'
+
+DEFAULT_STALL_MS = 250
+HEARTBEAT_MS = 50
+# Handler timings kept in memory per handler for the summary
+MAX_SAMPLES = 1000
+
+
+def _env_stall_ms():
+    try:
+        return float(os.getenv('STEAMHOURS_STALL_MS', DEFAULT_STALL_MS))
+    except ValueError:
+        return DEFAULT_STALL_MS
+
+
+def is_enabled():
+    """Check whether the watchdog is enabled (STEAMHOURS_WATCHDOG=0 turns it off)."""
+    return os.getenv('STEAMHOURS_WATCHDOG', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    # The epsilon keeps float noise (0.55 * 100 == 55.00000000000001) from bumping the rank
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values) - 1e-9) - 1))
+    return sorted_values[rank]
+
+
+class UiWatchdog(QObject):
+    """Event-loop stall detector and handler latency recorder."""
+
+    def __init__(self, parent=None, stall_ms=None):
+        super().__init__(parent)
+        self.stall_ms = stall_ms if stall_ms is not None else _env_stall_ms()
+        # Writes happen on the log pipeline's thread, never on the UI thread being measured
+        self.logger = log_pipeline.get_logger('ui_latency')
+        self.handler_times = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))  # handler -> durations (ms)
+        self.stalls = deque(maxlen=MAX_SAMPLES)  # stall records, newest last
+
+        self._main_thread_id = threading.main_thread().ident
+        self._last_beat = time.monotonic()
+        self._stall_stack = None
+        self._stall_started = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setInterval(HEARTBEAT_MS)
+        self.heartbeat.timeout.connect(self._beat)
+
+    def start(self):
+        """Start the heartbeat and the checker thread."""
+        self._last_beat = time.monotonic()
+        self.heartbeat.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='ui-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching (safe to call more than once)."""
+        self.heartbeat.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _beat(self):
+        now = time.monotonic()
+        with self._lock:
+            stack = self._stall_stack
+            started = self._stall_started
+            self._stall_stack = None
+            self._stall_started = None
+            gap_ms = (now - self._last_beat) * 1000
+            self._last_beat = now
+        if stack is not None:
+            # The loop is running again; the whole gap was the stall
+            self._record_stall(gap_ms, stack, started)
+
+    def _watch(self):
+        check_interval = min(self.stall_ms, HEARTBEAT_MS * 2) / 2000.0
+        while not self._stop.wait(check_interval):
+            with self._lock:
+                blocked_ms = (time.monotonic() - self._last_beat) * 1000
+                if blocked_ms < self.stall_ms or self._stall_stack is not None:
+                    continue
+                frame = sys._current_frames().get(self._main_thread_id)
+                self._stall_stack = traceback.format_stack(frame) if frame is not None else []
+                self._stall_started = time.time() - blocked_ms / 1000
+            print(f"UI stall: event loop blocked for {blocked_ms:.0f} ms (threshold {self.stall_ms:.0f} ms)")
+
+    def _record_stall(self, duration_ms, stack, started):
+        record = {
+            'type': 'stall',
+            'time': datetime.fromtimestamp(started).isoformat(timespec='milliseconds'),
+            'duration_ms': round(duration_ms, 1),
+            'stack': [line.rstrip() for line in stack],
+        }
+        self.stalls.append(record)
+        metrics.observe('ui_stall_seconds', duration_ms / 1000)
+        self.logger.info('stall', extra={'type': 'stall', 'started': record['time'],
+                                         'duration_ms': record['duration_ms'], 'stack': record['stack']})
+        print(f"UI stall ended after {duration_ms:.0f} ms; main thread was in: {stack[-1].strip() if stack else 'unknown'}")
+
+    def record_handler(self, name, duration_ms):
+        """Record one handler call."""
+        self.handler_times[name].append(duration_ms)
+        metrics.observe('ui_handler_seconds', duration_ms / 1000, handler=name)
+        self.logger.info('handler', extra={'type': 'handler', 'handler': name, 'duration_ms': round(duration_ms, 1)})
+
+    def timed(self, name, fn):
+        """Wrap a handler so every call is timed."""
+        # Qt passes extra signal arguments (e.g. clicked's 'checked') only if the slot accepts them
+        accepted = len(inspect.signature(fn).parameters)
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            start = time.perf_counter()
+            try:
+                return fn(*args[:accepted])
+            finally:
+                self.record_handler(name, (time.perf_counter() - start) * 1000)
+        return wrapper
+
+    def instrument(self, obj, method_names):
+        """Replace methods on an object with timed wrappers (do this before connecting signals)."""
+        for method_name in method_names:
+            setattr(obj, method_name, self.timed(method_name, getattr(obj, method_name)))
+
+    def get_summary(self):
+        """Build the percentile summary as a list of lines."""
+        lines = [f"UI latency summary ({datetime.now().isoformat(timespec='seconds')})",
+                 f"Stall threshold: {self.stall_ms:.0f} ms",
+                 "",
+                 f"{'Handler':<26}{'Calls':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'Max ms':>10}"]
+        for name in sorted(self.handler_times):
+            values = sorted(self.handler_times[name])
+            lines.append(f"{name:<26}{len(values):>7}{percentile(values, 0.5):>10.1f}{percentile(values, 0.9):>10.1f}"
+                         f"{percentile(values, 0.99):>10.1f}{values[-1]:>10.1f}")
+        if not self.handler_times:
+            lines.append("  (no handler calls recorded)")
+        lines.append("  Handlers that open dialogs include the time the dialog was open.")
+
+        lines.append("")
+        durations = sorted(stall['duration_ms'] for stall in self.stalls)
+        lines.append(f"Event loop stalls: {len(durations)}")
+        if durations:
+            lines.append(f"  p50 {percentile(durations, 0.5):.1f} ms, p90 {percentile(durations, 0.9):.1f} ms, "
+                         f"max {durations[-1]:.1f} ms")
+            worst = max(self.stalls, key=lambda stall: stall['duration_ms'])
+            lines.append(f"  Longest stall ({worst['duration_ms']:.1f} ms at {worst['time']}), main thread stack:")
+            lines.extend(f"    {line}" for line in '\n'.join(worst['stack']).splitlines())
+        return lines
+
+    def write_summary(self, path=SUMMARY_PATH):
+        """Write the summary file and return its path."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.get_summary()) + '\n')
+        return path
@@ -0,0 +1,62 @@
+"""
+User Path Utilities
+
+Central place for the per-user file layout under ExcelFiles/ and for the
+files shared by every tracked user (such as the app catalog).
+"""
+import json
+import os
+
+
+EXCEL_ROOT = 'ExcelFiles'
+CONFIG_PATH = 'config/user_preferences.json'
+DEFAULT_STEAM_ID = '76561198074846013'
+
+
+def get_user_dir(steam_id):
+    """Get the data directory for a Steam user."""
+    return f'{EXCEL_ROOT}/{steam_id}'
+
+
+def get_user_spreadsheet_path(steam_id):
+    """Get the playtime spreadsheet path for a Steam user."""
+    return f'{get_user_dir(steam_id)}/steam_games_playtime.xlsx'
+
+
+def get_owned_games_path(steam_id):
+    """Get the path of the user's last owned-games snapshot from the Steam API."""
+    return f'{get_user_dir(steam_id)}/owned_games.json'
+
+
+def get_user_log_dir(steam_id):
+    """Get the directory of the user's structured logs."""
+    return f'{get_user_dir(steam_id)}/logs'
+
+
+def get_steam_id_for_path(spreadsheet_path):
+    """Get the Steam ID of a per-user file (ExcelFiles/<steam_id>/...), or None for other paths."""
+    parent = os.path.basename(os.path.dirname(os.path.abspath(spreadsheet_path)))
+    return parent if parent.isdigit() else None
+
+
+def get_app_catalog_path():
+    """Get the path of the app catalog shared by all users."""
+    return f'{EXCEL_ROOT}/app_catalog.json'
+
+
+def ensure_user_dir(steam_id):
+    """Create the user's data directory if needed and return it."""
+    user_dir = get_user_dir(steam_id)
+    os.makedirs(user_dir, exist_ok=True)
+    return user_dir
+
+
+def load_default_steam_id(config_path=CONFIG_PATH):
+    """Load the last used Steam ID from the preferences file."""
+    try:
+        if os.path.exists(config_path):
+            with open(config_path, 'r') as f:
+                return json.load(f).get('steam_id', DEFAULT_STEAM_ID)
+    except Exception as e:
+        print(f"Error loading user preferences: {e}")
+    return DEFAULT_STEAM_ID